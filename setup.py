@@ -31,7 +31,7 @@ setup(
     packages = find_packages(),
     # package_dir={'': "zeroth-meta"},
     install_requires=[],
-    extras_require={},
+    extras_require={'store': ['pyarrow']},
 
 
 )
\ No newline at end of file
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 Zeroth-Principles
+#
+# This file is part of Zeroth-Meta.
+#
+#  Zeroth-Meta is free software: you can redistribute it and/or modify it under the
+#  terms of the GNU General Public License as published by the Free Software
+#  Foundation, either version 3 of the License, or (at your option) any later
+#  version.
+#
+#  Zeroth-Meta is distributed in the hope that it will be useful, but WITHOUT ANY
+#  WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+#  A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License along with
+#  Zeroth-Meta. If not, see <http://www.gnu.org/licenses/>.
+#
+"""Benchmarks of the performance critical parts of zpmeta. Each module can be run with python -m, and the suite
+with python -m zpmeta.benchmarks."""
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 Zeroth-Principles
+#
+# This file is part of Zeroth-Meta.
+#
+#  Zeroth-Meta is free software: you can redistribute it and/or modify it under the
+#  terms of the GNU General Public License as published by the Free Software
+#  Foundation, either version 3 of the License, or (at your option) any later
+#  version.
+#
+#  Zeroth-Meta is distributed in the hope that it will be useful, but WITHOUT ANY
+#  WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+#  A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License along with
+#  Zeroth-Meta. If not, see <http://www.gnu.org/licenses/>.
+#
+"""Runs the benchmark suite, optionally saving the results and failing on regressions against a baseline.
+
+Examples:
+    python -m zpmeta.benchmarks --quick --save baseline.json
+    python -m zpmeta.benchmarks --quick --baseline baseline.json --threshold 0.2
+    python -m zpmeta.benchmarks --filter panelsource
+    python -m zpmeta.benchmarks --filter none --import-budget 0.25
+
+Exits with status 1 when a case is slower than its baseline by more than the threshold, or the core modules miss
+their import budget, see zpmeta/benchmarks/imports.py. The isolation and
+transport modules remain standalone benchmarks reporting throughput and memory.
+"""
+
+import argparse
+import sys
+from zpmeta.benchmarks import imports, suite
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m zpmeta.benchmarks', description=__doc__.splitlines()[0])
+    parser.add_argument('--quick', action='store_true', help="run the smaller parameter grid")
+    parser.add_argument('--filter', default=None, help="only run the cases whose name contains this string")
+    parser.add_argument('--repeat', type=int, default=5, help="timed loops per case, the best one is kept")
+    parser.add_argument('--min-time', type=float, default=0.05, help="minimum seconds per timed loop")
+    parser.add_argument('--save', default=None, help="JSON file to save the results to")
+    parser.add_argument('--baseline', default=None, help="JSON file of results to compare with")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="relative slowdown against the baseline counted as a regression")
+    parser.add_argument('--import-budget', type=float, default=None,
+                        help="also check that the core modules import within this many seconds, without pandas")
+    args = parser.parse_args(argv)
+
+    cases = suite.cases(suite.QUICK_GRID if args.quick else suite.GRID)
+    if args.filter is not None:
+        cases = {name: case for name, case in cases.items() if args.filter in name}
+    baseline = suite.load(args.baseline) if args.baseline is not None else {}
+
+    def report(name: str, seconds: float) -> None:
+        line = "%-60s %12.3f us" % (name, seconds * 1e6)
+        if name in baseline:
+            line += " %+8.1f%%" % ((seconds / baseline[name] - 1) * 100)
+        print(line, flush=True)
+
+    results = suite.run(cases, args.repeat, args.min_time, report)
+    if args.save is not None:
+        suite.save(results, args.save)
+
+    regressions = suite.compare(results, baseline, args.threshold)
+    for name, before, after, ratio in regressions:
+        print("REGRESSION %s: %.3f us -> %.3f us (x%.2f)" % (name, before * 1e6, after * 1e6, ratio))
+    failures = [] if args.import_budget is None else imports.check(args.import_budget)
+    for failure in failures:
+        print("IMPORTS %s" % failure)
+    return 1 if regressions or failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 Zeroth-Principles
+#
+# This file is part of Zeroth-Meta.
+#
+#  Zeroth-Meta is free software: you can redistribute it and/or modify it under the
+#  terms of the GNU General Public License as published by the Free Software
+#  Foundation, either version 3 of the License, or (at your option) any later
+#  version.
+#
+#  Zeroth-Meta is distributed in the hope that it will be useful, but WITHOUT ANY
+#  WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+#  A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License along with
+#  Zeroth-Meta. If not, see <http://www.gnu.org/licenses/>.
+#
+"""Import time budget of the pandas-free core of zpmeta: Func, maptools, executors and singletons.
+
+Each measure imports the core modules in a fresh interpreter, and fails if they take longer than the budget or
+load NumPy, pandas or pyarrow, which must only be imported by PanelSource, transport or fingerprints of arrays.
+The same checks run with the tests, see zpmeta/tests/test_imports.py.
+
+Run with: python -m zpmeta.benchmarks.imports [budget_seconds]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+CORE_MODULES = ('zpmeta.funcs.func', 'zpmeta.funcs.maptools', 'zpmeta.funcs.executors', 'zpmeta.funcs.graph',
+                'zpmeta.funcs.sweep', 'zpmeta.singletons.singletons', 'zpmeta.utils.params',
+                'zpmeta.utils.fingerprint', 'zpmeta.utils.common_utils', 'zpmeta.utils.instrument')
+HEAVY_MODULES = ('numpy', 'pandas', 'pyarrow')
+BUDGET = 0.25
+# Run the interpreters from the directory holding zpmeta, so that it imports whatever the working directory.
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+for module in %r:
+    __import__(module)
+print(json.dumps(dict(seconds=time.perf_counter() - start, heavy=[m for m in %r if m in sys.modules])))
+"""
+
+
+def import_time(modules: tuple = CORE_MODULES, runs: int = 5) -> tuple:
+    """Returns the median seconds to import modules in a fresh interpreter, and the heavy modules they loaded."""
+    seconds, heavy = [], set()
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', _SCRIPT % (tuple(modules), HEAVY_MODULES)],
+                                capture_output=True, text=True, check=True, cwd=_ROOT).stdout
+        result = json.loads(output)
+        seconds.append(result['seconds'])
+        heavy.update(result['heavy'])
+    return statistics.median(seconds), sorted(heavy)
+
+
+def check(budget: float = BUDGET, modules: tuple = CORE_MODULES, runs: int = 5) -> list:
+    """Returns the failures of the import budget, an empty list if it is met."""
+    seconds, heavy = import_time(modules, runs)
+    failures = []
+    if heavy:
+        failures.append("core imports load %s" % ", ".join(heavy))
+    if seconds > budget:
+        failures.append("core imports take %.3f s, over the budget of %.3f s" % (seconds, budget))
+    return failures
+
+
+def main(budget: float = BUDGET) -> int:
+    seconds, heavy = import_time()
+    print("core imports: %.1f ms (budget %.1f ms), heavy modules: %s" % (seconds * 1e3, budget * 1e3,
+                                                                        ", ".join(heavy) or "none"))
+    return 1 if heavy or seconds > budget else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(*(float(arg) for arg in sys.argv[1:])))
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 Zeroth-Principles
+#
+# This file is part of Zeroth-Meta.
+#
+#  Zeroth-Meta is free software: you can redistribute it and/or modify it under the
+#  terms of the GNU General Public License as published by the Free Software
+#  Foundation, either version 3 of the License, or (at your option) any later
+#  version.
+#
+#  Zeroth-Meta is distributed in the hope that it will be useful, but WITHOUT ANY
+#  WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+#  A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License along with
+#  Zeroth-Meta. If not, see <http://www.gnu.org/licenses/>.
+#
+"""Benchmark of the instantiation throughput and per-instance memory of the isolation modes of IsolatedMeta.
+
+Run with: python -m zpmeta.benchmarks.isolation [instances]
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+from zpmeta.singletons.singletons import IsolatedMeta, ISOLATION_MODES
+
+
+def _isolated_class(isolation: str) -> type:
+    class Isolated(metaclass=IsolatedMeta):
+        _isolation = isolation
+
+        def __init__(self, value: int = 0) -> None:
+            self.value = value
+
+    return Isolated
+
+
+def bench_isolation(isolation: str, instances: int = 10000) -> dict:
+    """Returns the instances created per second and the bytes allocated per live instance for a mode."""
+    cls = _isolated_class(isolation)
+    # Warm up, which also fills the pool of the pooled mode.
+    for i in range(min(instances, 100)):
+        cls(i)
+    gc.collect()
+
+    start = time.perf_counter()
+    for i in range(instances):
+        cls(i)
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    live = [cls(i) for i in range(instances)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del live
+    gc.collect()
+    return dict(isolation=isolation, instances=instances, per_second=instances / elapsed,
+                bytes_per_instance=current / instances)
+
+
+def main(instances: int = 10000) -> list:
+    results = [bench_isolation(isolation, instances) for isolation in ISOLATION_MODES]
+    for result in results:
+        print("%(isolation)-8s %(per_second)12.0f instances/s %(bytes_per_instance)10.0f bytes/instance" % result)
+    return results
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
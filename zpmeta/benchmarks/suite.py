@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 Zeroth-Principles
+#
+# This file is part of Zeroth-Meta.
+#
+#  Zeroth-Meta is free software: you can redistribute it and/or modify it under the
+#  terms of the GNU General Public License as published by the Free Software
+#  Foundation, either version 3 of the License, or (at your option) any later
+#  version.
+#
+#  Zeroth-Meta is distributed in the hope that it will be useful, but WITHOUT ANY
+#  WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+#  A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License along with
+#  Zeroth-Meta. If not, see <http://www.gnu.org/licenses/>.
+#
+"""Benchmark suite of the hot paths of zpmeta, on synthetic PanelSources and Funcs, with regression tracking.
+
+Each case is a function of its parameters returning a setup, and each setup a callable timed in a loop. Results
+are the best time per call over several repeats, saved as JSON to be compared across commits. Run with
+python -m zpmeta.benchmarks, see zpmeta/benchmarks/__main__.py.
+"""
+
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+from pandas import DataFrame, Index, Timedelta, Timestamp, date_range
+from zpmeta.benchmarks.isolation import _isolated_class
+from zpmeta.funcs.func import Func
+from zpmeta.funcs.maptools import MapOperands, MapParams
+from zpmeta.singletons.singletons import ISOLATION_MODES, MultitonMeta
+from zpmeta.sources.panelsource import PanelSource
+from zpmeta.utils.common_utils import deep_update
+
+START = Timestamp('2000-01-01')
+
+GRID = dict(depth=(1, 4, 8), entities=(10, 100, 1000), days=(250, 2500), operands=(10, 100, 1000))
+QUICK_GRID = dict(depth=(1, 4), entities=(10, 100), days=(250, ), operands=(10, 100))
+
+
+def nested_params(depth: int, width: int = 4) -> dict:
+    """Returns params nested depth levels deep, with width keys per level."""
+    params = {"leaf%d" % i: float(i) for i in range(width)}
+    for level in range(depth - 1):
+        params = dict({"level%d_%d" % (level, i): i for i in range(width - 1)}, child=params)
+    return params
+
+
+class SyntheticSource(PanelSource):
+    """PanelSource generating a deterministic float panel, appendable in ts, or in xs and ts if params['tiled']."""
+    def __init__(self, params: dict = None) -> None:
+        super(SyntheticSource, self).__init__(params)
+        self.appendable = dict(xs=self.params['tiled'], ts=True)
+
+    def _execute(self, call_type=None, entities=None, period=None) -> DataFrame:
+        index = date_range(period[0], period[1], freq='D', name='date')
+        ids = entities['id']
+        values = np.add.outer(np.arange(len(index), dtype=float), np.arange(len(ids), dtype=float))
+        return DataFrame(values, index=index, columns=Index(ids, name='id'))
+
+
+class SyntheticFunc(Func):
+    """Func scaling its operand. Nested params only add to the cost of overriding the params of each call."""
+    @classmethod
+    def _std_params(cls, name: str = None) -> dict:
+        return dict(scale=1.0)
+
+    @classmethod
+    def _execute(cls, operand=None, params: dict = None) -> object:
+        return operand * params['scale']
+
+
+class SyntheticMultiton(metaclass=MultitonMeta):
+    def __init__(self, params: dict = None) -> None:
+        self.params = params
+
+
+def _period(days: int) -> tuple:
+    return START, START + Timedelta(days=days - 1)
+
+
+def _entities(count: int) -> dict:
+    return dict(id=["E%05d" % i for i in range(count)])
+
+
+def bench_deep_update(depth: int):
+    base, update = nested_params(depth), nested_params(depth)
+    return lambda: deep_update(base, update)
+
+
+def bench_multiton_lookup(depth: int):
+    params = nested_params(depth)
+    SyntheticMultiton(params)
+    return lambda: SyntheticMultiton(params)
+
+
+def bench_isolated_instantiation(isolation: str):
+    cls = _isolated_class(isolation)
+    return lambda: cls(0)
+
+
+def bench_func_call(depth: int):
+    func, operand, params = SyntheticFunc(), np.ones(8), dict(nested_params(depth), scale=2.0)
+    return lambda: func(operand, params)
+
+
+def bench_panelsource_warm(entities: int, days: int):
+    source = SyntheticSource(dict(tiled=True))
+    request = _entities(entities), _period(days)
+    source(*request)
+    return lambda: source(*request)
+
+
+def bench_panelsource_incremental(entities: int, days: int, tiled: bool = False):
+    """Times calls extending the period of a loaded panel by one day each."""
+    source = SyntheticSource(dict(tiled=tiled))
+    request_entities, (start, end) = _entities(entities), _period(days)
+    source(request_entities, (start, end))
+    ends = itertools.count(1)
+    return lambda: source(request_entities, (start, end + Timedelta(days=next(ends))))
+
+
+def bench_map_operands(operands: int):
+    mapper, operand = MapOperands(SyntheticFunc()), {"op%d" % i: np.ones(8) for i in range(operands)}
+    return lambda: mapper(operand)
+
+
+def bench_map_params(operands: int):
+    mapper = MapParams(SyntheticFunc(), {"p%d" % i: dict(scale=float(i)) for i in range(operands)})
+    operand = np.ones(8)
+    return lambda: mapper(operand)
+
+
+def cases(grid: dict = None) -> dict:
+    """Returns the benchmark cases, a dict of name to a function returning the callable to time."""
+    grid = GRID if grid is None else grid
+    found = {}
+
+    def add(bench, **kwargs):
+        name = "%s[%s]" % (bench.__name__[len('bench_'):], ",".join("%s=%s" % item for item in kwargs.items()))
+        found[name] = lambda: bench(**kwargs)
+
+    for depth in grid['depth']:
+        add(bench_deep_update, depth=depth)
+        add(bench_multiton_lookup, depth=depth)
+        add(bench_func_call, depth=depth)
+    for isolation in ISOLATION_MODES:
+        add(bench_isolated_instantiation, isolation=isolation)
+    for entities, days in itertools.product(grid['entities'], grid['days']):
+        add(bench_panelsource_warm, entities=entities, days=days)
+        add(bench_panelsource_incremental, entities=entities, days=days)
+        add(bench_panelsource_incremental, entities=entities, days=days, tiled=True)
+    for operands in grid['operands']:
+        add(bench_map_operands, operands=operands)
+        add(bench_map_params, operands=operands)
+    return found
+
+
+def measure(setup, repeat: int = 5, min_time: float = 0.05) -> float:
+    """Returns the best seconds per call over repeat loops of at least min_time, each after a fresh setup."""
+    best = float('inf')
+    for _ in range(repeat):
+        call, number, elapsed = setup(), 0, 0.0
+        call()
+        start = time.perf_counter()
+        while elapsed < min_time:
+            call()
+            number += 1
+            elapsed = time.perf_counter() - start
+        best = min(best, elapsed / number)
+    return best
+
+
+def run(selected: dict, repeat: int = 5, min_time: float = 0.05, report=None) -> dict:
+    """Returns the seconds per call of the selected cases, calling report(name, seconds) after each."""
+    results = {}
+    for name, setup in selected.items():
+        results[name] = measure(setup, repeat, min_time)
+        if report is not None:
+            report(name, results[name])
+    return results
+
+
+def environment() -> dict:
+    """Returns the commit and versions the results were measured with."""
+    import pandas
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return dict(commit=commit, time=time.strftime('%Y-%m-%dT%H:%M:%S'), python=sys.version.split()[0],
+                numpy=np.__version__, pandas=pandas.__version__, machine=platform.platform())
+
+
+def save(results: dict, path: str) -> None:
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(dict(environment=environment(), results=results), file, indent=1, sort_keys=True)
+
+
+def load(path: str) -> dict:
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)['results']
+
+
+def compare(results: dict, baseline: dict, threshold: float = 0.25) -> list:
+    """Returns (name, baseline, current, ratio) for the cases slower than the baseline by more than threshold.
+
+    A threshold of 0.25 flags cases taking more than 1.25 times their baseline time. Cases missing from either
+    side are ignored.
+    """
+    if threshold < 0:
+        raise ValueError("threshold must be non-negative!")
+    regressions = []
+    for name, seconds in results.items():
+        if name in baseline and seconds > baseline[name] * (1 + threshold):
+            regressions.append((name, baseline[name], seconds, seconds / baseline[name]))
+    return regressions
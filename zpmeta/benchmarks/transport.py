@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 Zeroth-Principles
+#
+# This file is part of Zeroth-Meta.
+#
+#  Zeroth-Meta is free software: you can redistribute it and/or modify it under the
+#  terms of the GNU General Public License as published by the Free Software
+#  Foundation, either version 3 of the License, or (at your option) any later
+#  version.
+#
+#  Zeroth-Meta is distributed in the hope that it will be useful, but WITHOUT ANY
+#  WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+#  A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License along with
+#  Zeroth-Meta. If not, see <http://www.gnu.org/licenses/>.
+#
+"""Benchmark of passing operands and results to process pools through memory-mapped segments against pickling.
+
+Run with: python -m zpmeta.benchmarks.transport [size_mb ...]
+"""
+
+import sys
+import time
+from zpmeta.funcs.executors import ProcessExecutor
+from zpmeta.funcs.func import Func
+from zpmeta.funcs.maptools import MapOperands
+
+SIZES_MB = (1, 16, 256, 1024)
+
+
+class _Total(Func):
+    """Reads the operand and returns a scalar: measures the transport of operands."""
+    @classmethod
+    def _execute(cls, operand=None, params=None) -> float:
+        return float(operand.sum())
+
+
+class _Negate(Func):
+    """Returns a result as large as the operand: measures the round trip."""
+    @classmethod
+    def _execute(cls, operand=None, params=None):
+        return -operand
+
+
+def _time(executor, func, operand, repeat: int) -> float:
+    mapper = MapOperands(func, executor=executor)
+    mapper({'warmup': operand[:1]})
+    start = time.perf_counter()
+    for _ in range(repeat):
+        mapper({'operand': operand})
+    return (time.perf_counter() - start) / repeat
+
+
+def bench_transport(size_mb: int, repeat: int = 3) -> dict:
+    """Returns the seconds per call of pickled and shared transport for a float array of size_mb megabytes."""
+    import numpy as np
+    operand = np.random.default_rng(0).random((size_mb << 20) // 8)
+    result = dict(size_mb=size_mb)
+    for name, shared_memory in (('pickle', False), ('shared', True)):
+        with ProcessExecutor(max_workers=1, shared_memory=shared_memory) as executor:
+            result[name + '_operand'] = _time(executor, _Total(), operand, repeat)
+            result[name + '_round_trip'] = _time(executor, _Negate(), operand, repeat)
+    return result
+
+
+def main(*sizes_mb: int) -> list:
+    results = []
+    print("%8s %16s %16s %16s %16s" % ('MB', 'pickle operand', 'shared operand', 'pickle trip', 'shared trip'))
+    for size_mb in sizes_mb or SIZES_MB:
+        result = bench_transport(size_mb)
+        results.append(result)
+        print("%8d %15.4fs %15.4fs %15.4fs %15.4fs" % (
+            size_mb, result['pickle_operand'], result['shared_operand'], result['pickle_round_trip'],
+            result['shared_round_trip']))
+    return results
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 Zeroth-Principles
+#
+# This file is part of Zeroth-Meta.
+#
+#  Zeroth-Meta is free software: you can redistribute it and/or modify it under the
+#  terms of the GNU General Public License as published by the Free Software
+#  Foundation, either version 3 of the License, or (at your option) any later
+#  version.
+#
+#  Zeroth-Meta is distributed in the hope that it will be useful, but WITHOUT ANY
+#  WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+#  A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License along with
+#  Zeroth-Meta. If not, see <http://www.gnu.org/licenses/>.
+#
+"""Stacking of the operands and params of maps into blocks for batched execution of Funcs."""
+
+__copyright__ = '2023 Zeroth Principles'
+__license__ = 'GPLv3'
+__docformat__ = 'google'
+__author__ = 'Zeroth Principles Engineering'
+__email__ = 'engineering@zeroth-principles.com'
+
+import numbers
+from zpmeta.utils.fingerprint import fingerprint
+from zpmeta.utils.params import Params
+
+
+def stack_operands(operands: dict):
+    """Returns the operands stacked into one block, or None if they cannot be.
+
+    Series of the same numeric dtype sharing the same index are stacked as the columns of a DataFrame, and NumPy
+    arrays of the same shape and numeric dtype along a new last axis.
+    """
+    if len(operands) == 0:
+        return None
+    import numpy as np
+    from pandas import DataFrame, Series, api
+
+    values = list(operands.values())
+    first = values[0]
+    if isinstance(first, Series):
+        if not api.types.is_numeric_dtype(first.dtype) or not first.index.is_unique:
+            return None
+        if not all(isinstance(value, Series) and value.dtype == first.dtype for value in values):
+            return None
+        if not all(value.index is first.index or value.index.equals(first.index) for value in values[1:]):
+            return None
+        block = np.column_stack([value.to_numpy() for value in values])
+        return DataFrame(block, index=first.index, columns=list(operands.keys()), copy=False)
+    if isinstance(first, np.ndarray):
+        if first.dtype.kind not in 'biufc':
+            return None
+        if not all(isinstance(value, np.ndarray) and value.shape == first.shape and value.dtype == first.dtype
+                   for value in values):
+            return None
+        return np.stack(values, axis=-1)
+    return None
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, numbers.Number) and not isinstance(value, bool)
+
+
+def stack_params(params: dict) -> Params:
+    """Returns params stacking the values that differ across the params of a map, or None if they cannot be.
+
+    Each entry of params holds the params of one key. Values equal for every key are kept as they are; numeric
+    values differing across keys become 1-D NumPy arrays with one entry per key, in the order of the keys. Params
+    with differing keys, or differing values that are not numbers, cannot be stacked.
+    """
+    if len(params) == 0:
+        return None
+    import numpy as np
+
+    dicts = [value.to_dict() if isinstance(value, Params) else dict(value) for value in params.values()]
+    names = dicts[0].keys()
+    if any(d.keys() != names for d in dicts[1:]):
+        return None
+
+    stacked = {}
+    for name in names:
+        values = [d[name] for d in dicts]
+        if all(_is_number(value) for value in values):
+            stacked[name] = values[0] if len(set(values)) == 1 else np.array(values)
+        elif len(set(fingerprint(value) for value in values)) == 1:
+            stacked[name] = values[0]
+        else:
+            return None
+    return Params(stacked)
+
+
+def split_results(results, keys: list, names: list = None) -> dict:
+    """Returns the results of a batched call keyed like the batch.
+
+    The layout of the results is fixed rather than guessed from their length: results must be a DataFrame with one
+    column per key, or a NumPy array whose last axis has one entry per key, in the order of the keys. The columns
+    are taken by position, so they may be labelled by the keys or not; names gives the name each of them takes,
+    e.g. that of its operand, as the unbatched results would have.
+    """
+    import numpy as np
+    from pandas import DataFrame
+
+    if isinstance(results, DataFrame) and len(results.columns) == len(keys):
+        if names is None:
+            return {key: results.iloc[:, i] for i, key in enumerate(keys)}
+        return {key: results.iloc[:, i].rename(name) for i, (key, name) in enumerate(zip(keys, names))}
+    if isinstance(results, np.ndarray) and results.ndim > 0 and results.shape[-1] == len(keys):
+        return {key: results[..., i] for i, key in enumerate(keys)}
+    raise ValueError("Batched results must be a DataFrame with one column per key, or an array whose last axis has "
+                     "one entry per key!")
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 Zeroth-Principles
+#
+# This file is part of Zeroth-Meta.
+#
+#  Zeroth-Meta is free software: you can redistribute it and/or modify it under the
+#  terms of the GNU General Public License as published by the Free Software
+#  Foundation, either version 3 of the License, or (at your option) any later
+#  version.
+#
+#  Zeroth-Meta is distributed in the hope that it will be useful, but WITHOUT ANY
+#  WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+#  A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License along with
+#  Zeroth-Meta. If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Bounded memoization of Func results."""
+
+__copyright__ = '2023 Zeroth Principles'
+__license__ = 'GPLv3'
+__docformat__ = 'google'
+__author__ = 'Zeroth Principles Engineering'
+__email__ = 'engineering@zeroth-principles.com'
+
+import logging
+import threading
+from collections import OrderedDict
+from zpmeta.utils.fingerprint import approx_sizeof
+
+MISSING = object()
+
+
+class ResultCache:
+    """Least recently used cache bounded by number of entries and by approximate bytes.
+
+    A single cache may be shared by several Func instances, since the keys built by Func include the class,
+    the params and the operand. Cached results are returned as is, so callers must not mutate them.
+
+    Args:
+        max_entries: Maximum number of results kept. None for no limit.
+        max_bytes: Maximum approximate size of the results kept. None for no limit.
+    """
+    def __init__(self, max_entries: int = 128, max_bytes: int = None) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits, self.misses, self.evictions = 0, 0, 0
+
+    def __repr__(self):
+        return "%s(max_entries=%s, max_bytes=%s)" % (self.__class__.__name__, self.max_entries, self.max_bytes)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key) -> bool:
+        return key in self._data
+
+    def get(self, key, default=MISSING) -> object:
+        with self._lock:
+            entry = self._data.get(key, MISSING)
+            if entry is MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value) -> None:
+        size = approx_sizeof(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            logging.debug("ResultCache skipping result of %d bytes", size)
+            return
+
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous[1]
+            self._data[key] = (value, size)
+            self.nbytes += size
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._data and (
+                (self.max_entries is not None and len(self._data) > self.max_entries)
+                or (self.max_bytes is not None and self.nbytes > self.max_bytes)):
+            _, (_, size) = self._data.popitem(last=False)
+            self.nbytes -= size
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    @property
+    def stats(self) -> dict:
+        return dict(hits=self.hits, misses=self.misses, evictions=self.evictions,
+                    entries=len(self._data), nbytes=self.nbytes)
@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 Zeroth-Principles
+#
+# This file is part of Zeroth-Meta.
+#
+#  Zeroth-Meta is free software: you can redistribute it and/or modify it under the
+#  terms of the GNU General Public License as published by the Free Software
+#  Foundation, either version 3 of the License, or (at your option) any later
+#  version.
+#
+#  Zeroth-Meta is distributed in the hope that it will be useful, but WITHOUT ANY
+#  WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+#  A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License along with
+#  Zeroth-Meta. If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Execution backends used by the map tools to run independent branches."""
+
+__copyright__ = '2023 Zeroth Principles'
+__license__ = 'GPLv3'
+__docformat__ = 'google'
+__author__ = 'Zeroth Principles Engineering'
+__email__ = 'engineering@zeroth-principles.com'
+
+import itertools
+import logging
+import os
+import concurrent.futures
+from concurrent.futures import Future, as_completed, wait, FIRST_COMPLETED
+from zpmeta.funcs.transport import THRESHOLD, share, attach, release
+
+
+def _run_chunk(chunk: list) -> list:
+    """Runs a chunk of (key, func, operand, params) tasks and captures errors per key.
+
+    Defined at module level so that it can be pickled into worker processes.
+    """
+    outcomes = []
+    for key, func, operand, params in chunk:
+        try:
+            outcomes.append((key, True, func(operand, params)))
+        except Exception as err:  # pylint: disable=broad-except
+            outcomes.append((key, False, err))
+    return outcomes
+
+
+def _run_shared_chunk(chunk: list, directory: str = None, threshold: int = THRESHOLD) -> list:
+    """Runs a chunk whose operands were shared by the calling process, and shares the results back."""
+    chunk = [(key, func, attach(operand), params) for key, func, operand, params in chunk]
+    return [(key, ok, share(value, directory, threshold) if ok else value) for key, ok, value in _run_chunk(chunk)]
+
+
+class Executor:
+    """Superclass for the strategies used to run the branches of a map.
+
+    A task is a tuple (key, func, operand, params). Executing the tasks returns a dict keyed like the
+    input, holding the result of ``func(operand, params)`` for every key.
+
+    Args:
+        max_workers: Maximum number of workers. Ignored by the serial executor.
+        chunksize: Number of tasks sent to a worker at a time.
+        ordered: If True the results dict follows the order of the tasks, otherwise the order of completion.
+        errors: 'raise' to re-raise the first error, 'return' to store the exception under its key.
+    """
+    def __init__(self, max_workers: int = None, chunksize: int = 1, ordered: bool = True,
+                 errors: str = 'raise') -> None:
+        if chunksize < 1:
+            raise ValueError("chunksize must be a positive integer!")
+        if errors not in ('raise', 'return'):
+            raise ValueError("errors must be either 'raise' or 'return'!")
+        self.max_workers = max_workers
+        self.chunksize = chunksize
+        self.ordered = ordered
+        self.errors = errors
+
+    def __repr__(self):
+        return "%s(max_workers=%s, chunksize=%s, ordered=%s, errors=%s)" % (
+            self.__class__.__name__, self.max_workers, self.chunksize, self.ordered, self.errors)
+
+    def __call__(self, tasks) -> dict:
+        return self.map(tasks)
+
+    def map(self, tasks) -> dict:
+        tasks = list(tasks)
+        chunks = [tasks[i:i + self.chunksize] for i in range(0, len(tasks), self.chunksize)]
+        logging.debug("%s running %d tasks in %d chunks", self.__class__.__name__, len(tasks), len(chunks))
+
+        outcomes = {}
+        for outcome in self._run_chunks(chunks):
+            for key, ok, value in outcome:
+                if not ok and self.errors == 'raise':
+                    self.cancel()
+                    raise value
+                outcomes[key] = value
+
+        if self.ordered:
+            return {task[0]: outcomes[task[0]] for task in tasks}
+        return outcomes
+
+    def _run_chunks(self, chunks: list):
+        """Yields the outcomes of the chunks as lists of (key, ok, value)."""
+        raise NotImplementedError
+
+    def imap(self, tasks, window: int = None):
+        """Yields (key, result) for the tasks, any iterable of (key, func, operand, params), as they complete.
+
+        Tasks are read lazily and at most window of them are in flight, i.e. submitted and not yet yielded, so that
+        memory is bounded by the window rather than the number of tasks. Results completed together are yielded in
+        the order of their tasks. Errors are raised or yielded as results following errors.
+
+        Args:
+            tasks: Iterable or generator of tasks.
+            window: Maximum number of tasks in flight. Defaults to the chunksize for the serial executor, and to
+                two chunks per worker for pools.
+        """
+        window = self._default_window() if window is None else window
+        if window < 1:
+            raise ValueError("window must be a positive integer!")
+        tasks = iter(tasks)
+        inflight, count, exhausted = {}, 0, False
+        try:
+            while True:
+                while not exhausted and count < window:
+                    size = min(self.chunksize, window - count)
+                    chunk = list(itertools.islice(tasks, size))
+                    exhausted = len(chunk) < size
+                    if chunk:
+                        inflight[self.submit(chunk)] = len(chunk)
+                        count += len(chunk)
+                if not inflight:
+                    return
+
+                done, _ = wait(list(inflight), return_when=FIRST_COMPLETED)
+                for future in [future for future in inflight if future in done]:
+                    count -= inflight.pop(future)
+                    for key, ok, value in future.result():
+                        if not ok and self.errors == 'raise':
+                            raise value
+                        yield key, value
+        finally:
+            for future in inflight:
+                future.cancel()
+
+    def _default_window(self) -> int:
+        return self.chunksize
+
+    def submit(self, chunk: list) -> Future:
+        """Starts a chunk of tasks and returns a Future of its outcomes, a list of (key, ok, value).
+
+        Used by schedulers that submit tasks as their inputs become available instead of all at once.
+        """
+        raise NotImplementedError
+
+    def cancel(self) -> None:
+        pass
+
+    def shutdown(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+
+
+class SerialExecutor(Executor):
+    """Runs the tasks one after another in the calling thread."""
+    def _run_chunks(self, chunks: list):
+        for chunk in chunks:
+            yield _run_chunk(chunk)
+
+    def submit(self, chunk: list) -> Future:
+        future = Future()
+        future.set_result(_run_chunk(chunk))
+        return future
+
+
+class _PoolExecutor(Executor):
+    """Runs chunks of tasks on a lazily created and reused concurrent.futures pool.
+
+    The pool class is looked up by name when the first pool is created, so that process pools and multiprocessing
+    are only imported when used.
+    """
+    _pool_name = None
+
+    def __init__(self, max_workers: int = None, chunksize: int = 1, ordered: bool = True,
+                 errors: str = 'raise') -> None:
+        super(_PoolExecutor, self).__init__(max_workers, chunksize, ordered, errors)
+        self._pool = None
+        self._futures = []
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = getattr(concurrent.futures, self._pool_name)(max_workers=self.max_workers)
+        return self._pool
+
+    def _run_chunks(self, chunks: list):
+        self._futures = [self._submit(chunk) for chunk in chunks]
+        try:
+            if self.ordered:
+                for future in self._futures:
+                    yield self._collect(future.result())
+            else:
+                for future in as_completed(self._futures):
+                    yield self._collect(future.result())
+        finally:
+            self._futures = []
+
+    def submit(self, chunk: list) -> Future:
+        return self._submit(chunk)
+
+    def _default_window(self) -> int:
+        return 2 * (self.max_workers or os.cpu_count() or 1) * self.chunksize
+
+    def _submit(self, chunk: list) -> Future:
+        return self.pool.submit(_run_chunk, chunk)
+
+    def _collect(self, outcomes: list) -> list:
+        return outcomes
+
+    def cancel(self) -> None:
+        for future in self._futures:
+            future.cancel()
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def __getstate__(self):
+        # Pools cannot be pickled; a copy sent to another process creates its own pool when used.
+        state = self.__dict__.copy()
+        state['_pool'], state['_futures'] = None, []
+        return state
+
+
+class ThreadExecutor(_PoolExecutor):
+    """Runs the tasks on a thread pool. Suited to I/O bound funcs or funcs that release the GIL."""
+    _pool_name = 'ThreadPoolExecutor'
+
+
+class ProcessExecutor(_PoolExecutor):
+    """Runs the tasks on a process pool. Funcs, operands, params and results must be picklable.
+
+    With shared_memory, NumPy arrays and pandas DataFrames and Series of at least threshold bytes, alone or in the
+    dicts, lists and tuples of operands and results, are passed through memory-mapped segments instead of being
+    pickled; see zpmeta.funcs.transport. Each distinct operand of a map is written once, whatever the number of
+    tasks using it, and funcs receive read-only views of it: they must copy operands they modify.
+
+    Args:
+        shared_memory: If True, pass large operands and results through memory-mapped segments.
+        threshold: Size in bytes from which values are passed through segments.
+        directory: Directory of the segments, /dev/shm by default where available.
+    """
+    _pool_name = 'ProcessPoolExecutor'
+
+    def __init__(self, max_workers: int = None, chunksize: int = 1, ordered: bool = True, errors: str = 'raise',
+                 shared_memory: bool = False, threshold: int = THRESHOLD, directory: str = None) -> None:
+        super(ProcessExecutor, self).__init__(max_workers, chunksize, ordered, errors)
+        self.shared_memory = shared_memory
+        self.threshold = threshold
+        self.directory = directory
+
+    def map(self, tasks) -> dict:
+        if not self.shared_memory:
+            return super(ProcessExecutor, self).map(tasks)
+
+        handles = {}
+        def shared(operand):
+            if id(operand) not in handles:
+                # Keep the operand referenced so that its id is not reused during the map.
+                handles[id(operand)] = operand, share(operand, self.directory, self.threshold)
+            return handles[id(operand)][1]
+
+        try:
+            tasks = [(key, func, shared(operand), params) for key, func, operand, params in tasks]
+            return super(ProcessExecutor, self).map(tasks)
+        finally:
+            for _, handle in handles.values():
+                release(handle)
+
+    def submit(self, chunk: list) -> Future:
+        if not self.shared_memory:
+            return self._submit(chunk)
+
+        chunk = [(key, func, share(operand, self.directory, self.threshold), params)
+                 for key, func, operand, params in chunk]
+        outer = Future()
+
+        def done(inner: Future) -> None:
+            for task in chunk:
+                release(task[2])
+            if inner.cancelled():
+                outer.cancel()
+            elif inner.exception() is not None:
+                outer.set_exception(inner.exception())
+            elif outer.cancelled():
+                for _, _, value in inner.result():
+                    release(value)
+            else:
+                outer.set_result(self._collect(inner.result()))
+
+        self._submit(chunk).add_done_callback(done)
+        return outer
+
+    def cancel(self) -> None:
+        super(ProcessExecutor, self).cancel()
+        if not self.shared_memory:
+            return
+        # Chunks already running cannot be cancelled: wait for them and remove the segments of their results, which
+        # would otherwise never be collected. Segments of collected chunks are already removed, which is harmless.
+        for future in self._futures:
+            if future.cancelled():
+                continue
+            try:
+                outcomes = future.result()
+            except Exception:  # pylint: disable=broad-except
+                continue
+            for _, ok, value in outcomes:
+                if ok:
+                    release(value)
+
+    def _submit(self, chunk: list) -> Future:
+        if not self.shared_memory:
+            return self.pool.submit(_run_chunk, chunk)
+        return self.pool.submit(_run_shared_chunk, chunk, self.directory, self.threshold)
+
+    def _collect(self, outcomes: list) -> list:
+        if not self.shared_memory:
+            return outcomes
+        collected = []
+        for key, ok, value in outcomes:
+            # The views stay valid once the segments are removed.
+            collected.append((key, ok, attach(value)))
+            release(value)
+        return collected
+
+
+EXECUTORS = dict(serial=SerialExecutor, thread=ThreadExecutor, process=ProcessExecutor)
+
+
+def get_executor(executor=None, **kwargs) -> Executor:
+    """Returns an Executor given None, an Executor instance or one of the names in EXECUTORS."""
+    if executor is None:
+        return SerialExecutor(**kwargs)
+    if isinstance(executor, Executor):
+        return executor
+    if isinstance(executor, str):
+        if executor not in EXECUTORS:
+            raise ValueError("executor must be one of %s!" % list(EXECUTORS))
+        return EXECUTORS[executor](**kwargs)
+    raise TypeError("executor must be None, a str, or an Executor!")
@@ -26,12 +26,28 @@ __email__ = 'engineering@zeroth-principles.com'
 
 import logging
 import abc
-from zpmeta.utils.common_utils import deep_update
+from collections.abc import Mapping
+from zpmeta.utils.params import Params
+from zpmeta.utils.fingerprint import fingerprint
+from zpmeta.utils import instrument
+from zpmeta.funcs.cache import ResultCache, MISSING
+from zpmeta.funcs.batch import stack_operands, stack_params, split_results
 
 
 class Func(metaclass=abc.ABCMeta):
     """Callable class  used to impose a structure on data processing
 
+    Args:
+        params: Name of the standard params, a tuple of the name and overrides, or a dict of overrides.
+        xfunc: Callable applied to the operand before execution.
+        cache: Opt-in memoization of results. True for a private ResultCache, or a ResultCache that may be
+            shared with other instances. Cached results are returned as is and must not be mutated.
+
+    Attributes:
+        stages: Optional declaration of the pipeline of the func for sweeps, a tuple of (name, param names) per
+            stage, upstream first. Funcs declaring stages implement _execute_stage, and a Sweep then runs each
+            stage once per distinct combination of the params of that stage and of the stages upstream of it.
+
     Raises:
         TypeError: _description_
 
@@ -39,21 +55,24 @@ class Func(metaclass=abc.ABCMeta):
         results: Results of the function
     """    
 
-    def __init__(self, params: dict = None, xfunc=None) -> None:
+    stages = ()
+
+    def __init__(self, params: dict = None, xfunc=None, cache=None) -> None:
         if params is None or isinstance(params, str):
-            self.params = self._std_params(params)
+            self.params = Params(self._std_params(params))
         elif isinstance(params, tuple):
-            self.params = self._std_params(params[0])
-            self.params = deep_update(self.params, params)
-        elif isinstance(params, dict):
-            self.params = self._std_params()
-            self.params = deep_update(self.params, params)
+            self.params = Params(self._std_params(params[0]))
+            self.params = self.params.override(params[1] if len(params) > 1 else None)
+        elif isinstance(params, Mapping):
+            self.params = Params(self._std_params())
+            self.params = self.params.override(params)
         else:
             raise TypeError("params must be a str, tuple, or a dict!")
         
         logging.info("INIT %s %s", self.__class__.__name__, self.params)
 
         self.xfunc = xfunc
+        self.cache = ResultCache() if cache is True else cache
 
     @classmethod
     def _std_params(cls, name: str = None) -> dict:
@@ -61,20 +80,139 @@ class Func(metaclass=abc.ABCMeta):
 
     def __call__(self, operand=None, params: dict = None) -> object:
         if params is not None:
-            params = deep_update(self.params, params)
+            params = self.params.override(params)
         else:
             params = self.params
         
+        if self.cache is not None:
+            key = self._cache_key(operand, params)
+            results = self.cache.get(key)
+            if results is not MISSING:
+                if instrument.active:
+                    instrument.record('func', self.__class__.__name__, 'cached')
+                return results
+
+        if instrument.active:
+            timer = instrument.Timer()
+            if callable(self.xfunc):
+                operand = self.xfunc(operand)
+            results = self._execute(operand, params)
+            instrument.record('func', self.__class__.__name__, 'execute', **timer.elapsed())
+        else:
+            if callable(self.xfunc):
+                operand = self.xfunc(operand)
+            results = self._execute(operand, params)
+
+        if self.cache is not None:
+            self.cache.put(key, results)
+        return results
+
+    def _cache_key(self, operand=None, params: dict = None) -> tuple:
+        return self.__class__, fingerprint(params), fingerprint(self.xfunc), fingerprint(operand)
+
+    @property
+    def supports_incremental(self) -> bool:
+        hook = type(self)._execute_incremental
+        return getattr(hook, '__func__', hook) is not Func._execute_incremental.__func__
+
+    def run_incremental(self, delta=None, state=None, params: dict = None) -> tuple:
+        """Returns (results, state) for rows appended to the operand, see _execute_incremental.
+
+        The xfunc, if any, is applied to the delta and must therefore work row by row.
+        """
+        params = self.params if params is None else self.params.override(params)
+        if callable(self.xfunc):
+            delta = self.xfunc(delta)
+        return self._execute_incremental(delta, state, params)
+
+    @property
+    def supports_batch(self) -> bool:
+        hook = type(self)._execute_batch
+        return getattr(hook, '__func__', hook) is not Func._execute_batch.__func__
+
+    def run_batch_operands(self, operands: dict, params: dict = None) -> dict:
+        """Returns the results for each of the operands, with one call of _execute_batch.
+
+        Returns None if the operands cannot be stacked or the func does not batch operands, in which case they
+        must be processed one by one.
+        """
+        params = self.params if params is None else self.params.override(params)
+        if callable(self.xfunc):
+            operands = {key: self.xfunc(operand) for key, operand in operands.items()}
+        block = stack_operands(operands)
+        if block is None:
+            return None
+        try:
+            results = self._execute_batch(block, params, 'operand')
+        except NotImplementedError:
+            return None
+        names = [getattr(operand, 'name', None) for operand in operands.values()]
+        return split_results(results, list(operands), names)
+
+    def run_batch_params(self, operand=None, params: dict = None) -> dict:
+        """Returns the results for each of the params, a dict of key to params, with one call of _execute_batch.
+
+        Returns None if the params cannot be stacked or the func does not batch params.
+        """
+        block = stack_params({key: self.params.override(sub_params) for key, sub_params in params.items()})
+        if block is None:
+            return None
         if callable(self.xfunc):
             operand = self.xfunc(operand)
-        
-        results = self._execute(operand, params)        
-        return results
+        try:
+            results = self._execute_batch(operand, block, 'params')
+        except NotImplementedError:
+            return None
+        return split_results(results, list(params), [getattr(operand, 'name', None)] * len(params))
+
+    @property
+    def supports_stages(self) -> bool:
+        return len(self.stages) > 0
 
     @staticmethod
     def check_consistency(operand=None, params: dict = None) -> object:
         pass
 
+    @classmethod
+    def _execute_incremental(cls, delta=None, state=None, params: dict = None) -> tuple:
+        """Optional hook returning (results, state) for the rows delta appended to the operand.
+
+        The state is whatever the previous call returned, and None on the first call, whose delta is then the whole
+        operand. The results must equal the rows of _execute over the whole operand for the rows of delta, so that
+        rolling and cumulative transforms cost in proportion to the delta rather than the history.
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def _execute_batch(cls, operand=None, params: dict = None, batched: str = 'operand') -> object:
+        """Optional hook running the func over a batch in one vectorized call.
+
+        If batched is 'operand', operand stacks the operands of a MapOperands, as the columns of a DataFrame for
+        Series or along a new last axis for arrays, and params are shared. If batched is 'params', the operand is
+        shared and params hold 1-D arrays, with one entry per member of the batch, for the values differing across
+        the params of a MapParams. The results must be a DataFrame with one column per member, or an array whose last
+        axis has one entry per member, in order; see zpmeta.funcs.batch.split_results. Raise NotImplementedError for
+        unsupported batches.
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def _execute_stage(cls, name: str, operand=None, params: dict = None) -> object:
+        """Optional hook running the stage name of the func declared in stages.
+
+        The operand of the first stage is the operand of the func, and that of every other stage the result of the
+        previous one; the result of the last stage is the result of the func. A stage may only read the params
+        declared for it and for the stages upstream of it.
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def _execute_stages(cls, operand=None, params: dict = None) -> object:
+        """Runs every stage in order, for funcs declaring stages to implement _execute with."""
+        for name, _ in cls.stages:
+            operand = cls._execute_stage(name, operand, params)
+        return operand
+
     @classmethod
     @abc.abstractmethod
     def _execute(cls, operand=None, params: dict = None) -> object:
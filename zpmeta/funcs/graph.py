@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 Zeroth-Principles
+#
+# This file is part of Zeroth-Meta.
+#
+#  Zeroth-Meta is free software: you can redistribute it and/or modify it under the
+#  terms of the GNU General Public License as published by the Free Software
+#  Foundation, either version 3 of the License, or (at your option) any later
+#  version.
+#
+#  Zeroth-Meta is distributed in the hope that it will be useful, but WITHOUT ANY
+#  WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+#  A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License along with
+#  Zeroth-Meta. If not, see <http://www.gnu.org/licenses/>.
+#
+"""Graphs wiring Funcs and maps into a DAG, with deduplication of shared steps and parallel scheduling."""
+
+__copyright__ = '2023 Zeroth Principles'
+__license__ = 'GPLv3'
+__docformat__ = 'google'
+__author__ = 'Zeroth Principles Engineering'
+__email__ = 'engineering@zeroth-principles.com'
+
+import logging
+import types
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from zpmeta.funcs.executors import get_executor
+from zpmeta.utils.fingerprint import fingerprint
+
+
+class Node:
+    """Step of a Graph: func(operand, params), where the operand may contain the outputs of other nodes.
+
+    Nodes are created by Graph.add and Graph.input, not directly. Nodes without func are inputs of the graph.
+    """
+    __slots__ = ('key', 'func', 'operand', 'params', 'name', 'dependencies')
+
+    def __init__(self, key: tuple, func=None, operand=None, params=None, name: str = None) -> None:
+        self.key = key
+        self.func = func
+        self.operand = operand
+        self.params = params
+        self.name = name
+        self.dependencies = list(dict.fromkeys(_nodes_in(operand)))
+
+    def __repr__(self):
+        if self.func is None:
+            return "%s(input=%s)" % (self.__class__.__name__, self.name)
+        return "%s(func=%s, dependencies=%d)" % (self.__class__.__name__, self.func, len(self.dependencies))
+
+
+def _nodes_in(operand):
+    if isinstance(operand, Node):
+        yield operand
+    elif isinstance(operand, dict):
+        for value in operand.values():
+            yield from _nodes_in(value)
+    elif isinstance(operand, (list, tuple)):
+        for value in operand:
+            yield from _nodes_in(value)
+
+
+def _operand_key(operand):
+    if isinstance(operand, Node):
+        return 'node', operand.key
+    if isinstance(operand, dict) and any(True for _ in _nodes_in(operand)):
+        return 'dict', tuple((key, _operand_key(value)) for key, value in operand.items())
+    if isinstance(operand, (list, tuple)) and any(True for _ in _nodes_in(operand)):
+        return type(operand).__name__, tuple(_operand_key(value) for value in operand)
+    return 'value', fingerprint(operand)
+
+
+def _func_key(func):
+    """Returns the key of func in a Graph: its fingerprint when that describes its behaviour, else its identity.
+
+    Functions, Funcs and maps, i.e. objects with params, and objects defining __fingerprint__ are merged by
+    fingerprint. Other callable instances may hold state the fingerprint does not see, so only the same instance
+    is merged.
+    """
+    if (isinstance(func, (type, types.FunctionType, types.BuiltinFunctionType)) or hasattr(func, '__fingerprint__')
+            or getattr(func, 'params', None) is not None):
+        return 'fingerprint', fingerprint(func)
+    return 'id', id(func)
+
+
+def _resolve(operand, results: dict):
+    """Returns operand with its nodes replaced by their results."""
+    if isinstance(operand, Node):
+        return results[operand.key]
+    if isinstance(operand, dict):
+        return {key: _resolve(value, results) for key, value in operand.items()}
+    if isinstance(operand, (list, tuple)):
+        return type(operand)(_resolve(value, results) for value in operand)
+    return operand
+
+
+class Graph:
+    """DAG of calls of Funcs, maps or any callable taking (operand, params).
+
+    Steps are added with add, whose operand may hold the nodes of earlier steps, alone or in dicts, lists and tuples.
+    Adding a step identical to an existing one, i.e. the same func, params and operand according to their
+    fingerprints, returns the existing node, so that steps shared by several outputs run once. Callable instances
+    without params or __fingerprint__ are only merged with steps of the same instance.
+
+    Running the graph only executes the steps needed by the requested outputs. Steps whose inputs are ready run on
+    the executor as soon as possible, so that independent branches run in parallel on a thread or process
+    executor. The result of a step is dropped as soon as the last step using it finishes, unless it is an output.
+
+    Args:
+        executor: None for serial execution, an Executor, or one of the names in zpmeta.funcs.executors.EXECUTORS.
+    """
+    def __init__(self, executor=None) -> None:
+        self.executor = get_executor(executor)
+        self._nodes = {}
+
+    def __repr__(self):
+        return "%s(nodes=%d, executor=%s)" % (self.__class__.__name__, len(self._nodes), self.executor)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def input(self, name: str) -> Node:
+        """Returns the node of an input of the graph, whose value is given when running it."""
+        return self._node(('input', name), name=name)
+
+    def add(self, func, operand=None, params: dict = None) -> Node:
+        """Returns the node of func(operand, params), adding it unless an identical step exists."""
+        if not callable(func):
+            raise TypeError("func must be callable!")
+        key = (_func_key(func), fingerprint(params), _operand_key(operand))
+        return self._node(key, func=func, operand=operand, params=params)
+
+    def _node(self, key: tuple, **kwargs) -> Node:
+        node = self._nodes.get(key)
+        if node is None:
+            node = self._nodes[key] = Node(key, **kwargs)
+        return node
+
+    def run(self, outputs, inputs: dict = None):
+        """Returns the results of outputs, a node or a dict, list or tuple of nodes, given the values of inputs."""
+        inputs = dict() if inputs is None else inputs
+        targets = list(dict.fromkeys(_nodes_in(outputs)))
+        needed = self._needed(targets)
+        kept = set(node.key for node in targets)
+
+        consumers, waiting = {}, {}
+        for node in needed:
+            waiting[node.key] = len(node.dependencies)
+            for dependency in node.dependencies:
+                consumers.setdefault(dependency.key, []).append(node)
+
+        results, running = {}, {}
+        ready = [node for node in needed if not node.dependencies]
+        logging.debug("GRAPH running %d of %d nodes", len(needed), len(self._nodes))
+        try:
+            while ready or running:
+                for node in ready:
+                    if node.func is None:
+                        if node.name not in inputs:
+                            raise KeyError("Missing the value of the input %s!" % node.name)
+                        running[_completed(node.key, inputs[node.name])] = node
+                    else:
+                        task = (node.key, node.func, _resolve(node.operand, results), node.params)
+                        running[self.executor.submit([task])] = node
+                ready = []
+
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    node = running.pop(future)
+                    key, ok, value = future.result()[0]
+                    if not ok:
+                        raise value
+                    results[key] = value
+                    for dependency in node.dependencies:
+                        consumers[dependency.key].remove(node)
+                        if not consumers[dependency.key] and dependency.key not in kept:
+                            del results[dependency.key]
+                    for consumer in consumers.get(key, ()):
+                        waiting[consumer.key] -= 1
+                        if waiting[consumer.key] == 0:
+                            ready.append(consumer)
+        except BaseException:
+            for future in running:
+                future.cancel()
+            raise
+
+        return _resolve(outputs, results)
+
+    @staticmethod
+    def _needed(targets: list) -> list:
+        needed, stack = {}, list(targets)
+        while stack:
+            node = stack.pop()
+            if node.key not in needed:
+                needed[node.key] = node
+                stack.extend(node.dependencies)
+        return list(needed.values())
+
+
+def _completed(key: tuple, value) -> Future:
+    future = Future()
+    future.set_result([(key, True, value)])
+    return future
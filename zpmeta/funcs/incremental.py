@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 Zeroth-Principles
+#
+# This file is part of Zeroth-Meta.
+#
+#  Zeroth-Meta is free software: you can redistribute it and/or modify it under the
+#  terms of the GNU General Public License as published by the Free Software
+#  Foundation, either version 3 of the License, or (at your option) any later
+#  version.
+#
+#  Zeroth-Meta is distributed in the hope that it will be useful, but WITHOUT ANY
+#  WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+#  A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License along with
+#  Zeroth-Meta. If not, see <http://www.gnu.org/licenses/>.
+#
+"""Incremental recomputation of Funcs over operands growing by appended rows, such as PanelSource panels."""
+
+__copyright__ = '2023 Zeroth Principles'
+__license__ = 'GPLv3'
+__docformat__ = 'google'
+__author__ = 'Zeroth Principles Engineering'
+__email__ = 'engineering@zeroth-principles.com'
+
+import logging
+import threading
+from pandas import DataFrame, concat
+from zpmeta.sources.blocks import PanelBlocks
+
+
+class IncrementalFunc:
+    """Keeps the results of a Func up to date with an operand growing by appended rows.
+
+    Funcs implementing _execute_incremental only process the appended rows, given the state saved from the previous
+    ones; their results are appended to value. Other Funcs are run again over the whole operand.
+
+    Attached to a PanelSource, the results follow every update of its cache: appends are processed incrementally,
+    while changes to earlier rows or new columns reprocess the whole panel.
+
+    Args:
+        func: The Func.
+        params: Params overriding those of func.
+    """
+    def __init__(self, func, params: dict = None) -> None:
+        self.func = func
+        self.params = params
+        self.state = None
+        self._blocks, self._value = None, None
+        self._lock = threading.RLock()
+
+    def __repr__(self):
+        return "%s(func=%s)" % (self.__class__.__name__, self.func)
+
+    @property
+    def value(self):
+        if self._blocks is not None:
+            return self._blocks.frame()
+        return self._value
+
+    def recompute(self, operand=None):
+        """Processes the whole operand, discarding the saved state and results."""
+        with self._lock:
+            self._blocks, self._value, self.state = None, None, None
+            if operand is None:
+                return None
+            if self.func.supports_incremental:
+                results, self.state = self.func.run_incremental(operand, None, self.params)
+            else:
+                results = self.func(operand, self.params)
+            self._append(results)
+            return self.value
+
+    def append(self, delta):
+        """Processes rows appended to the operand and returns the results for the whole operand."""
+        with self._lock:
+            if not self.func.supports_incremental:
+                raise TypeError("%s does not implement _execute_incremental!" % self.func.__class__.__name__)
+            if self.state is None and self.value is None:
+                return self.recompute(delta)
+            results, self.state = self.func.run_incremental(delta, self.state, self.params)
+            self._append(results)
+            return self.value
+
+    def _append(self, results) -> None:
+        if results is None or len(results) == 0:
+            return
+        if isinstance(results, DataFrame) and (self._blocks is not None or self._value is None):
+            if self._blocks is None and PanelBlocks.supports(results):
+                self._blocks = PanelBlocks()
+            if self._blocks is not None:
+                try:
+                    self._blocks.append(results)
+                    return
+                except TypeError:
+                    self._value, self._blocks = self._blocks.frame(), None
+        self._value = results if self._value is None else concat([self._value, results])
+
+    def attach(self, source) -> 'IncrementalFunc':
+        """Follows the updates of a PanelSource, starting from its current cache."""
+        source.subscribe(self._on_update)
+        self.recompute(source.value)
+        return self
+
+    def detach(self, source) -> None:
+        source.unsubscribe(self._on_update)
+
+    def _on_update(self, source, delta) -> None:
+        if delta is None or not self.func.supports_incremental:
+            logging.info("RECOMPUTE %s", self.func.__class__.__name__)
+            self.recompute(source.value)
+        elif len(delta) > 0:
+            logging.info("INCREMENTAL %s: %d rows", self.func.__class__.__name__, len(delta))
+            self.append(delta)
@@ -24,75 +24,143 @@ __docformat__ = 'google'
 __author__ = 'Zeroth Principles Engineering'
 __email__ = 'engineering@zeroth-principles.com'
 
-import logging
-from zpmeta.utils.common_utils import deep_update
+from collections.abc import Mapping
+from zpmeta.utils.params import Params
+from zpmeta.funcs.executors import get_executor
+from zpmeta.utils.fingerprint import fingerprint
+from zpmeta.utils import instrument
 
 
 class MapFuncs:
-    def __init__(self, func, params=None) -> None:
+    def __init__(self, func, params=None, executor=None) -> None:
         self.func = func
-        self.params = params
+        self.params = Params(params)
+        self.executor = get_executor(executor)
 
+    def __fingerprint__(self) -> str:
+        # The executor only changes how the map runs, not its results.
+        return fingerprint((self.__class__, self.func, self.params))
+
+    @instrument.instrumented('map')
     def __call__(self, operand=None, params: dict = None) -> object:
-        if params is not None:
-            params = deep_update(self.params, params)
-        else:
-            params = self.params.copy()
+        params = self.params.override(params)
 
-        results = {}
-        for key, func in self.func.items():
-            results[key] = func(operand, params)
+        tasks = ((key, func, operand, params) for key, func in self.func.items())
+        results = self.executor.map(tasks)
 
         return results
 
+    def stream(self, operand=None, funcs=None, params: dict = None, window: int = None):
+        """Yields (key, result) as the calls complete, for funcs given as a mapping or an iterable of (key, func).
+
+        Defaults to the funcs of the map. See Executor.imap for the window.
+        """
+        params = self.params.override(params)
+        funcs = self.func if funcs is None else funcs
+        funcs = funcs.items() if isinstance(funcs, Mapping) else funcs
+
+        tasks = ((key, func, operand, params) for key, func in funcs)
+        return self.executor.imap(tasks, window)
+
 
 class MapParams:
-    def __init__(self, func, params=None) -> None:
+    def __init__(self, func, params=None, executor=None) -> None:
         self.func = func
-        self.params = params
+        self.params = Params(params)
+        self.executor = get_executor(executor)
+
+    def __fingerprint__(self) -> str:
+        # The executor only changes how the map runs, not its results.
+        return fingerprint((self.__class__, self.func, self.params))
 
+    @instrument.instrumented('map')
     def __call__(self, operand=None, params: dict = None) -> object:
-        if params is not None:
-            params = deep_update(self.params, params)
-        else:
-            params = self.params.copy()
+        params = self.params.override(params)
+
+        if getattr(self.func, 'supports_batch', False):
+            results = self.func.run_batch_params(operand, params)
+            if results is not None:
+                return results
 
-        results = {}
-        for key, sub_params in params.items():
-            results[key] = self.func(operand, sub_params)
+        tasks = ((key, self.func, operand, sub_params) for key, sub_params in params.items())
+        results = self.executor.map(tasks)
 
         return results
 
+    def stream(self, operand=None, params=None, window: int = None):
+        """Yields (key, result) as the calls complete, for params given as a mapping or an iterable of (key, params).
+
+        The params override those of the map like in calls, so the map's own keys are also run. Params given as an
+        iterable are read, and merged with those of the map, only as the window frees up; the keys of the map not
+        among them run last. Unlike calls, streams never take the batch path, which needs every member at once. See
+        Executor.imap for the window.
+        """
+        if params is None or isinstance(params, Mapping):
+            params = self.params.override(params).items()
+        else:
+            params = self._override(params)
+
+        tasks = ((key, self.func, operand, sub_params) for key, sub_params in params)
+        return self.executor.imap(tasks, window)
+
+    def _override(self, params):
+        seen = set()
+        for key, sub_params in params:
+            seen.add(key)
+            yield key, self.params.override({key: sub_params})[key]
+        for key, sub_params in self.params.items():
+            if key not in seen:
+                yield key, sub_params
+
 
 class MapOperands:
-    def __init__(self, func, params=None) -> None:
+    def __init__(self, func, params=None, executor=None) -> None:
         self.func = func
-        self.params = params
+        self.params = Params(params)
+        self.executor = get_executor(executor)
+
+    def __fingerprint__(self) -> str:
+        # The executor only changes how the map runs, not its results.
+        return fingerprint((self.__class__, self.func, self.params))
 
+    @instrument.instrumented('map')
     def __call__(self, operand=None, params: dict = None) -> object:
-        if params is not None:
-            params = deep_update(self.params, params)
-        else:
-            params = self.params.copy()
+        params = self.params.override(params)
+
+        if getattr(self.func, 'supports_batch', False):
+            results = self.func.run_batch_operands(operand, params)
+            if results is not None:
+                return results
 
-        results = {}
-        for key, sub_operand in operand.items():
-            results[key] = self.func(sub_operand, params)
+        tasks = ((key, self.func, sub_operand, params) for key, sub_operand in operand.items())
+        results = self.executor.map(tasks)
 
         return results
 
+    def stream(self, operand=None, params: dict = None, window: int = None):
+        """Yields (key, result) as the calls complete, for operands given as a mapping or an iterable of (key, operand).
+
+        Operands are read from the iterable only as the window frees up, so generators may produce more data than
+        fits in memory. Unlike calls, streams never take the batch path. See Executor.imap for the window.
+        """
+        params = self.params.override(params)
+        operand = operand.items() if isinstance(operand, Mapping) else operand
+
+        tasks = ((key, self.func, sub_operand, params) for key, sub_operand in operand)
+        return self.executor.imap(tasks, window)
+
 
 class Funcify:
     def __init__(self, target_callable, operand_key, default_params=None) -> None:
         self.target_callable = target_callable
         self.operand_key = operand_key
-        self.default_params = default_params
+        self.default_params = Params(default_params)
+
+    def __fingerprint__(self) -> str:
+        return fingerprint((self.__class__, self.target_callable, self.operand_key, self.default_params))
 
     def __call__(self, operand=None, params: dict = None) -> object:
-        if params is not None:
-            params = deep_update(self.default_params, params)
-        else:
-            params = self.default_params.copy()
+        params = self.default_params.override(params).to_dict()
         
         if self.operand_key is not None:
             params[self.operand_key] = operand
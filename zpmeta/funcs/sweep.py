@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 Zeroth-Principles
+#
+# This file is part of Zeroth-Meta.
+#
+#  Zeroth-Meta is free software: you can redistribute it and/or modify it under the
+#  terms of the GNU General Public License as published by the Free Software
+#  Foundation, either version 3 of the License, or (at your option) any later
+#  version.
+#
+#  Zeroth-Meta is distributed in the hope that it will be useful, but WITHOUT ANY
+#  WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+#  A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License along with
+#  Zeroth-Meta. If not, see <http://www.gnu.org/licenses/>.
+#
+"""Parameter sweeps over lazily generated grids, sharing the upstream stages of Funcs between combinations."""
+
+__copyright__ = '2023 Zeroth Principles'
+__license__ = 'GPLv3'
+__docformat__ = 'google'
+__author__ = 'Zeroth Principles Engineering'
+__email__ = 'engineering@zeroth-principles.com'
+
+import itertools
+import logging
+import random
+from concurrent.futures import wait, FIRST_COMPLETED
+from zpmeta.utils.params import Params
+from zpmeta.funcs.executors import get_executor
+from zpmeta.utils.fingerprint import fingerprint
+
+
+class Grid:
+    """Cartesian product of parameter values, generated one combination at a time.
+
+    Combinations are dicts of param name to value, iterated with the last axis changing fastest.
+
+    Args:
+        axes: Dict of param name to the list of its values.
+    """
+    def __init__(self, axes: dict) -> None:
+        self.axes = {name: list(values) for name, values in axes.items()}
+
+    def __repr__(self):
+        return "%s(%s)" % (self.__class__.__name__, {name: len(values) for name, values in self.axes.items()})
+
+    def __fingerprint__(self) -> str:
+        return fingerprint((self.__class__, self.axes))
+
+    def __len__(self) -> int:
+        size = 1
+        for values in self.axes.values():
+            size *= len(values)
+        return size
+
+    def __iter__(self):
+        names = list(self.axes)
+        for values in itertools.product(*self.axes.values()):
+            yield dict(zip(names, values))
+
+    def ordered(self, names: list) -> 'Grid':
+        """Returns the grid with the axes of names first, in that order, so that they change slowest."""
+        first = [name for name in names if name in self.axes]
+        return Grid({name: self.axes[name] for name in first + [name for name in self.axes if name not in first]})
+
+
+class RandomSearch:
+    """Random combinations of parameter values, generated one at a time.
+
+    Args:
+        axes: Dict of param name to either the list of its values, drawn uniformly, or a callable drawing a value
+            from the random.Random instance it is given.
+        n: Number of combinations.
+        seed: Seed of the generator. Iterating twice with a seed yields the same combinations.
+    """
+    def __init__(self, axes: dict, n: int, seed=None) -> None:
+        if n < 0:
+            raise ValueError("n must be non-negative!")
+        self.axes = dict(axes)
+        self.n = n
+        self.seed = seed
+
+    def __repr__(self):
+        return "%s(axes=%s, n=%d, seed=%s)" % (self.__class__.__name__, list(self.axes), self.n, self.seed)
+
+    def __len__(self) -> int:
+        return self.n
+
+    def __iter__(self):
+        rng = random.Random(self.seed)
+        for _ in range(self.n):
+            yield {name: values(rng) if callable(values) else rng.choice(values) for name, values in self.axes.items()}
+
+
+class _StagedPoints:
+    """Task running the stages of a func for a group of combinations, each stage once per distinct prefix.
+
+    Returns a list of (ok, value) per combination, so that the error of one combination does not fail the group.
+    """
+    def __init__(self, func, points: list) -> None:
+        self.func = func
+        self.points = points
+
+    def __call__(self, operand=None, params: Params = None) -> list:
+        func = self.func
+        if callable(func.xfunc):
+            operand = func.xfunc(operand)
+        stages = [(name, list(names)) for name, names in func.stages]
+        cache, outcomes = {}, []
+        for point in self.points:
+            sub_params = func.params.override(params).override(point)
+            value, prefix = operand, []
+            try:
+                for depth, (name, names) in enumerate(stages):
+                    prefix.extend((param, sub_params[param]) for param in names)
+                    key = depth, fingerprint(prefix)
+                    if key not in cache:
+                        cache[key] = func._execute_stage(name, value, sub_params)
+                    value = cache[key]
+                outcomes.append((True, value))
+            except Exception as err:  # pylint: disable=broad-except
+                outcomes.append((False, err))
+        return outcomes
+
+
+class Sweep:
+    """Map of a func over the combinations of a parameter space, streaming the results as they finish.
+
+    Unlike MapParams, the combinations are generated lazily from a Grid or RandomSearch (or any iterable of dicts),
+    and at most window of them are in flight at a time, so that sweeps of any size run in bounded memory. Calling
+    the sweep returns an iterator of (combination, result) in order of completion.
+
+    Funcs declaring stages have the combinations in flight grouped by the params of their first stage, and every
+    stage runs once per distinct combination of its params and those upstream of it within a group. Grids are
+    reordered so that upstream params change slowest, which keeps combinations sharing stages together.
+
+    Args:
+        func: Func called as func(operand, params) for every combination.
+        space: Grid, RandomSearch or iterable of dicts of param overrides.
+        params: Overrides shared by every combination.
+        executor: Executor of the calls, see zpmeta.funcs.executors.get_executor. Its chunksize sets the number of
+            combinations per task of unstaged funcs, and its errors whether errors are raised or yielded as results.
+        window: Maximum number of combinations in flight.
+    """
+    def __init__(self, func, space, params=None, executor=None, window: int = 64) -> None:
+        if window < 1:
+            raise ValueError("window must be a positive integer!")
+        self.func = func
+        self.space = space
+        self.params = Params(params)
+        self.executor = get_executor(executor)
+        self.window = window
+
+    def __fingerprint__(self) -> str:
+        # The executor and window only change how the sweep runs, not its results.
+        return fingerprint((self.__class__, self.func, self.space, self.params))
+
+    def __call__(self, operand=None, params: dict = None):
+        return self._stream(operand, self.params.override(params))
+
+    def _staged(self) -> bool:
+        return getattr(self.func, 'supports_stages', False)
+
+    def _points(self):
+        space = self.space
+        if self._staged() and hasattr(space, 'ordered'):
+            space = space.ordered([name for _, names in self.func.stages for name in names])
+        return iter(space)
+
+    def _tasks(self, points: list, operand, params: Params) -> list:
+        """Returns the (task, points) to submit for the combinations read from the space."""
+        if not self._staged():
+            size = self.executor.chunksize
+            return [([(i, self.func, operand, params.override(point)) for i, point in enumerate(group)], group)
+                    for group in (points[i:i + size] for i in range(0, len(points), size))]
+
+        first = list(self.func.stages[0][1])
+        base, groups = self.func.params.override(params), {}
+        for point in points:
+            sub_params = base.override(point)
+            groups.setdefault(fingerprint([sub_params[name] for name in first]), []).append(point)
+        return [([(0, _StagedPoints(self.func, group), operand, params)], group) for group in groups.values()]
+
+    def _stream(self, operand, params: Params):
+        points, exhausted = self._points(), False
+        inflight, count = {}, 0
+        try:
+            while inflight or not exhausted:
+                if not exhausted and count < self.window:
+                    batch = list(itertools.islice(points, self.window - count))
+                    exhausted = len(batch) < self.window - count
+                    for chunk, group in self._tasks(batch, operand, params):
+                        inflight[self.executor.submit(chunk)] = group
+                    count += len(batch)
+                    logging.debug("SWEEP %d combinations in flight", count)
+                    if not inflight:
+                        continue
+
+                done, _ = wait(list(inflight), return_when=FIRST_COMPLETED)
+                for future in [future for future in inflight if future in done]:
+                    group = inflight.pop(future)
+                    count -= len(group)
+                    yield from self._results(future.result(), group)
+        finally:
+            for future in inflight:
+                future.cancel()
+
+    def _results(self, outcomes: list, group: list):
+        if self._staged():
+            _, ok, value = outcomes[0]
+            outcomes = [(i, ) + outcome for i, outcome in enumerate(value)] if ok else \
+                [(i, ok, value) for i in range(len(group))]
+        for i, ok, value in outcomes:
+            if not ok and self.executor.errors == 'raise':
+                raise value
+            yield group[i], value
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 Zeroth-Principles
+#
+# This file is part of Zeroth-Meta.
+#
+#  Zeroth-Meta is free software: you can redistribute it and/or modify it under the
+#  terms of the GNU General Public License as published by the Free Software
+#  Foundation, either version 3 of the License, or (at your option) any later
+#  version.
+#
+#  Zeroth-Meta is distributed in the hope that it will be useful, but WITHOUT ANY
+#  WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+#  A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License along with
+#  Zeroth-Meta. If not, see <http://www.gnu.org/licenses/>.
+#
+"""Zero-copy transport of NumPy and pandas operands and results between processes through memory-mapped segments."""
+
+__copyright__ = '2023 Zeroth Principles'
+__license__ = 'GPLv3'
+__docformat__ = 'google'
+__author__ = 'Zeroth Principles Engineering'
+__email__ = 'engineering@zeroth-principles.com'
+
+import mmap
+import os
+
+THRESHOLD = 1 << 20
+SEGMENT_PREFIX = 'zpmeta-'
+
+
+def default_directory() -> str:
+    """Returns /dev/shm where available, so that segments live in memory, or else the temporary directory."""
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    import tempfile
+    return tempfile.gettempdir()
+
+
+class SharedArray:
+    """Picklable handle of a NumPy array written to a memory-mapped segment.
+
+    Attaching maps the segment and returns a read-only view of it, without copying. Segments are files, removed
+    with unlink; on POSIX systems views attached before stay valid until they are garbage collected.
+    """
+    __slots__ = ('path', 'dtype', 'shape', 'order')
+
+    def __init__(self, path: str, dtype: str, shape: tuple, order: str = 'C') -> None:
+        self.path = path
+        self.dtype = dtype
+        self.shape = shape
+        self.order = order
+
+    def __repr__(self):
+        return "%s(path=%s, dtype=%s, shape=%s)" % (self.__class__.__name__, self.path, self.dtype, self.shape)
+
+    def __getstate__(self):
+        return self.path, self.dtype, self.shape, self.order
+
+    def __setstate__(self, state) -> None:
+        self.path, self.dtype, self.shape, self.order = state
+
+    @classmethod
+    def create(cls, array, directory: str = None) -> 'SharedArray':
+        import uuid
+        import numpy as np
+        directory = default_directory() if directory is None else directory
+        path = os.path.join(directory, "%s%s.seg" % (SEGMENT_PREFIX, uuid.uuid4().hex))
+        # Fortran ordered arrays, e.g. the values of single dtype DataFrames, are written as they are laid out.
+        order = 'F' if array.flags.f_contiguous and not array.flags.c_contiguous else 'C'
+        data = array.T if order == 'F' else np.ascontiguousarray(array)
+        with open(path, 'wb') as file:
+            file.write(memoryview(data.reshape(-1).view(np.uint8)))
+        return cls(path, array.dtype.str, array.shape, order)
+
+    def attach(self):
+        import numpy as np
+        with open(self.path, 'rb') as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        count = int(np.prod(self.shape, dtype=np.int64))
+        array = np.frombuffer(buffer, dtype=np.dtype(self.dtype), count=count)
+        if self.order == 'F':
+            return array.reshape(self.shape[::-1]).T
+        return array.reshape(self.shape)
+
+    def unlink(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class SharedPandas:
+    """Picklable handle of a DataFrame or Series whose values and index are held in SharedArrays.
+
+    Columns with values that cannot be shared, e.g. strings, are pickled along with the handle.
+    """
+    __slots__ = ('kind', 'values', 'index', 'columns', 'name')
+
+    def __init__(self, kind: str, values, index, columns=None, name=None) -> None:
+        self.kind = kind
+        self.values = values
+        self.index = index
+        self.columns = columns
+        self.name = name
+
+    def __repr__(self):
+        return "%s(kind=%s)" % (self.__class__.__name__, self.kind)
+
+    def __getstate__(self):
+        return self.kind, self.values, self.index, self.columns, self.name
+
+    def __setstate__(self, state) -> None:
+        self.kind, self.values, self.index, self.columns, self.name = state
+
+    @classmethod
+    def create(cls, obj, directory: str = None) -> 'SharedPandas':
+        from pandas import DataFrame
+        index = _share_index(obj.index, directory)
+        if not isinstance(obj, DataFrame):
+            return cls('series', _share_values(obj.to_numpy(), directory), index, name=obj.name)
+        if len(set(obj.dtypes)) == 1 and _shareable(obj.dtypes.iloc[0]):
+            return cls('block', SharedArray.create(obj.to_numpy(), directory), index, obj.columns)
+        values = [_share_values(obj.iloc[:, i].to_numpy(), directory) for i in range(obj.shape[1])]
+        return cls('columns', values, index, obj.columns)
+
+    def attach(self):
+        from pandas import DataFrame, Series
+        index = _attach(self.index)
+        if self.kind == 'series':
+            return Series(_attach(self.values), index=index, name=self.name, copy=False)
+        if self.kind == 'block':
+            return DataFrame(self.values.attach(), index=index, columns=self.columns, copy=False)
+        data = DataFrame({i: _attach(values) for i, values in enumerate(self.values)}, index=index, copy=False)
+        data.columns = self.columns
+        return data
+
+    def unlink(self) -> None:
+        index = self.index[0] if isinstance(self.index, tuple) else self.index
+        for handle in (self.values if self.kind == 'columns' else [self.values]) + [index]:
+            if isinstance(handle, SharedArray):
+                handle.unlink()
+
+
+def _shareable(dtype) -> bool:
+    import numpy as np
+    return isinstance(dtype, np.dtype) and dtype.kind in 'biufcmM'
+
+
+def _share_values(values, directory: str):
+    return SharedArray.create(values, directory) if _shareable(values.dtype) and values.nbytes > 0 else values
+
+
+def _share_index(index, directory: str):
+    from pandas import MultiIndex, RangeIndex
+    if isinstance(index, (MultiIndex, RangeIndex)) or not _shareable(index.dtype) or len(index) == 0:
+        return index
+    return SharedArray.create(index.to_numpy(), directory), index.name
+
+
+def _attach(handle):
+    from pandas import Index
+    if isinstance(handle, SharedArray):
+        return handle.attach()
+    if isinstance(handle, tuple):
+        values, name = handle
+        return Index(values.attach(), name=name, copy=False)
+    return handle
+
+
+def share(obj, directory: str = None, threshold: int = THRESHOLD):
+    """Returns obj with its NumPy arrays and pandas objects of at least threshold bytes replaced by handles.
+
+    The values of dicts, lists and tuples are shared too. The caller owns the segments: see release.
+    """
+    cls = type(obj)
+    if cls in (dict, list, tuple):
+        items = obj.items() if cls is dict else enumerate(obj)
+        shared = {key: share(value, directory, threshold) for key, value in items}
+        return shared if cls is dict else cls(shared.values())
+    module = cls.__module__
+    if module.startswith('numpy') and hasattr(obj, 'nbytes') and obj.ndim > 0:
+        if obj.nbytes >= threshold and _shareable(obj.dtype):
+            return SharedArray.create(obj, directory)
+    elif module.startswith('pandas') and cls.__name__ in ('DataFrame', 'Series'):
+        usage = obj.memory_usage(deep=False, index=True)
+        if (usage if cls.__name__ == 'Series' else usage.sum()) >= threshold:
+            return SharedPandas.create(obj, directory)
+    return obj
+
+
+def attach(obj):
+    """Returns obj with the handles created by share replaced by read-only views of their segments."""
+    cls = type(obj)
+    if cls is SharedArray or cls is SharedPandas:
+        return obj.attach()
+    if cls in (dict, list, tuple):
+        items = obj.items() if cls is dict else enumerate(obj)
+        attached = {key: attach(value) for key, value in items}
+        return attached if cls is dict else cls(attached.values())
+    return obj
+
+
+def release(obj) -> None:
+    """Removes the segments of the handles in obj. Views attached before stay valid on POSIX systems."""
+    cls = type(obj)
+    if cls is SharedArray or cls is SharedPandas:
+        obj.unlink()
+    elif cls in (dict, list, tuple):
+        for value in (obj.values() if cls is dict else obj):
+            release(value)
@@ -24,11 +24,18 @@ __author__ = 'Zeroth Principles Engineering'
 __email__ = 'engineering@zeroth-principles.com'
 __authors__ = ['Ramanuj Lal <ramanujlal@zeroth-principles.com>']
 
-import json
-from abc import ABC, ABCMeta, abstractmethod
-from typing import Any, Dict, Tuple, Optional
+import threading
+import weakref
+from abc import ABCMeta
+from collections import OrderedDict
+from typing import Any, Dict, Optional
 import logging
-from zpmeta.utils.common_utils import custom_serializer
+from zpmeta.utils.fingerprint import fingerprint
+from zpmeta.utils import instrument
+
+ISOLATION_MODES = ('eager', 'lazy', 'pooled')
+POOL_SIZE = 64
+
 
 class IsolatedMeta(ABCMeta):
     """Metaclass for isolated classes.
@@ -38,22 +45,95 @@ class IsolatedMeta(ABCMeta):
     isolated classes include Singletons, Multitons and built classes, that avoid
     generic programming in favor of higher efficiency or lower memory usage.
 
+    Creating a class costs far more time and memory than creating an instance,
+    so classes may choose when the subclass is created with the class
+    attribute _isolation:
+
+    - 'eager' (default): every instance gets a new subclass on creation.
+    - 'lazy': instances are created from the class itself, and only get their
+      own subclass when isolate(instance) is called before changing
+      class-level state.
+    - 'pooled': instances get a subclass from a pool, which is reset and
+      returned to the pool once the instance is garbage collected. Instances
+      must support weak references.
+
     """
+    _isolation: str = 'eager'
+
     def __call__(cls, *args: Any, **kwds: Any) -> object:
-        # Create new subclass of the given class. Set the attribute '__slots__'
-        # to an empty list, to allow the usage of slots.
-        subcls = IsolatedMeta(cls.__name__, (cls, ), {'__slots__': []})
+        isolation = cls._isolation
+        if isolation == 'eager':
+            subcls = cls._isolated_subclass()
+        elif isolation == 'lazy':
+            subcls = cls
+        elif isolation == 'pooled':
+            subcls = _acquire(cls)
+            # Snapshot the pristine namespace before __init__ may change class-level state.
+            namespace = dict(subcls.__dict__)
+        else:
+            raise ValueError("_isolation must be one of %s!" % (ISOLATION_MODES, ))
 
         # Create an instance of the new subclass. Note, that if the class does
         # not implement an __init__ method a TypeError is raised. In this case
         # the class is called without arguments.
         try:
-            return super(IsolatedMeta, subcls).__call__(*args, **kwds)
-        except TypeError as err:
-            if 'takes no arguments' in str(err):
-                return super(IsolatedMeta, subcls).__call__()
+            try:
+                obj = super(IsolatedMeta, subcls).__call__(*args, **kwds)
+            except TypeError as err:
+                if 'takes no arguments' in str(err):
+                    obj = super(IsolatedMeta, subcls).__call__()
+                else:
+                    raise
+        except BaseException:
+            if isolation == 'pooled':
+                _release(cls, subcls, namespace)
             raise
 
+        if isolation == 'pooled':
+            weakref.finalize(obj, _release, cls, subcls, namespace)
+        return obj
+
+    def _isolated_subclass(cls) -> type:
+        # Create new subclass of the given class. Set the attribute '__slots__'
+        # to an empty list, to allow the usage of slots.
+        return IsolatedMeta(cls.__name__, (cls, ), {'__slots__': [], '__isolated__': True})
+
+
+_pools: Dict[type, list] = {}
+
+
+def _acquire(cls: type) -> type:
+    pool = _pools.get(cls)
+    try:
+        return pool.pop()
+    except (AttributeError, IndexError):
+        return cls._isolated_subclass()
+
+
+def _release(cls: type, subcls: type, namespace: dict) -> None:
+    # Undo the class-level changes made through the instance before reusing its subclass.
+    for key in set(subcls.__dict__).difference(namespace):
+        delattr(subcls, key)
+    for key, value in namespace.items():
+        if key not in ('__dict__', '__weakref__', '__doc__') and subcls.__dict__.get(key) is not value:
+            setattr(subcls, key, value)
+    pool = _pools.setdefault(cls, [])
+    if len(pool) < POOL_SIZE:
+        pool.append(subcls)
+
+
+def isolate(obj: object) -> type:
+    """Returns the class of obj, first moving obj to a subclass of its own if it shares its class.
+
+    Call it before changing class-level state through instances of lazily isolated classes.
+    """
+    cls = type(obj)
+    if not cls.__dict__.get('__isolated__', False):
+        if not isinstance(cls, IsolatedMeta):
+            raise TypeError("isolate requires an instance of an isolated class!")
+        obj.__class__ = cls = cls._isolated_subclass()
+    return cls
+
 
 class SingletonMeta(IsolatedMeta):
     """Metaclass for Singletons.
@@ -86,6 +166,93 @@ class SingletonMeta(IsolatedMeta):
         return cls._instance
 
 
+class MultitonRegistry:
+    """Thread-safe registry of the instances of Multiton classes.
+
+    Lookups of registered instances take no lock, unless the registry is bounded. Instances are created under a
+    reentrant lock after checking the registry again, so that concurrent first calls with the same arguments share
+    one instance, while the __init__ of a Multiton may still create other Multitons. Hits of the lock-free lookups
+    are counted per thread and summed by stats, so that no count is lost without taking the lock.
+
+    Args:
+        max_size: Maximum number of instances kept, evicting the least recently used ones. None for no limit.
+        weak: If True, instances are held by weak references and dropped once no longer used elsewhere.
+    """
+    def __init__(self, max_size: int = None, weak: bool = False) -> None:
+        if max_size is not None and weak:
+            raise ValueError("MultitonRegistry is either bounded by max_size or weak, not both!")
+        if max_size is not None and max_size < 1:
+            raise ValueError("max_size must be at least 1!")
+        self.max_size = max_size
+        self.weak = weak
+        self._lock = threading.RLock()
+        self._instances = weakref.WeakValueDictionary() if weak else OrderedDict()
+        self.misses, self.evictions = 0, 0
+        self._local = threading.local()
+        self._hits = []
+
+    def __repr__(self):
+        return "%s(max_size=%s, weak=%s, entries=%d)" % (self.__class__.__name__, self.max_size, self.weak,
+                                                         len(self))
+
+    def __len__(self) -> int:
+        return len(self._instances)
+
+    def __contains__(self, key: tuple) -> bool:
+        return key in self._instances
+
+    @property
+    def hits(self) -> int:
+        return sum(counter[0] for counter in list(self._hits))
+
+    def _hit(self, key: tuple) -> None:
+        # Only the current thread increments its counter, so no lock is needed but to register it once.
+        counter = getattr(self._local, 'hits', None)
+        if counter is None:
+            counter = self._local.hits = [0]
+            with self._lock:
+                self._hits.append(counter)
+        counter[0] += 1
+        if instrument.active:
+            instrument.record('multiton', key[0].__name__, 'hit')
+
+    def get_or_create(self, key: tuple, create) -> object:
+        """Returns the instance registered under key, calling create() to register it if there is none."""
+        if self.max_size is None:
+            obj = self._instances.get(key)
+            if obj is not None:
+                self._hit(key)
+                return obj
+
+        with self._lock:
+            obj = self._instances.get(key)
+            if obj is not None:
+                if self.max_size is not None:
+                    self._instances.move_to_end(key)
+                self._hit(key)
+                return obj
+
+            self.misses += 1
+            if instrument.active:
+                instrument.record('multiton', key[0].__name__, 'miss')
+            logging.info("Multiton No Instance of %s %s", *key)
+            obj = create()
+            logging.info("Multiton Registering Instance of %s %s", *key)
+            self._instances[key] = obj
+            if self.max_size is not None and len(self._instances) > self.max_size:
+                self._instances.popitem(last=False)
+                self.evictions += 1
+            return obj
+
+    def clear(self) -> None:
+        with self._lock:
+            self._instances.clear()
+
+    @property
+    def stats(self) -> dict:
+        return dict(hits=self.hits, misses=self.misses, evictions=self.evictions, entries=len(self))
+
+
 class MultitonMeta(IsolatedMeta):
     """Metaclass for Multitons.
 
@@ -97,54 +264,38 @@ class MultitonMeta(IsolatedMeta):
     configurations, caching and collections of constants (given as immutable
     objects).
 
+    Instances are identified by the fingerprint of their params (see
+    zpmeta.utils.fingerprint), which ignores the order of dict keys, hashes
+    NumPy and pandas values from their buffers and reuses the fingerprint
+    cached by Params. All Multitons share the unbounded registry of the
+    metaclass, unless a class sets its own _registry, e.g. a bounded or weak
+    MultitonRegistry.
+
     """
-    _registry: Dict[Tuple[type, Any], object] = {}
+    _registry: MultitonRegistry = MultitonRegistry()
 
     def __call__(cls, *args: Any, **kwds: Any) -> object:
-        # Create 'fingerprint' of instance. Beware: The fingerprint is only 
-        # hashable if all given arguments and keywords are hashable. Therupon
-        # Check registry for the fingerprint. If the fingerprint is not hashable
-        # create and return and an instance of the class. If the the fingerprint
-        # could not not be found in the registry, create a class instance, add
-        # it to the registry and return the instance.
-        # TODO: Add a warning if the fingerprint is not hashable.
-        
-        logging.info("args: %s ; kwds: %s", args, kwds)
+        # Create the fingerprint of the params, given as first argument or as
+        # the keyword 'params', and return the instance registered for it,
+        # creating and registering it first if there is none.
         if len(args) > 0:
-            key = (cls, json.dumps(args[0], default= custom_serializer, sort_keys=True)   )
-        else:
-            if 'params' in kwds:
-                key = (cls, json.dumps(kwds['params'], default= custom_serializer, sort_keys=True))
-            else:
-                raise KeyError("MultitonMeta requires an argument or a 'params'")
-            
-        logging.info("Multiton checking registry for key: %s", key)
-    
-        if key in cls._registry:
-            logging.info("Multiton Found Instance of %s %s", *key)
-            obj = cls._registry[key]
+            key = (cls, fingerprint(args[0]))
+        elif 'params' in kwds:
+            key = (cls, fingerprint(kwds['params']))
         else:
-            logging.info("Multiton No Instance of %s %s", *key)
-            
-            # Create new subclass of the given class. Set the attribute '__slots__'
-            # to an empty list, to allow the usage of slots.
-            subcls = MultitonMeta(cls.__name__, (cls, ), {'__slots__': []})
+            raise KeyError("MultitonMeta requires an argument or a 'params'")
 
-            # Create an instance of the class. Note, that if the class does not
-            # implement an __init__ method a TypeError is raised. In this case the
-            # class is called without arguments.
-            try:
-                obj = super(MultitonMeta, cls).__call__(*args, **kwds)
-            except TypeError as err:
-                if 'takes no arguments' in str(err):
-                    obj = super(MultitonMeta, cls).__call__()
-                else:
-                    raise
+        return cls._registry.get_or_create(key, lambda: cls._create(*args, **kwds))
 
-            # Add the instance to the registry.
-            logging.info("Multiton Registering Instance of %s %s", *key)
-            cls._registry[key] = obj
-            
-        return obj
+    def _create(cls, *args: Any, **kwds: Any) -> object:
+        # Create an instance of the class. Note, that if the class does not
+        # implement an __init__ method a TypeError is raised. In this case the
+        # class is called without arguments.
+        try:
+            return super(MultitonMeta, cls).__call__(*args, **kwds)
+        except TypeError as err:
+            if 'takes no arguments' in str(err):
+                return super(MultitonMeta, cls).__call__()
+            raise
 
-Mu = MultitonMeta
\ No newline at end of file
+Mu = MultitonMeta
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 Zeroth-Principles
+#
+# This file is part of Zeroth-Meta.
+#
+#  Zeroth-Meta is free software: you can redistribute it and/or modify it under the
+#  terms of the GNU General Public License as published by the Free Software
+#  Foundation, either version 3 of the License, or (at your option) any later
+#  version.
+#
+#  Zeroth-Meta is distributed in the hope that it will be useful, but WITHOUT ANY
+#  WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+#  A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License along with
+#  Zeroth-Meta. If not, see <http://www.gnu.org/licenses/>.
+#
+"""Asyncio variant of PanelSource for I/O bound sources."""
+
+import asyncio
+import functools
+import logging
+from collections import deque
+from pandas import DataFrame
+from zpmeta.sources.coverage import split_period
+from zpmeta.sources.panelsource import PanelSource
+from zpmeta.utils import instrument
+
+
+class AsyncPanelSource(PanelSource):
+    """ Superclass for cached panel data generation from asyncio code.
+
+    Works like PanelSource, but is called with await and fetches through the awaitable _aexecute. Subclasses
+    either implement _aexecute natively, e.g. on an async database or HTTP client, or implement the blocking
+    _execute, which _aexecute then runs in the default executor of the event loop.
+
+    The fetches needed by a call are independent of each other and run concurrently: the incremental xs and ts
+    fetches, or the missing tiles of sources appendable in both xs and ts. Fetches longer than period_step are
+    further split into sub-periods of that length, also fetched concurrently. At most max_concurrency fetches of a
+    call run at the same time.
+
+    Args:
+        params: Parameters of the source.
+        store: PanelStore persisting the tiles, see PanelSource.
+        memory_budget: Memory budget in bytes, see PanelSource.
+        max_concurrency: Maximum number of concurrent fetches per call.
+        period_step: Length of the sub-periods fetched concurrently, e.g. a timedelta. None not to split periods.
+        freshness: TailFreshness policy refetching the trailing window of the loaded period, see PanelSource.
+    """
+    def __init__(self, params: dict = None, store=None, memory_budget: int = None, max_concurrency: int = 8,
+                 period_step=None, freshness=None):
+        super(AsyncPanelSource, self).__init__(params, store=store, memory_budget=memory_budget, freshness=freshness)
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1!")
+        self.max_concurrency = max_concurrency
+        self.period_step = period_step
+        self._alock = asyncio.Lock()
+
+    async def __call__(self, entities=None, period: tuple = None, copy: bool = False):
+        return await self._arun(entities, period, copy)
+
+    async def astream(self, entities: dict = None, period: tuple = None, period_step=None, entity_step: int = None,
+                      level: str = None, prefetch: int = 1, cache: bool = True, copy: bool = False):
+        """Asynchronous iterator over the request in chunks, fetching prefetch chunks ahead. See PanelSource.stream."""
+        if prefetch < 0:
+            raise ValueError("prefetch must be non-negative!")
+        tasks = deque()
+        try:
+            for chunk in self._stream_chunks(entities, period, period_step, entity_step, level):
+                tasks.append(asyncio.ensure_future(self._astream_chunk(*chunk, cache, copy)))
+                if len(tasks) > prefetch:
+                    yield await tasks.popleft()
+            while tasks:
+                yield await tasks.popleft()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _astream_chunk(self, entities: dict, period: tuple, trim: bool, cache: bool, copy: bool) -> DataFrame:
+        if cache:
+            data = await self._arun(entities, period, copy)
+        else:
+            data = await self._afetch("STREAM", entities, period)
+        if trim and data is not None:
+            data = data[data.index > period[0]]
+        return data
+
+    async def _arun(self, entities: dict = None, period: tuple = None, copy: bool = False) -> DataFrame:
+        logging.info("RUN %s", self)
+        if self.freshness is not None:
+            await self._arefresh(period)
+        if self._resident(entities, period):
+            requested_value = await self.store.afetch(self, "SHARED", entities, period)
+            logging.info("DONE %s", self)
+            return requested_value.copy() if copy and requested_value is not None else requested_value
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self._tiled(entities, period):
+            requested_value = await self._arun_tiles(semaphore, entities, period, copy)
+            logging.info("DONE %s", self)
+            return requested_value
+
+        # Calls outside of the tiled path replace the loaded rectangle, so they run one at a time.
+        async with self._alock:
+            with self._lock:
+                pieces, loaded = self._plan(entities, period)
+            parts = [(piece, part) for piece in pieces for part in self._split(piece[2])]
+            datas = await self._gather([self._afetch_limited(semaphore, piece[0], piece[1], part, direct=True)
+                                        for piece, part in parts])
+            with self._lock:
+                self._apply([(piece, data) for (piece, _), data in zip(parts, datas)], loaded)
+                requested_value = self.subset(entities=entities, period=period, copy=copy)
+        logging.info("DONE %s", self)
+        return requested_value
+
+    async def _arefresh(self, period: tuple = None) -> None:
+        claim = self._claim_refresh(period)
+        if claim is None:
+            return
+        entities, tail, fetched = claim
+        try:
+            data = await self._wrapped_aexecute("REFRESH", entities, tail)
+        except BaseException:
+            self.freshness.fetched = fetched
+            raise
+        with self._lock:
+            self._apply_refresh(data)
+
+    async def _arun_tiles(self, semaphore: asyncio.Semaphore, entities: dict, period: tuple,
+                          copy: bool = False) -> DataFrame:
+        while True:
+            call_type, owned, pending, requested_value = self._claim_missing(entities, period)
+            if requested_value is not None:
+                break
+            await self._gather([self._afetch_tile(semaphore, call_type, entities, period, *tile) for tile in owned])
+            for future in pending:
+                await asyncio.wrap_future(future)
+
+        return requested_value.copy() if copy else requested_value
+
+    async def _afetch_tile(self, semaphore: asyncio.Semaphore, call_type: str, entities: dict, period: tuple,
+                           tile_entities: dict, tile_period: tuple, future) -> None:
+        async def fetch_part(part: tuple) -> None:
+            data = await self._afetch_limited(semaphore, call_type, tile_entities, part)
+            with self._lock:
+                self._add_tile(entities, period, tile_entities, part, data)
+
+        try:
+            await self._gather([fetch_part(part) for part in self._split(tile_period)])
+        except BaseException as err:
+            self._abandon([(tile_entities, tile_period, future)], err)
+            raise
+        with self._lock:
+            self._release(future)
+        future.set_result(None)
+
+    async def _afetch_limited(self, semaphore: asyncio.Semaphore, call_type: str, entities: dict, period: tuple,
+                              direct: bool = False) -> DataFrame:
+        async with semaphore:
+            if direct:
+                return await self._wrapped_aexecute(call_type, entities, period)
+            return await self._afetch(call_type, entities, period)
+
+    async def _afetch(self, call_type: str, entities: dict, period: tuple) -> DataFrame:
+        if self.store is not None:
+            return await self.store.afetch(self, call_type, entities, period)
+        return await self._wrapped_aexecute(call_type, entities, period)
+
+    async def _wrapped_aexecute(self, call_type=None, entities=None, period=None) -> DataFrame:
+        period_log = period if period is not None else (None, None)
+        logging.info("EXEC %s: [%s] %s - %s", call_type, entities, *period_log)
+        if not instrument.active:
+            return await self._aexecute(entities=entities, period=period)
+        # The CPU time covers the thread of the event loop only, not fetches run in executors.
+        timer = instrument.Timer()
+        results = await self._aexecute(entities=entities, period=period)
+        self._record_fetch(call_type, results, timer)
+        return results
+
+    async def _aexecute(self, entities=None, period=None) -> DataFrame:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(self._execute, entities=entities, period=period))
+
+    def _execute(self, call_type=None, entities=None, period=None) -> DataFrame:
+        raise NotImplementedError("%s must implement _aexecute or _execute!" % self.__class__.__name__)
+
+    def _split(self, period: tuple) -> list:
+        return [period] if period is None else split_period(period, self.period_step)
+
+    @staticmethod
+    async def _gather(awaitables: list) -> list:
+        # Let every fetch finish, so that none is left running, before raising the first error.
+        results = await asyncio.gather(*awaitables, return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return results
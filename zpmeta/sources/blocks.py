@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 Zeroth-Principles
+#
+# This file is part of Zeroth-Meta.
+#
+#  Zeroth-Meta is free software: you can redistribute it and/or modify it under the
+#  terms of the GNU General Public License as published by the Free Software
+#  Foundation, either version 3 of the License, or (at your option) any later
+#  version.
+#
+#  Zeroth-Meta is distributed in the hope that it will be useful, but WITHOUT ANY
+#  WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+#  A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License along with
+#  Zeroth-Meta. If not, see <http://www.gnu.org/licenses/>.
+#
+"""Append-optimized columnar storage for the panels accumulated by PanelSource."""
+
+import numpy as np
+from pandas import DataFrame, Index, MultiIndex
+
+GROWTH = 1.5
+MIN_CAPACITY = 16
+
+
+def _capacity(needed: int, current: int = 0, minimum: int = MIN_CAPACITY) -> int:
+    return max(needed, int(current * GROWTH), minimum)
+
+
+class PanelBlocks:
+    """Panel held as one preallocated (rows x columns) NumPy block, merged like DataFrame.combine_first.
+
+    Rows are kept sorted by index. Chunks extending the tail of the index, or adding columns over existing rows,
+    are written in place into spare capacity that grows geometrically, so a session of appends costs amortized
+    time proportional to the appended data instead of reallocating and realigning the whole panel each time. Other
+    chunks fall back to a sorted merge into a new block. Values already present take precedence over new ones, as
+    with combine_first; unlike combine_first, new columns are placed after existing ones rather than sorted.
+
+    The DataFrame is built lazily when read and wraps the block without copying. Frames handed out are never
+    changed by later appends: filling cells they can see first copies the block.
+
+    Only panels whose columns share a single floating point dtype are supported; append raises TypeError otherwise.
+    Appending with overwrite lets the non-missing new values replace existing ones, e.g. for revised data.
+    """
+    def __init__(self) -> None:
+        self._index = None
+        self._values = None
+        self._rows = 0
+        self._columns = []
+        self._positions = {}
+        self._names = None
+        self._index_name = None
+        self._frame = None
+        self._exposed = (0, 0)
+
+    def __len__(self) -> int:
+        return self._rows
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes allocated, including the spare capacity."""
+        if self._values is None:
+            return 0
+        return self._values.nbytes + self._index.nbytes
+
+    @staticmethod
+    def supports(data: DataFrame) -> bool:
+        dtypes = set(data.dtypes)
+        return len(dtypes) == 1 and np.issubdtype(next(iter(dtypes)), np.floating) and data.index.is_unique \
+            and not isinstance(data.index, MultiIndex) and getattr(data.index, 'tz', None) is None
+
+    def append(self, data: DataFrame, overwrite: bool = False) -> None:
+        if not self.supports(data):
+            raise TypeError("PanelBlocks only supports unique indices and columns of a single float dtype!")
+        if self._values is not None and data.dtypes.iloc[0] != self._values.dtype:
+            raise TypeError("PanelBlocks requires the dtype %s!" % self._values.dtype)
+        if not data.index.is_monotonic_increasing:
+            data = data.sort_index()
+
+        self._frame = None
+        if self._values is None:
+            self._names = list(data.columns.names)
+            self._index_name = data.index.name
+            self._values = np.full((0, 0), np.nan, dtype=data.dtypes.iloc[0])
+            self._index = data.index.values[:0].copy()
+
+        columns = self._add_columns(data.columns)
+        index, values = data.index.values, data.to_numpy()
+
+        # Rows up to the current last index value must already exist to be filled in place; later rows are appended.
+        split = index.searchsorted(self._index[self._rows - 1], side='right') if self._rows > 0 else 0
+        rows = self._index[:self._rows].searchsorted(index[:split])
+        if not ((rows < self._rows).all() and (self._index[rows] == index[:split]).all()):
+            self._merge(index, values, columns, overwrite)
+            return
+
+        self._fill(rows, columns, values[:split], overwrite)
+        self._append_rows(index[split:], columns, values[split:])
+
+    def _add_columns(self, labels) -> np.ndarray:
+        new = [label for label in labels if label not in self._positions]
+        if new:
+            width = len(self._columns) + len(new)
+            if width > self._values.shape[1]:
+                self._reallocate(self._values.shape[0], _capacity(width, self._values.shape[1], 0))
+            for label in new:
+                self._positions[label] = len(self._columns)
+                self._columns.append(label)
+        return np.array([self._positions[label] for label in labels], dtype=np.intp)
+
+    def _reallocate(self, row_capacity: int, column_capacity: int) -> None:
+        values = np.full((row_capacity, column_capacity), np.nan, dtype=self._values.dtype)
+        values[:self._rows, :len(self._columns)] = self._values[:self._rows, :len(self._columns)]
+        index = np.empty(row_capacity, dtype=self._index.dtype)
+        index[:self._rows] = self._index[:self._rows]
+        self._values, self._index = values, index
+        self._exposed = (0, 0)
+
+    def _fill(self, rows: np.ndarray, columns: np.ndarray, values: np.ndarray, overwrite: bool = False) -> None:
+        if len(rows) == 0:
+            return
+        cells = np.ix_(rows, columns)
+        existing = self._values[cells]
+        if overwrite:
+            mask = ~np.isnan(values) & (values != existing)
+        else:
+            mask = np.isnan(existing) & ~np.isnan(values)
+        if not mask.any():
+            return
+        exposed_rows, exposed_columns = self._exposed
+        if mask[np.ix_(rows < exposed_rows, columns < exposed_columns)].any():
+            # Copy on write: a frame handed out earlier can see these cells.
+            self._reallocate(*self._values.shape)
+        self._values[cells] = np.where(mask, values, existing)
+
+    def _append_rows(self, index: np.ndarray, columns: np.ndarray, values: np.ndarray) -> None:
+        if len(index) == 0:
+            return
+        rows = self._rows + len(index)
+        if rows > self._values.shape[0]:
+            self._reallocate(_capacity(rows, self._values.shape[0]), self._values.shape[1])
+        self._index[self._rows:rows] = index
+        self._values[self._rows:rows, columns] = values
+        self._rows = rows
+
+    def _merge(self, index: np.ndarray, values: np.ndarray, columns: np.ndarray, overwrite: bool = False) -> None:
+        old_index = self._index[:self._rows]
+        merged = np.union1d(old_index, index)
+        block = np.full((_capacity(len(merged)), self._values.shape[1]), np.nan, dtype=self._values.dtype)
+        width = len(self._columns)
+        block[merged.searchsorted(old_index), :width] = self._values[:self._rows, :width]
+
+        cells = np.ix_(merged.searchsorted(index), columns)
+        existing = block[cells]
+        if overwrite:
+            block[cells] = np.where(np.isnan(values), existing, values)
+        else:
+            block[cells] = np.where(np.isnan(existing), values, existing)
+
+        self._index = np.empty(block.shape[0], dtype=self._index.dtype)
+        self._index[:len(merged)] = merged
+        self._values, self._rows = block, len(merged)
+        self._exposed = (0, 0)
+
+    def frame(self) -> DataFrame:
+        if self._values is None:
+            return None
+        if self._frame is None:
+            width = len(self._columns)
+            if len(self._names) > 1:
+                columns = MultiIndex.from_tuples(self._columns, names=self._names)
+            else:
+                columns = Index(self._columns, name=self._names[0])
+            index = Index(self._index[:self._rows], name=self._index_name)
+            self._frame = DataFrame(self._values[:self._rows, :width], index=index, columns=columns, copy=False)
+            self._exposed = (self._rows, width)
+        return self._frame
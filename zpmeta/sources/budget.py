@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 Zeroth-Principles
+#
+# This file is part of Zeroth-Meta.
+#
+#  Zeroth-Meta is free software: you can redistribute it and/or modify it under the
+#  terms of the GNU General Public License as published by the Free Software
+#  Foundation, either version 3 of the License, or (at your option) any later
+#  version.
+#
+#  Zeroth-Meta is distributed in the hope that it will be useful, but WITHOUT ANY
+#  WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+#  A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License along with
+#  Zeroth-Meta. If not, see <http://www.gnu.org/licenses/>.
+#
+"""Memory budget and least recently used eviction of the chunks loaded by a PanelSource."""
+
+from collections import OrderedDict
+from zpmeta.sources.coverage import CoverageIndex, overlaps
+
+
+class ChunkBudget:
+    """Tracks the (entities, period) chunks loaded by a PanelSource in least recently used order.
+
+    The budget only picks the chunks to evict; the source removes them from its cache and coverage. Evicted regions
+    are remembered so that fetching them again is counted as a refetch.
+
+    Args:
+        max_bytes: Memory budget of the source in bytes. None for no limit.
+    """
+    def __init__(self, max_bytes: int = None) -> None:
+        self.max_bytes = max_bytes
+        self._chunks = OrderedDict()
+        self._evicted = CoverageIndex()
+        self.evictions, self.refetches = 0, 0
+
+    def __repr__(self):
+        return "%s(max_bytes=%s, chunks=%d)" % (self.__class__.__name__, self.max_bytes, len(self._chunks))
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    @staticmethod
+    def _key(entities: dict, period: tuple) -> tuple:
+        return tuple((level, tuple(values)) for level, values in entities.items()), period
+
+    def record(self, entities: dict, period: tuple, nbytes: int) -> None:
+        """Registers a newly loaded chunk as the most recently used one."""
+        if len(self._evicted) > 0 and self._evicted.intersects(entities, period):
+            self.refetches += 1
+            self._evicted.remove(entities, period)
+        self._chunks[self._key(entities, period)] = (entities, period, nbytes)
+
+    def touch(self, entities: dict, period: tuple) -> None:
+        """Marks the chunks overlapping a request as the most recently used ones."""
+        for key, (chunk_entities, chunk_period, _) in list(self._chunks.items()):
+            if overlaps(chunk_entities, chunk_period, entities, period):
+                self._chunks.move_to_end(key)
+
+    def evict(self, resident_bytes: int, entities: dict = None, period: tuple = None) -> list:
+        """Pops and returns the least recently used chunks to evict to get within budget.
+
+        Chunks overlapping the request given by entities and period are never evicted.
+        """
+        if self.max_bytes is None or resident_bytes <= self.max_bytes:
+            return []
+        evicted = []
+        for key, (chunk_entities, chunk_period, nbytes) in list(self._chunks.items()):
+            if resident_bytes <= self.max_bytes:
+                break
+            if entities is not None and overlaps(chunk_entities, chunk_period, entities, period):
+                continue
+            del self._chunks[key]
+            self._evicted.add(chunk_entities, chunk_period)
+            evicted.append((chunk_entities, chunk_period))
+            resident_bytes -= nbytes
+            self.evictions += 1
+        return evicted
+
+    def clear(self) -> None:
+        self._chunks.clear()
+        self._evicted.clear()
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 Zeroth-Principles
+#
+# This file is part of Zeroth-Meta.
+#
+#  Zeroth-Meta is free software: you can redistribute it and/or modify it under the
+#  terms of the GNU General Public License as published by the Free Software
+#  Foundation, either version 3 of the License, or (at your option) any later
+#  version.
+#
+#  Zeroth-Meta is distributed in the hope that it will be useful, but WITHOUT ANY
+#  WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+#  A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License along with
+#  Zeroth-Meta. If not, see <http://www.gnu.org/licenses/>.
+#
+"""Bookkeeping of the entity and period tiles loaded by a PanelSource."""
+
+import itertools
+
+
+def subtract_intervals(period: tuple, covered: list) -> list:
+    """Returns the parts of period not covered by the sorted, disjoint intervals in covered.
+
+    Intervals are closed, and gaps share their end points with the neighbouring covered intervals, following the
+    convention of PanelSource.mismatch_period. Values only need to be ordered, e.g. dates, strings or numbers.
+    """
+    start, end = period
+    gaps, cursor = [], start
+    for c_start, c_end in covered:
+        if c_end < cursor:
+            continue
+        if c_start > end:
+            break
+        if c_start > cursor:
+            gaps.append((cursor, c_start))
+        cursor = max(cursor, c_end)
+        if cursor >= end:
+            return gaps
+    if cursor < end or start == end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+def add_interval(covered: list, period: tuple) -> list:
+    """Returns the sorted, disjoint intervals in covered merged with period."""
+    start, end = period
+    merged = []
+    for c_start, c_end in covered:
+        if c_end < start or c_start > end:
+            merged.append((c_start, c_end))
+        else:
+            start, end = min(start, c_start), max(end, c_end)
+    merged.append((start, end))
+    merged.sort(key=lambda x: x[0])
+    return merged
+
+
+def remove_interval(covered: list, period: tuple) -> list:
+    """Returns the intervals in covered minus period. End points shared with period stay covered."""
+    start, end = period
+    remaining = []
+    for c_start, c_end in covered:
+        if c_end < start or c_start > end:
+            remaining.append((c_start, c_end))
+            continue
+        if c_start < start:
+            remaining.append((c_start, start))
+        if c_end > end:
+            remaining.append((end, c_end))
+    return remaining
+
+
+def split_period(period: tuple, step) -> list:
+    """Splits period into consecutive sub-periods of length step, sharing their end points like gaps do.
+
+    The step must be addable to the period values, e.g. a timedelta for dates. A step of None returns period whole.
+    """
+    if step is None:
+        return [period]
+    start, end = period
+    parts = []
+    while start + step < end:
+        parts.append((start, start + step))
+        start = start + step
+    parts.append((start, end))
+    return parts
+
+
+def overlaps(entities: dict, period: tuple, other_entities: dict, other_period: tuple) -> bool:
+    """Returns True if two (entities, period) rectangles share at least one entity combination and one point."""
+    if period[1] < other_period[0] or period[0] > other_period[1]:
+        return False
+    return all(not set(values).isdisjoint(other_entities.get(level, ())) for level, values in entities.items())
+
+
+def rectangles(combos: list) -> list:
+    """Decomposes a list of unique, equal length tuples into a short list of cartesian products.
+
+    Each product is returned as a tuple of value lists, one per position. The union of the products is exactly the
+    set of combos. Value order follows the order of first appearance in combos.
+    """
+    if not combos:
+        return []
+    width = len(combos[0])
+    if width == 0:
+        return [()]
+
+    projections = [list(dict.fromkeys(combo[i] for combo in combos)) for i in range(width)]
+    size = 1
+    for values in projections:
+        size *= len(values)
+    if size == len(combos):
+        return [tuple(projections)]
+
+    # Not a product: split by the first position, decompose the tails and merge heads with identical tails.
+    tails_by_head = {}
+    for combo in combos:
+        tails_by_head.setdefault(combo[0], []).append(combo[1:])
+    heads_by_tail = {}
+    for head, tails in tails_by_head.items():
+        for rect in rectangles(tails):
+            key = tuple(tuple(values) for values in rect)
+            heads_by_tail.setdefault(key, []).append(head)
+    return [(heads, ) + tuple(list(values) for values in tail) for tail, heads in heads_by_tail.items()]
+
+
+class CoverageIndex:
+    """Index of the (entity combination x period interval) tiles loaded by a PanelSource.
+
+    Entities are given as dicts of level name to list of values, as passed to PanelSource. Every combination of the
+    level values keeps its own sorted list of disjoint, loaded period intervals, so lookups cost one dict access per
+    combination instead of scanning lists of combinations.
+    """
+    def __init__(self) -> None:
+        self.levels = None
+        self._intervals = {}
+
+    def __repr__(self):
+        return "%s(levels=%s, combos=%d)" % (self.__class__.__name__, self.levels, len(self._intervals))
+
+    def __len__(self) -> int:
+        return len(self._intervals)
+
+    def _combos(self, entities: dict):
+        if self.levels is None:
+            self.levels = tuple(entities.keys())
+        elif set(entities.keys()) != set(self.levels):
+            raise ValueError("entities must have the levels %s!" % (self.levels, ))
+        return itertools.product(*(dict.fromkeys(entities[level]) for level in self.levels))
+
+    def _to_entities(self, rect: tuple) -> dict:
+        return dict(zip(self.levels, (list(values) for values in rect)))
+
+    def add(self, entities: dict, period: tuple) -> None:
+        for combo in self._combos(entities):
+            self._intervals[combo] = add_interval(self._intervals.get(combo, []), period)
+
+    def remove(self, entities: dict, period: tuple = None) -> None:
+        """Forgets a loaded region, or every period of the given entities if period is None."""
+        for combo in self._combos(entities):
+            if combo not in self._intervals:
+                continue
+            remaining = [] if period is None else remove_interval(self._intervals[combo], period)
+            if remaining:
+                self._intervals[combo] = remaining
+            else:
+                del self._intervals[combo]
+
+    def missing(self, entities: dict, period: tuple) -> list:
+        """Returns the (entities, period) rectangles of the request that are not loaded yet.
+
+        Gaps before, after and in between loaded intervals are all reported. Combinations sharing the same gaps are
+        grouped into as few entity rectangles as possible, so that each rectangle can be fetched with one call.
+        """
+        combos_by_gaps = {}
+        for combo in self._combos(entities):
+            covered = self._intervals.get(combo)
+            gaps = (period, ) if covered is None else tuple(subtract_intervals(period, covered))
+            if gaps:
+                combos_by_gaps.setdefault(gaps, []).append(combo)
+
+        tiles = []
+        for gaps, combos in combos_by_gaps.items():
+            for rect in rectangles(combos):
+                tiles.extend((self._to_entities(rect), gap) for gap in gaps)
+        return tiles
+
+    def covers(self, entities: dict, period: tuple) -> bool:
+        return len(self.missing(entities, period)) == 0
+
+    def intersects(self, entities: dict, period: tuple) -> bool:
+        """Returns True if any part of the request is loaded."""
+        for combo in self._combos(entities):
+            for c_start, c_end in self._intervals.get(combo, ()):
+                if c_start <= period[1] and c_end >= period[0]:
+                    return True
+        return False
+
+    def combos(self) -> dict:
+        """Returns the loaded intervals of every entity combination, keyed by tuples ordered like levels."""
+        return self._intervals
+
+    @property
+    def entities(self) -> dict:
+        """Values of each level found in any loaded combination."""
+        if self.levels is None:
+            return None
+        values = [dict() for _ in self.levels]
+        for combo in self._intervals:
+            for i, value in enumerate(combo):
+                values[i][value] = None
+        return dict(zip(self.levels, (list(v) for v in values)))
+
+    @property
+    def period(self) -> tuple:
+        """Smallest period containing every loaded interval."""
+        if not self._intervals:
+            return None
+        return (min(intervals[0][0] for intervals in self._intervals.values()),
+                max(intervals[-1][1] for intervals in self._intervals.values()))
+
+    def clear(self) -> None:
+        self.levels = None
+        self._intervals = {}
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 Zeroth-Principles
+#
+# This file is part of Zeroth-Meta.
+#
+#  Zeroth-Meta is free software: you can redistribute it and/or modify it under the
+#  terms of the GNU General Public License as published by the Free Software
+#  Foundation, either version 3 of the License, or (at your option) any later
+#  version.
+#
+#  Zeroth-Meta is distributed in the hope that it will be useful, but WITHOUT ANY
+#  WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+#  A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License along with
+#  Zeroth-Meta. If not, see <http://www.gnu.org/licenses/>.
+#
+"""Freshness policy of the trailing window of the data loaded by a PanelSource."""
+
+import time
+
+
+class TailFreshness:
+    """Marks the trailing window of the loaded period as stale once a time to live has passed since it was fetched.
+
+    PanelSource treats loaded data as final, except for the tail given by this policy: a request reaching into the
+    window [end - window, end], where end is the end of the loaded period, refetches the window for the loaded
+    entities if it was last fetched more than ttl seconds ago. The refetched data overwrites the cached values, so
+    that intraday updates and restatements of recent data are picked up at a cost proportional to the window.
+
+    With checksum, the refetched rows already cached are compared with the cache by fingerprint, and subscribers of
+    the source are only told to reprocess everything (a delta of None) when the data was revised; otherwise they
+    receive the rows appended to the tail, if any. Without checksum every refresh is treated as a revision.
+
+    Args:
+        window: Length of the trailing window, subtracted from the end of the loaded period, e.g. a timedelta.
+        ttl: Seconds after which the window is stale.
+        checksum: Whether to detect revisions by comparing checksums of the refetched and the cached rows.
+        clock: Callable returning the current time in seconds.
+    """
+    def __init__(self, window, ttl: float, checksum: bool = True, clock=time.monotonic) -> None:
+        if ttl < 0:
+            raise ValueError("ttl must be non-negative!")
+        self.window = window
+        self.ttl = ttl
+        self.checksum = checksum
+        self.clock = clock
+        self.end, self.fetched = None, None
+        self.refreshes, self.revisions = 0, 0
+
+    def __repr__(self):
+        return "%s(window=%s, ttl=%s, checksum=%s)" % (self.__class__.__name__, self.window, self.ttl, self.checksum)
+
+    def loaded(self, end) -> None:
+        """Records the end of the loaded period after a fetch. Extending the period fetches a fresh tail."""
+        if end != self.end:
+            self.end, self.fetched = end, self.clock()
+
+    def stale(self, period: tuple = None) -> tuple:
+        """Returns the window to refetch for a request of period, or None if it is fresh or not requested."""
+        if self.end is None:
+            return None
+        tail = (self.end - self.window, self.end)
+        if period is not None and period[1] < tail[0]:
+            return None
+        if self.clock() - self.fetched < self.ttl:
+            return None
+        return tail
+
+    def claim(self) -> float:
+        """Marks the tail as fetched now, so that concurrent requests do not refetch it, and returns the last time."""
+        fetched, self.fetched = self.fetched, self.clock()
+        return fetched
+
+    def clear(self) -> None:
+        self.end, self.fetched = None, None
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 Zeroth-Principles
+#
+# This file is part of Zeroth-Meta.
+#
+#  Zeroth-Meta is free software: you can redistribute it and/or modify it under the
+#  terms of the GNU General Public License as published by the Free Software
+#  Foundation, either version 3 of the License, or (at your option) any later
+#  version.
+#
+#  Zeroth-Meta is distributed in the hope that it will be useful, but WITHOUT ANY
+#  WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+#  A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License along with
+#  Zeroth-Meta. If not, see <http://www.gnu.org/licenses/>.
+#
+"""Manager of PanelSources batching their fetches across sources and prefetching predicted requests."""
+
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from zpmeta.sources.panelsource import preload_scope
+from zpmeta.utils.fingerprint import fingerprint
+
+
+def predict_next(history: list, universe: dict = None) -> tuple:
+    """Returns the (entities, period) likely requested after the latest requests in history, or None.
+
+    Two patterns are recognised from the last two requests: the same entities over a period moving by a constant
+    step, predicting the period one step further; and the same period over consecutive slices of the values of a
+    level in universe, a dict of level name to all its values, predicting the following slice.
+    """
+    if len(history) < 2:
+        return None
+    (entities1, period1), (entities2, period2) = history[-2], history[-1]
+    if entities1 == entities2:
+        if period1 is None or period2 is None:
+            return None
+        step = period2[0] - period1[0]
+        if period2[0] > period1[0] and period2[1] - period1[1] == step:
+            return entities2, (period2[0] + step, period2[1] + step)
+        return None
+
+    if period1 != period2 or not universe or entities1 is None or entities2 is None:
+        return None
+    for level, values in universe.items():
+        if level not in entities1 or level not in entities2:
+            continue
+        if any(entities1[other] != entities2[other] for other in entities2 if other != level):
+            continue
+        values = list(values)
+        first, second = list(entities1[level]), list(entities2[level])
+        start = values.index(first[0]) if first and first[0] in values else -1
+        end = start + len(first) + len(second)
+        if start < 0 or values[start:start + len(first)] != first or values[start + len(first):end] != second:
+            continue
+        following = values[end:end + len(second)]
+        if following:
+            return dict(entities2, **{level: following}), period2
+    return None
+
+
+class SourceManager:
+    """Runs the requests of many PanelSources together, batching their fetches and prefetching ahead of them.
+
+    Requests passed to fetch in one call run concurrently. Before the sources are called, the rectangles they would
+    fetch are collected, and those missed by several sources of the same class implementing _execute_batch are
+    fetched with a single call of the hook and handed to the sources, so that e.g. one query serves all the
+    variables of a dashboard. Batches that fail are left to the sources to fetch on their own.
+
+    Every source keeps a short history of its requests. After each fetch, the requests predicted from the histories
+    (see predict_next) are fetched in the background, batched the same way, unless the sources already hold them
+    or the sources hold more than memory_budget bytes in total.
+
+    Args:
+        max_concurrency: Maximum number of fetches and calls of sources running at the same time.
+        memory_budget: Total bytes held by the sources above which nothing is prefetched. None for no limit.
+        prefetch: Whether to prefetch predicted requests.
+        history: Number of requests remembered per source.
+    """
+    def __init__(self, max_concurrency: int = 4, memory_budget: int = None, prefetch: bool = True,
+                 history: int = 4) -> None:
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1!")
+        self.max_concurrency = max_concurrency
+        self.memory_budget = memory_budget
+        self.prefetch = prefetch
+        self.history = history
+        self._sources, self._universes, self._histories = {}, {}, {}
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency)
+        # Prefetches are scheduled one at a time on their own thread, which waits for fetches on the pool.
+        self._scheduler = ThreadPoolExecutor(max_workers=1)
+        self._prefetching = None
+        self._lock = threading.Lock()
+        self.batches, self.batched, self.prefetches = 0, 0, 0
+
+    def __repr__(self):
+        return "%s(sources=%d, max_concurrency=%d, memory_budget=%s)" % (
+            self.__class__.__name__, len(self._sources), self.max_concurrency, self.memory_budget)
+
+    def __getitem__(self, name: str):
+        return self._sources[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._sources
+
+    def register(self, name: str, source, universe: dict = None) -> None:
+        """Adds a source under name. Universe gives all the values of its levels, to predict entity slices."""
+        with self._lock:
+            self._sources[name] = source
+            self._universes[name] = universe
+            self._histories[name] = deque(maxlen=self.history)
+
+    def unregister(self, name: str) -> None:
+        with self._lock:
+            del self._sources[name], self._universes[name], self._histories[name]
+
+    @property
+    def resident_bytes(self) -> int:
+        return sum(source.resident_bytes for source in list(self._sources.values()))
+
+    @property
+    def stats(self) -> dict:
+        return dict(batches=self.batches, batched=self.batched, prefetches=self.prefetches,
+                    resident_bytes=self.resident_bytes)
+
+    def __call__(self, name: str, entities: dict = None, period: tuple = None):
+        return self.fetch({name: (entities, period)})[name]
+
+    def fetch(self, requests: dict) -> dict:
+        """Returns the data of every request, a dict of source name to (entities, period), keyed like requests."""
+        for name in requests:
+            if name not in self._sources:
+                raise KeyError("Source %s is not registered!" % name)
+        results = self._run(requests)
+        with self._lock:
+            for name, request in requests.items():
+                self._histories[name].append(request)
+        if self.prefetch:
+            self._schedule_prefetch(list(requests))
+        return results
+
+    def _run(self, requests: dict) -> dict:
+        # Preloads are keyed by a token of the run, so that only its own calls use or discard them.
+        names, preloaded, token = list(requests), [], object()
+        try:
+            preloaded = self._preload(requests, token)
+            futures = [self._pool.submit(self._call, token, self._sources[name], *requests[name]) for name in names]
+            return {name: future.result() for name, future in zip(names, futures)}
+        finally:
+            for source, entities, period in preloaded:
+                source.discard_preloaded(entities, period, token)
+
+    @staticmethod
+    def _call(token, source, entities: dict = None, period: tuple = None):
+        with preload_scope(token):
+            return source(entities, period)
+
+    def _preload(self, requests: dict, token=None) -> list:
+        """Fetches the rectangles missed by several sources of a class with one call of its batch hook.
+
+        Returns the (source, entities, period) preloaded under token, whose data is discarded after the calls of
+        the sources.
+        """
+        groups = {}
+        for name, (entities, period) in requests.items():
+            source = self._sources[name]
+            if not source.supports_batch:
+                continue
+            for part_entities, part_period in source.planned(entities, period):
+                key = type(source), fingerprint(part_entities), fingerprint(part_period)
+                group = groups.setdefault(key, (part_entities, part_period, []))
+                if source not in group[2]:
+                    group[2].append(source)
+
+        batches = [(type(sources[0]), entities, period, sources) for entities, period, sources in groups.values()
+                   if len(sources) > 1]
+        futures = [self._pool.submit(cls._execute_batch, sources, entities, period)
+                   for cls, entities, period, sources in batches]
+        preloaded = []
+        for (cls, entities, period, sources), future in zip(batches, futures):
+            try:
+                datas = future.result()
+            except Exception as err:  # pylint: disable=broad-except
+                logging.warning("BATCH %s failed, fetching per source: %s", cls.__name__, err)
+                continue
+            period_log = period if period is not None else (None, None)
+            logging.info("BATCH %s: %d sources [%s] %s - %s", cls.__name__, len(sources), entities, *period_log)
+            for source, data in zip(sources, datas):
+                source.preload(entities, period, data, token)
+                preloaded.append((source, entities, period))
+            with self._lock:
+                self.batches += 1
+                self.batched += len(sources)
+        return preloaded
+
+    def _schedule_prefetch(self, names: list) -> None:
+        with self._lock:
+            if self._prefetching is not None and not self._prefetching.done():
+                return
+            if self.memory_budget is not None and self.resident_bytes >= self.memory_budget:
+                return
+            predictions = {}
+            for name in names:
+                prediction = predict_next(list(self._histories[name]), self._universes[name])
+                if prediction is not None and self._sources[name].planned(*prediction):
+                    predictions[name] = prediction
+            if predictions:
+                self._prefetching = self._scheduler.submit(self._prefetch, predictions)
+
+    def _prefetch(self, predictions: dict) -> None:
+        logging.info("PREFETCH %s", list(predictions))
+        try:
+            self._run(predictions)
+        except Exception as err:  # pylint: disable=broad-except
+            # A failed prefetch only loses the head start: the request fetches again when made.
+            logging.warning("PREFETCH failed: %s", err)
+            return
+        with self._lock:
+            self.prefetches += len(predictions)
+
+    def wait(self) -> None:
+        """Waits for the prefetch in progress, if any."""
+        prefetching = self._prefetching
+        if prefetching is not None:
+            prefetching.result()
+
+    def shutdown(self) -> None:
+        self._scheduler.shutdown(wait=True, cancel_futures=True)
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
@@ -18,9 +18,32 @@
 """Superclasses for frequently used design patterns."""
 
 import logging
-import itertools
-from abc import abstractmethod, ABCMeta
-from pandas import DataFrame, Series, concat, MultiIndex
+import threading
+from abc import abstractmethod
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
+from pandas import DataFrame, MultiIndex
+from zpmeta.sources.coverage import CoverageIndex, overlaps, split_period
+from zpmeta.sources.slicing import subset_panel
+from zpmeta.sources.blocks import PanelBlocks
+from zpmeta.sources.budget import ChunkBudget
+from zpmeta.utils.fingerprint import approx_sizeof, fingerprint
+from zpmeta.utils import instrument
+
+_preload_scope = threading.local()
+
+
+@contextmanager
+def preload_scope(token):
+    """Lets the sources called by this thread use the data preloaded under token, see PanelSource.preload."""
+    previous = getattr(_preload_scope, 'token', None)
+    _preload_scope.token = token
+    try:
+        yield
+    finally:
+        _preload_scope.token = previous
 
 
 class PanelSource:
@@ -29,101 +52,440 @@ class PanelSource:
     This callable class generate panel data (cross-sectional and time-series) given a dict of parameters.
     It has memory and once called for a list of ids/variables and date range, it does not re-run for that set again 
     when called a second time for the same set of inputs, but only appends data for new inputs.
+
+    Sources appendable in both xs and ts keep track of the loaded (entities x period) tiles and only fetch the
+    missing ones. Such sources may also be given a PanelStore, in which case the tiles are persisted on disk and
+    shared with other processes, and _execute only runs for tiles that are neither in memory nor in the store.
+    Panels of float columns are accumulated in PanelBlocks, which appends in place instead of rebuilding the cache
+    with combine_first; set columnar to False to always use combine_first. A memory_budget in bytes bounds the
+    cache of tiled sources: least recently used chunks are evicted from the cache and the coverage, and fetched
+    again on demand. Loaded data is final unless a TailFreshness policy is given as freshness: the trailing window
+    of the loaded period is then refetched once its time to live has passed, which resident stores do not support.
+    Given a SharedPanelCache as store, the tiles are published once in memory-mapped segments attached read-only by
+    every process, and calls are served from the segments instead of a value of their own. Requests too large to
+    hold at once can be iterated in chunks with stream.
     ----
     [01 Jul 2023] Created
     ----
     TODO: Add logging
     """
-    def __init__(self, params: dict = None):
+    def __init__(self, params: dict = None, store=None, memory_budget: int = None, freshness=None):
         super(PanelSource, self).__init__()
+        if freshness is not None and getattr(store, 'resident', False):
+            # Resident stores publish tiles once for every process, so there is no cache of its own to refresh.
+            raise ValueError("freshness is not supported with a resident store such as SharedPanelCache!")
         self.params = params
         self.appendable = dict(xs=False, ts=False)
+        self.columnar = True
         self.value = None
         self.entities, self.period = None, None
+        self.coverage = CoverageIndex()
+        self.store = store
+        self.budget = ChunkBudget(memory_budget)
+        self.freshness = freshness
+        self._lock = threading.RLock()
+        self._inflight, self._pending = [], CoverageIndex()
+        self._flight = None
+        self._listeners = []
+        self._preloaded = {}
         # self.logger = DataLogHandler()
 
     def __repr__(self):
         return super(PanelSource, self).__repr__() + str(self.params)
 
-    def __call__(self, entities=None, period: tuple = None):
-        return self._run(entities, period)
+    def __call__(self, entities=None, period: tuple = None, copy: bool = False):
+        return self._run(entities, period, copy)
 
     def __str__(self):
         return "%s %s" %(self.__class__.__name__, self.params)
 
     # @DataLogHandler().log_level()
-    def _run(self, entities: dict = None, period: tuple = None) -> DataFrame:
-        logging.info("RUN " + str(self))
+    def _run(self, entities: dict = None, period: tuple = None, copy: bool = False) -> DataFrame:
+        logging.info("RUN %s", self)
+        if self.freshness is not None:
+            self._refresh(period)
+        if self._resident(entities, period):
+            requested_value = self.store.fetch(self, "SHARED", entities, period)
+            logging.info("DONE %s", self)
+            return requested_value.copy() if copy and requested_value is not None else requested_value
+        if self._tiled(entities, period):
+            requested_value = self._run_tiles(entities, period, copy)
+            logging.info("DONE %s", self)
+            return requested_value
+
+        requested_value = self._run_plan(entities, period, copy)
+        logging.info("DONE %s", self)
+        return requested_value
+
+    def _run_plan(self, entities: dict = None, period: tuple = None, copy: bool = False) -> DataFrame:
+        """Fetches the plan of a request that is not tiled.
+
+        Safe to call from several threads. The plan is claimed under the lock by one thread at a time and fetched
+        outside of it, then merged under the lock, so that reads of cached data are not blocked by the fetch. Other
+        threads needing fetches wait for the claimed one and plan again; a plan is also redone if the cache was
+        extended by the tiled path meanwhile.
+        """
+        while True:
+            with self._lock:
+                loaded_before = self.entities, self.period
+                pieces, loaded = self._plan(entities, period)
+                if not pieces:
+                    self._apply([], loaded)
+                    return self.subset(entities=entities, period=period, copy=copy)
+                flight, owner = self._flight, self._flight is None
+                if owner:
+                    flight = self._flight = Future()
+            if not owner:
+                # Errors of the fetching thread are re-raised here, as with the in-flight tiles.
+                flight.result()
+                continue
+
+            try:
+                results = [(piece, self._wrapped_execute(*piece[:3])) for piece in pieces]
+            except BaseException as err:
+                with self._lock:
+                    self._flight = None
+                flight.set_exception(err)
+                raise
+            with self._lock:
+                self._flight = None
+                applied = (self.entities, self.period) == loaded_before
+                if applied:
+                    self._apply(results, loaded)
+                    requested_value = self.subset(entities=entities, period=period, copy=copy)
+            flight.set_result(None)
+            if applied:
+                return requested_value
+
+    def _tiled(self, entities: dict = None, period: tuple = None) -> bool:
+        return self.appendable['xs'] and self.appendable['ts'] and entities is not None and period is not None
+
+    def _resident(self, entities: dict = None, period: tuple = None) -> bool:
+        """Returns True if the request is served by a store holding the tiles resident, e.g. a SharedPanelCache."""
+        return self.store is not None and getattr(self.store, 'resident', False) and self._tiled(entities, period)
+
+    def _plan(self, entities: dict = None, period: tuple = None) -> tuple:
+        """Returns the fetches bringing the cache to the request, and the (entities, period) loaded afterwards.
+
+        Each fetch is a tuple (call_type, entities, period, axis). Data of the axis 'xs' or 'ts' is appended to the
+        cache, while data of the axis None replaces it. The fetches are independent of each other.
+        """
         period_log = (None,None) if period is None else period
-        if self.value is None:
+        if self._blocks is None and self._value is None:
             logging.info("RUN INITIAL: [%s] %s - %s", entities, *period_log)
-            value = self._wrapped_execute("INITIAL", entities, period)
-            self.update(ts=value)
-            self.entities, self.period = entities, period
+            return [("INITIAL", entities, period, 'ts')], (entities, period)
+
+        loaded = self.entities, self.period
+        appendable_xs, appendable_ts = self.appendable['xs'], self.appendable['ts']
+        incremental_period, total_period = self.mismatch_period(period)
+        incremental_items, decremental_items, total_items  = self.mismatch_entities(entities)
+
+        incremental_period_log, total_period_log = list(map(lambda x: x if x is not None
+                                            else (None,None), (incremental_period, total_period)))
+        logging.info("RUN Nth: %s %s - %s", entities, *period_log)
+        logging.info("INCREMENTAL Items: %s", incremental_items)
+        logging.info("TOTAL Items: %s", total_items)
+        logging.info("DECREMENTAL Items: %s", decremental_items)
+        logging.info("INCREMENTAL Period: %s - %s", *incremental_period_log)
+        logging.info("TOTAL Period: %s - %s", *total_period_log)
+        logging.info("APPENDABLE XS:%s TS:%s", appendable_xs, appendable_ts)
+
+        pieces = []
+        if appendable_xs and appendable_ts:
+            if incremental_items is not None:
+                pieces.append(("INCREMENTAL XS1", incremental_items, self.period, 'xs'))
+                loaded = total_items, loaded[1]
+            if incremental_period is not None:
+                pieces.append(("INCREMENTAL TS1", loaded[0], incremental_period, 'ts'))
+                loaded = loaded[0], total_period
+        elif appendable_xs and not appendable_ts:
+            if period == total_period and incremental_items is not None:
+                pieces.append(("INCREMENTAL XS2", incremental_items, self.period, 'xs'))
+                loaded = total_items, loaded[1]
+        elif appendable_ts and not appendable_xs:
+            if incremental_items is None and decremental_items is None and incremental_period is not None:
+                pieces.append(("INCREMENTAL TS2", self.entities, incremental_period, 'ts'))
+                loaded = loaded[0], total_period
         else:
-            appendable_xs, appendable_ts = self.appendable['xs'], self.appendable['ts']
-            incremental_period, total_period = self.mismatch_period(period)
-            incremental_items, decremental_items, total_items  = self.mismatch_entities(entities)
-            
-            incremental_period_log, total_period_log = list(map(lambda x: x if x is not None 
-                                                else (None,None), (incremental_period, total_period)))
-            logging.info("RUN Nth: %s %s - %s", entities, *period_log)
-            logging.info("INCREMENTAL Items: %s" %incremental_items)
-            logging.info("TOTAL Items: %s" %total_items)
-            logging.info("DECREMENTAL Items: %s" %decremental_items)
-            logging.info("INCREMENTAL Period: %s - %s", *incremental_period_log)
-            logging.info("TOTAL Period: %s - %s", *total_period_log)
-            logging.info("APPENDABLE XS:%s TS:%s" %(appendable_xs, appendable_ts))
-            
-            if appendable_xs and appendable_ts:
-                if incremental_items is not None:
-                    xs_data = self._wrapped_execute("INCREMENTAL XS1", incremental_items, self.period)
-                    self.entities = total_items
-                    self.update(xs = xs_data)
-                if incremental_period is not None:
-                    ts_data = self._wrapped_execute("INCREMENTAL TS1", self.entities, incremental_period)
-                    self.period = total_period
-                    self.update(ts = ts_data)
-            elif appendable_xs and not appendable_ts:
-                if period == total_period and incremental_items is not None:
-                    xs_data = self._wrapped_execute("INCREMENTAL XS2", incremental_items, self.period)
-                    self.entities = total_items
-                    self.update(xs = xs_data)
-            elif appendable_ts and not appendable_xs:
-                if incremental_items is None and decremental_items is None and incremental_period is not None:
-                    ts_data = self._wrapped_execute("INCREMENTAL TS2", self.entities, incremental_period)
-                    self.period = total_period
-                    self.update(ts=ts_data)
-            else:
-                self.value = self._wrapped_execute("TOTAL", total_items, total_period)
-                self.entities, self.period = total_items, total_period
+            pieces.append(("TOTAL", total_items, total_period, None))
+            loaded = total_items, total_period
+        return pieces, loaded
 
-        # TODO: Implement this
-        # requested_value = self.subset(entities=entities, period=period)
-        requested_value = self.value.copy()
-        logging.info("DONE " + str(self))
-        return requested_value
+    def _apply(self, results: list, loaded: tuple) -> None:
+        """Merges the (fetch, data) results of a plan into the cache."""
+        if any(piece[3] is None for piece, _ in results):
+            self.value = None
+        for piece, data in results:
+            self.update(**{piece[3] or 'ts': data})
+        if results or (self.entities, self.period) != loaded:
+            self.entities, self.period = loaded
+            self._reset_coverage()
+            self._loaded()
+
+    def _loaded(self) -> None:
+        if self.freshness is not None and self.period is not None:
+            self.freshness.loaded(self.period[1])
+
+    def _refresh(self, period: tuple = None) -> None:
+        """Refetches the trailing window of the cache if it is stale for a request of period, see TailFreshness."""
+        claim = self._claim_refresh(period)
+        if claim is None:
+            return
+        entities, tail, fetched = claim
+        try:
+            # The store would return the stale tail, so the source is executed directly.
+            data = self._wrapped_execute("REFRESH", entities, tail)
+        except BaseException:
+            self.freshness.fetched = fetched
+            raise
+        with self._lock:
+            self._apply_refresh(data)
+
+    def _claim_refresh(self, period: tuple = None) -> tuple:
+        """Returns (entities, tail, last fetch time) if the tail must be refetched, claiming it, or else None."""
+        with self._lock:
+            tail = self.freshness.stale(period) if self.value is not None else None
+            if tail is None:
+                return None
+            logging.info("REFRESH %s: %s - %s", self, *tail)
+            return self.entities, tail, self.freshness.claim()
+
+    def _apply_refresh(self, data: DataFrame) -> None:
+        """Overwrites the cache with the refetched tail and notifies the subscribers."""
+        self.freshness.refreshes += 1
+        if data is None or len(data) == 0:
+            return
+        revised = not self.freshness.checksum or self._revised(data)
+        delta = None if revised or not self._listeners else self._appended(data)
+        if revised:
+            self.freshness.revisions += 1
+            logging.info("REVISED %s: %s - %s", self, data.index[0], data.index[-1])
+        self._merge(data, overwrite=True)
+        if delta is not None and len(delta) == 0:
+            return
+        for listener in self._listeners:
+            listener(self, delta)
+
+    def _revised(self, data: DataFrame) -> bool:
+        """Returns True if data changes cached rows or adds columns, comparing fingerprints of the common rows."""
+        value = self.value
+        columns = data.columns.intersection(value.columns)
+        if len(columns) < len(data.columns):
+            return True
+        rows = data.index.intersection(value.index)
+        cached = value.loc[rows, columns]
+        return fingerprint(cached) != fingerprint(data.loc[rows, columns].astype(cached.dtypes))
+
+    def _run_tiles(self, entities: dict, period: tuple, copy: bool = False) -> DataFrame:
+        """Fetches only the tiles of the request missing from the coverage index. Requires appendable xs and ts.
+
+        Safe to call from several threads. Each missing tile is fetched by the first thread claiming it, outside of
+        the lock; threads whose requests overlap an in-flight fetch wait for it instead of fetching again, and
+        requests for cached data never wait for fetches.
+        """
+        while True:
+            call_type, owned, pending, requested_value = self._claim_missing(entities, period)
+            if requested_value is not None:
+                break
+
+            for i, (tile_entities, tile_period, future) in enumerate(owned):
+                try:
+                    data = self._fetch(call_type, tile_entities, tile_period)
+                except BaseException as err:
+                    self._abandon(owned[i:], err)
+                    raise
+                with self._lock:
+                    self._add_tile(entities, period, tile_entities, tile_period, data)
+                    self._release(future)
+                future.set_result(None)
+
+            # Fetches of other threads re-raise their errors here, so every waiter sees them.
+            for future in pending:
+                future.result()
+
+        return requested_value.copy() if copy else requested_value
+
+    def _claim_missing(self, entities: dict, period: tuple) -> tuple:
+        """Returns (call_type, owned, pending, None) for the missing tiles, or (None, [], [], data) if none is."""
+        with self._lock:
+            call_type = "INITIAL" if self._blocks is None and self._value is None else "INCREMENTAL"
+            tiles = self.coverage.missing(entities, period)
+            self.budget.touch(entities, period)
+            if not tiles:
+                return None, [], [], self.subset(entities=entities, period=period)
+            logging.info("RUN %s: %s %s - %s", call_type, entities, *period)
+            logging.info("%s Tiles: %d", call_type, len(tiles))
+            return (call_type, ) + self._claim(tiles) + (None, )
+
+    def _add_tile(self, entities: dict, period: tuple, tile_entities: dict, tile_period: tuple,
+                  data: DataFrame) -> None:
+        self.update(ts=data)
+        self.coverage.add(tile_entities, tile_period)
+        self.budget.record(tile_entities, tile_period, approx_sizeof(data))
+        self._evict(entities, period)
+        self.entities, self.period = self.coverage.entities, self.coverage.period
+        self._loaded()
+
+    def _abandon(self, owned: list, err: BaseException) -> None:
+        # Fail the remaining claims too, so that no other thread waits for them forever.
+        with self._lock:
+            for _, _, future in owned:
+                self._release(future)
+        for _, _, future in owned:
+            future.set_exception(err)
+
+    def _claim(self, tiles: list) -> tuple:
+        """Splits tiles into parts claimed for fetching by this thread and in-flight fetches of other threads."""
+        pending = []
+        for tile_entities, tile_period in tiles:
+            for inflight_entities, inflight_period, future in self._inflight:
+                if future not in pending and overlaps(inflight_entities, inflight_period, tile_entities, tile_period):
+                    pending.append(future)
+        owned = []
+        for tile_entities, tile_period in tiles:
+            for part_entities, part_period in self._pending.missing(tile_entities, tile_period):
+                future = Future()
+                self._inflight.append((part_entities, part_period, future))
+                self._pending.add(part_entities, part_period)
+                owned.append((part_entities, part_period, future))
+        return owned, pending
+
+    def _release(self, future: Future) -> None:
+        self._inflight = [inflight for inflight in self._inflight if inflight[2] is not future]
+        self._pending.clear()
+        for inflight_entities, inflight_period, _ in self._inflight:
+            self._pending.add(inflight_entities, inflight_period)
+
+    def _evict(self, entities: dict, period: tuple) -> None:
+        """Evicts least recently used chunks, except those of the current request, until within the budget."""
+        evicted = self.budget.evict(self.resident_bytes, entities, period)
+        if not evicted:
+            return
+        for chunk_entities, chunk_period in evicted:
+            logging.info("EVICT: [%s] %s - %s", chunk_entities, *chunk_period)
+            self.coverage.remove(chunk_entities, chunk_period)
+
+        # Keep the columns of entity combinations and the rows of periods still covered, and release the rest.
+        value = self.value
+        levels, combos = self.coverage.levels, self.coverage.combos()
+        names = list(value.columns.names)
+        order = [names.index(level) for level in levels]
+        labels = value.columns if isinstance(value.columns, MultiIndex) else [(label, ) for label in value.columns]
+        columns = np.array([tuple(label[i] for i in order) in combos for label in labels], dtype=bool)
+        rows = np.zeros(len(value.index), dtype=bool)
+        for start, end in set(interval for intervals in combos.values() for interval in intervals):
+            rows |= (value.index >= start) & (value.index <= end)
+        self.value = value.iloc[rows, columns].copy()
+
+    @property
+    def resident_bytes(self) -> int:
+        if self._blocks is not None:
+            return self._blocks.nbytes
+        return 0 if self._value is None else approx_sizeof(self._value)
+
+    @property
+    def memory_stats(self) -> dict:
+        return dict(resident_bytes=self.resident_bytes, budget=self.budget.max_bytes, chunks=len(self.budget),
+                    evictions=self.budget.evictions, refetches=self.budget.refetches)
+
+    def _fetch(self, call_type: str, entities: dict, period: tuple) -> DataFrame:
+        if self.store is not None:
+            return self.store.fetch(self, call_type, entities, period)
+        return self._wrapped_execute(call_type, entities, period)
+
+    def _reset_coverage(self) -> None:
+        # Outside of the tiled path the cache always holds the full rectangle self.entities x self.period.
+        self.coverage.clear()
+        self.budget.clear()
+        if isinstance(self.entities, dict) and self.period is not None:
+            self.coverage.add(self.entities, self.period)
 
     def _wrapped_execute(self, call_type=None, entities=None, period=None) -> DataFrame:
         # with DataLogHandler().log_level()
         period_log = period if period is not None else (None, None)
-        logging.info("EXEC %s: [%s] %s - %s" %(call_type, str(entities), *period_log))
+        if self._preloaded:
+            data = self._pop_preloaded(entities, period, getattr(_preload_scope, 'token', None))
+            if data is not None:
+                logging.info("PRELOADED %s: [%s] %s - %s", call_type, entities, *period_log)
+                return data
+        logging.info("EXEC %s: [%s] %s - %s", call_type, entities, *period_log)
+        if not instrument.active:
+            return self._execute(entities=entities, period=period)
+        timer = instrument.Timer()
         results = self._execute(entities=entities, period=period)
+        self._record_fetch(call_type, results, timer)
         return results
 
+    def _record_fetch(self, call_type: str, data: DataFrame, timer: instrument.Timer) -> None:
+        measures = timer.elapsed()
+        if data is not None:
+            measures.update(rows=len(data), bytes=approx_sizeof(data))
+        instrument.record('fetch', self.__class__.__name__, call_type, **measures)
+
     @abstractmethod
     def _execute(self, call_type=None, entities=None, period=None) -> DataFrame:
         pass
 
+    @property
+    def supports_batch(self) -> bool:
+        hook = type(self)._execute_batch
+        return getattr(hook, '__func__', hook) is not PanelSource._execute_batch.__func__
+
+    @classmethod
+    def _execute_batch(cls, sources: list, entities=None, period=None) -> list:
+        """Optional hook fetching the same request for several sources of the class with one backend query.
+
+        Used by SourceManager when sources differing by their params, e.g. the variable they read, miss the same
+        (entities, period). Returns one DataFrame per source, in order, as _execute of that source would.
+        """
+        raise NotImplementedError
+
+    def planned(self, entities: dict = None, period: tuple = None) -> list:
+        """Returns the (entities, period) rectangles a call would fetch in the current state of the cache."""
+        with self._lock:
+            if self._resident(entities, period):
+                return self.store.missing(self, entities, period)
+            if self._tiled(entities, period):
+                return self.coverage.missing(entities, period)
+            return [piece[1:3] for piece in self._plan(entities, period)[0]]
+
+    def preload(self, entities: dict, period: tuple, data: DataFrame, token=None) -> None:
+        """Hands over data fetched elsewhere, returned instead of executing the source for exactly that request.
+
+        Data preloaded under a token is only used by the calls made within preload_scope(token), so that callers
+        preloading the same request concurrently, e.g. the calls and prefetches of a SourceManager, neither use nor
+        discard each other's data. Data preloaded without a token is used by calls outside of any scope.
+        """
+        with self._lock:
+            self._preloaded.setdefault(self._preload_key(entities, period), {})[token] = data
+
+    def discard_preloaded(self, entities: dict, period: tuple, token=None) -> None:
+        """Drops preloaded data the source did not use."""
+        self._pop_preloaded(entities, period, token)
+
+    def _pop_preloaded(self, entities: dict, period: tuple, token=None) -> DataFrame:
+        key = self._preload_key(entities, period)
+        with self._lock:
+            preloaded = self._preloaded.get(key)
+            if preloaded is None:
+                return None
+            data = preloaded.pop(token, None)
+            if not preloaded:
+                del self._preloaded[key]
+            return data
+
+    @staticmethod
+    def _preload_key(entities, period) -> tuple:
+        return fingerprint(entities), fingerprint(period)
+
     # TODO: Convert this method to a Fu
     def mismatch_period(self, period: tuple) -> tuple:
         if period is None:
             incremental, total = None, self.period
+        elif self.period is None:
+            incremental, total = period, period
         else:
-            if self.period is None:
-                incremental, total = period, period
-            else:
-                total = (min(period[0], self.period[0]), max(period[1], self.period[1]))
+            total = (min(period[0], self.period[0]), max(period[1], self.period[1]))
                 
             if total[0] < self.period[0]:
                 if total[1] > self.period[1]:
@@ -141,62 +503,184 @@ class PanelSource:
     # TODO: Convert this method to a Func
     def mismatch_entities(self, entities: dict) -> tuple:
         if self.entities is None:
-            incremental_entities, total_entities = entities, entities
+            incremental_entities, decremental_entities, total_entities = entities, None, entities
+        elif entities is None:
+            incremental_entities, decremental_entities, total_entities = None, None, self.entities
         else:
-            initial = [dict(zip(self.entities, x)) for x in itertools.product(*self.entities.values())]
-            new = [dict(zip(entities, x)) for x in itertools.product(*entities.values())]
-            
-            total_entities = dict()
+            # Set algebra on the levels gives the same result as comparing the cartesian products of the levels:
+            # the product of the union misses combinations of the cached product iff a level has new values, and
+            # a level only contributes its new values unless another level has new values as well.
+            total_entities, new_values = dict(), dict()
             for level in self.entities.keys():
-                s1, s2 = set(self.entities[level]), set(entities[level])
-                total_entities[level] = list(s1.union(s2))
-            total = [dict(zip(total_entities, x)) for x in itertools.product(*total_entities.values())]
-            
-            incremental = list(filter(lambda x: x not in initial, total))
-            if len(incremental) > 0:
+                s1, s2 = dict.fromkeys(self.entities[level]), dict.fromkeys(entities[level])
+                total_entities[level] = list(s1) + [x for x in s2 if x not in s1]
+                new_values[level] = [x for x in s2 if x not in s1]
+
+            incremental_levels = [level for level, values in new_values.items() if len(values) > 0]
+            if len(incremental_levels) > 0:
                 incremental_entities = dict()
                 for level in self.entities.keys():
-                    incremental_entities[level] = list(set(map(lambda x: x[level], incremental)))
+                    if incremental_levels == [level]:
+                        incremental_entities[level] = new_values[level]
+                    else:
+                        incremental_entities[level] = total_entities[level]
             else:
                 incremental_entities = None
-                
-            decremental = list(filter(lambda x: x not in new, total))
-            if len(decremental) > 0:
+
+            decremental = any(len(set(total_entities[level]).difference(entities[level])) > 0
+                              for level in self.entities.keys())
+            if decremental:
                 decremental_entities = dict()
             else:
                 decremental_entities = None
 
         return incremental_entities, decremental_entities, total_entities
 
+    @property
+    def value(self) -> DataFrame:
+        if self._blocks is not None:
+            return self._blocks.frame()
+        return self._value
+
+    @value.setter
+    def value(self, value: DataFrame) -> None:
+        self._blocks, self._value = None, None
+        if value is not None:
+            self._merge(value)
+
     def update(self, xs=None, ts=None) -> None:
-        if self.value is None:
-            if ts is not None:
-                self.value = ts
-            elif xs is not None:
-                self.value = xs
+        """Merges fetched data into the cache and notifies the subscribers of the rows appended."""
+        for data in (ts, xs):
+            if data is None:
+                continue
+            delta = self._appended(data) if self._listeners else None
+            self._merge(data)
+            for listener in self._listeners:
+                listener(self, delta)
+
+    def _merge(self, data: DataFrame, overwrite: bool = False) -> None:
+        """Merges data into the cache, filling missing values only, or replacing existing ones with overwrite."""
+        if self._blocks is None and self._value is None and self.columnar and PanelBlocks.supports(data):
+            self._blocks = PanelBlocks()
+        if self._blocks is not None:
+            try:
+                self._blocks.append(data, overwrite)
+                return
+            except TypeError:
+                self._value, self._blocks = self._blocks.frame(), None
+        if self._value is None:
+            self._value = data
+        elif overwrite:
+            self._value = data.combine_first(self._value)
         else:
-            if ts is not None:
-                self.value = self.value.combine_first(ts)
-            if xs is not None:
-                self.value = self.value.combine_first(xs)
-        
-    # TODO: Convert this to a Func
-    def subset(self, entities: dict = None, period: tuple = None) -> DataFrame:
-        data = None
-        if self.value is not None:
-            data = self.value.copy()
-            if period is not None:
-                data = data.truncate(before=period[0], after=period[1])
-            if entities is not None:
-                # TODO: Create a Func to subset a MultiIndex DataFrame that takes a dict of levels and values
-                #   values and returns a subset of the DataFrame
-                data = data.subset(entities)
-            
+            self._value = self._value.combine_first(data)
+
+    def _appended(self, data: DataFrame) -> DataFrame:
+        """Returns the rows data appends after the last row of the cache, or None if it changes anything else."""
+        value = self.value
+        if value is None or len(value.index) == 0 or not data.columns.isin(value.columns).all():
+            return None
+        last = value.index[-1]
+        head, tail = data[data.index <= last], data[data.index > last]
+        if len(head) > 0:
+            # Rows overlapping the cache, e.g. the shared end point of incremental periods, must not fill any cell.
+            existing = value.reindex(index=head.index, columns=head.columns)
+            if (existing.isna() & head.notna()).to_numpy().any():
+                return None
+        return tail.reindex(columns=value.columns)
+
+    def subscribe(self, listener) -> None:
+        """Calls listener(source, delta) after every update of the cache.
+
+        The delta holds the rows appended after the last row of the cache, with all the columns of the cache. It is
+        None when an update changed earlier rows or added columns, or when the source was reset: the whole value
+        must then be processed again.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener) -> None:
+        with self._lock:
+            self._listeners.remove(listener)
+
+    def subset(self, entities: dict = None, period: tuple = None, copy: bool = False) -> DataFrame:
+        """Returns the cached block for the entities and period without copying it, unless copy is True.
+
+        The block is read-only: see zpmeta.sources.slicing.subset_panel.
+        """
+        return subset_panel(self.value, entities=entities, period=period, copy=copy)
+
+    def stream(self, entities: dict = None, period: tuple = None, period_step=None, entity_step: int = None,
+               level: str = None, prefetch: int = 1, cache: bool = True, copy: bool = False):
+        """Returns an iterator over the request in chunks, so that it never needs to be held in memory at once.
+
+        Chunks are yielded period after period, and within a period entity group after entity group. Rows shared by
+        consecutive sub-periods are only yielded with the first of them.
+
+        Args:
+            entities: Entities of the request, a dict of level name to values.
+            period: Period of the request.
+            period_step: Length of the sub-periods, e.g. a timedelta. None not to split the period.
+            entity_step: Number of values of level per chunk. None not to split the entities.
+            level: Level split by entity_step. Defaults to the first level of entities.
+            prefetch: Number of chunks fetched in background threads ahead of the one being consumed.
+            cache: If True, chunks are fetched through the cache like calls. Peak memory is then bounded by the chunk
+                size only when the source has a memory_budget. If False, chunks bypass the cache.
+            copy: Yield independent copies of the cached blocks, see subset.
+        """
+        if prefetch < 0:
+            raise ValueError("prefetch must be non-negative!")
+        return self._stream(self._stream_chunks(entities, period, period_step, entity_step, level), prefetch,
+                            cache, copy)
+
+    @staticmethod
+    def _stream_chunks(entities: dict, period: tuple, period_step, entity_step: int, level: str) -> list:
+        periods = [period] if period is None else split_period(period, period_step)
+        groups = [entities]
+        if entity_step is not None:
+            if entities is None:
+                raise ValueError("entity_step requires entities!")
+            level = next(iter(entities)) if level is None else level
+            if level not in entities:
+                raise KeyError("Level %s not found in the entities!" % level)
+            values = list(entities[level])
+            groups = [dict(entities, **{level: values[i:i + entity_step]}) for i in range(0, len(values), entity_step)]
+        return [(group, part, i > 0) for i, part in enumerate(periods) for group in groups]
+
+    def _stream_chunk(self, entities: dict, period: tuple, trim: bool, cache: bool, copy: bool) -> DataFrame:
+        data = self._run(entities, period, copy) if cache else self._fetch("STREAM", entities, period)
+        if trim and data is not None:
+            data = data[data.index > period[0]]
         return data
 
+    def _stream(self, chunks: list, prefetch: int, cache: bool, copy: bool):
+        if prefetch == 0:
+            for chunk in chunks:
+                yield self._stream_chunk(*chunk, cache, copy)
+            return
+
+        pool = ThreadPoolExecutor(max_workers=prefetch)
+        futures = deque()
+        try:
+            for chunk in chunks:
+                futures.append(pool.submit(self._stream_chunk, *chunk, cache, copy))
+                if len(futures) > prefetch:
+                    yield futures.popleft().result()
+            while futures:
+                yield futures.popleft().result()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
     def reset(self) -> None:
-        self.entities, self.period = None, None
-        self.value = None
+        with self._lock:
+            self.entities, self.period = None, None
+            self.value = None
+            self.coverage.clear()
+            self.budget.clear()
+            if self.freshness is not None:
+                self.freshness.clear()
+            for listener in self._listeners:
+                listener(self, None)
 
     @staticmethod
     def check_consistency(params: dict = None) -> object:
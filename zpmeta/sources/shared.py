@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 Zeroth-Principles
+#
+# This file is part of Zeroth-Meta.
+#
+#  Zeroth-Meta is free software: you can redistribute it and/or modify it under the
+#  terms of the GNU General Public License as published by the Free Software
+#  Foundation, either version 3 of the License, or (at your option) any later
+#  version.
+#
+#  Zeroth-Meta is distributed in the hope that it will be useful, but WITHOUT ANY
+#  WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+#  A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License along with
+#  Zeroth-Meta. If not, see <http://www.gnu.org/licenses/>.
+#
+"""Panel tiles published in memory-mapped segments and attached read-only by every process on a machine."""
+
+import asyncio
+import fcntl
+import logging
+import os
+import pickle
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pandas import DataFrame
+from zpmeta.funcs.transport import SharedPandas, default_directory
+from zpmeta.sources.coverage import CoverageIndex, overlaps
+from zpmeta.sources.slicing import subset_panel
+from zpmeta.sources.store import PanelStore
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class SharedPanelCache:
+    """Cache of panel tiles shared by the worker processes of a machine, e.g. the workers of a web server.
+
+    Used as the store of a PanelSource appendable in both xs and ts. Fetched tiles are published as NumPy segments
+    in a directory, by default on /dev/shm, and every process attaches them as read-only DataFrames backed by memory
+    maps, so the data is held once in the page cache instead of once per process. Such sources do not accumulate
+    their own value: calls return the tiles straight from the segments, without copying when the request lies
+    within a single tile.
+
+    The coverage of the published tiles and the tiles being fetched are recorded in a manifest updated under a file
+    lock, so a tile published or claimed by one process is never fetched by another. Processes created with owner
+    False never execute the source: they record the tiles they miss as requests and wait for an owner process
+    running serve to publish them. Claims of processes that died are ignored, and their tiles fetched again.
+
+    Args:
+        root: Directory holding the segments. Defaults to a directory in /dev/shm, or else the temporary directory.
+        owner: Whether this process fetches the missing tiles itself.
+        timeout: Seconds to wait for tiles fetched by other processes before raising TimeoutError. None to wait
+            forever.
+        poll_interval: Seconds between checks of the manifest while waiting.
+    """
+    resident = True
+
+    def __init__(self, root: str = None, owner: bool = True, timeout: float = None,
+                 poll_interval: float = 0.05) -> None:
+        self.root = os.path.join(default_directory(), 'zpmeta-panels') if root is None else root
+        self.owner = owner
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._manifests = {}
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "%s(root=%s, owner=%s)" % (self.__class__.__name__, self.root, self.owner)
+
+    provenance = staticmethod(PanelStore.provenance)
+
+    def _directory(self, source) -> str:
+        return os.path.join(self.root, self.provenance(source))
+
+    def _manifest(self, source) -> tuple:
+        """Returns (state, coverage, pending) for the source, reloading the manifest if another process changed it.
+
+        The state holds the published tiles as (name, handle, entities, period), the claims of the tiles being
+        fetched as (entities, period, pid), and the requests of non-owner processes as (entities, period).
+        """
+        directory = self._directory(source)
+        path = os.path.join(directory, 'manifest.pkl')
+        try:
+            stat = os.stat(path)
+            stamp = (stat.st_ino, stat.st_mtime_ns)
+        except FileNotFoundError:
+            stamp = None
+        cached = self._manifests.get(directory)
+        if cached is not None and cached[0] == stamp:
+            return cached[1:]
+
+        state = dict(tiles=[], claims=[], requests=[])
+        if stamp is not None:
+            with open(path, 'rb') as file:
+                state = pickle.load(file)
+        coverage, pending = CoverageIndex(), CoverageIndex()
+        for _, _, tile_entities, tile_period in state['tiles']:
+            coverage.add(tile_entities, tile_period)
+        for claim_entities, claim_period, pid in state['claims']:
+            if _alive(pid):
+                pending.add(claim_entities, claim_period)
+        self._manifests[directory] = (stamp, state, coverage, pending)
+        return state, coverage, pending
+
+    @contextmanager
+    def _transaction(self, source):
+        """Yields (state, coverage, pending) under the lock of the source, writing the state back on exit."""
+        directory = self._directory(source)
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, 'lock'), 'a+b') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                # Read the manifest afresh, as the coverage objects are modified in the transaction.
+                self._manifests.pop(directory, None)
+                state, coverage, pending = self._manifest(source)
+                state = dict(tiles=list(state['tiles']), claims=list(state['claims']),
+                             requests=list(state['requests']))
+                yield state, coverage, pending
+                path = os.path.join(directory, 'manifest.pkl')
+                tmp_path = "%s.%s.tmp" % (path, uuid.uuid4().hex)
+                with open(tmp_path, 'wb') as file:
+                    pickle.dump(state, file)
+                os.replace(tmp_path, path)
+            finally:
+                self._manifests.pop(directory, None)
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def missing(self, source, entities: dict, period: tuple) -> list:
+        """Returns the rectangles of the request not published yet."""
+        _, coverage, _ = self._manifest(source)
+        return coverage.missing(entities, period)
+
+    def load(self, source, entities: dict, period: tuple) -> DataFrame:
+        """Returns the published data intersecting the request, or None if there is none.
+
+        The data is a read-only view of the segments when the request lies within a single tile, and a copy of the
+        requested block otherwise.
+        """
+        state, _, _ = self._manifest(source)
+        data = None
+        for name, handle, tile_entities, tile_period in state['tiles']:
+            if not overlaps(tile_entities, tile_period, entities, period):
+                continue
+            tile = subset_panel(self._view(name, handle), entities, period)
+            data = tile if data is None else data.combine_first(tile)
+        return data
+
+    def _view(self, name: str, handle: SharedPandas) -> DataFrame:
+        with self._lock:
+            view = self._views.get(name)
+            if view is None:
+                view = self._views[name] = handle.attach()
+            return view
+
+    def save(self, source, data: DataFrame, entities: dict, period: tuple) -> None:
+        """Publishes a fetched tile and releases its claim."""
+        directory = self._directory(source)
+        os.makedirs(directory, exist_ok=True)
+        handle = SharedPandas.create(data, directory)
+        with self._transaction(source) as (state, coverage, _):
+            state['tiles'].append((uuid.uuid4().hex, handle, entities, period))
+            coverage = CoverageIndex()
+            for _, _, tile_entities, tile_period in state['tiles']:
+                coverage.add(tile_entities, tile_period)
+            state['claims'] = [claim for claim in state['claims']
+                               if not (claim[2] == os.getpid() and claim[:2] == (entities, period))]
+            state['requests'] = [request for request in state['requests'] if not coverage.covers(*request)]
+        logging.debug("SHARED SAVE %s: [%s] %s - %s", self.provenance(source), entities, *period)
+
+    def _claim(self, source, entities: dict, period: tuple, owner: bool) -> tuple:
+        """Returns (done, owned): whether the request is published, and the tiles this process must fetch.
+
+        Non-owners record the missing tiles not claimed by any process as requests instead of claiming them.
+        """
+        _, coverage, _ = self._manifest(source)
+        if coverage.covers(entities, period):
+            return True, []
+        with self._transaction(source) as (state, coverage, pending):
+            missing = coverage.missing(entities, period)
+            if not missing:
+                return True, []
+            owned = []
+            for tile_entities, tile_period in missing:
+                for part in pending.missing(tile_entities, tile_period):
+                    pending.add(*part)
+                    owned.append(part)
+            if owner:
+                state['claims'] = [claim for claim in state['claims'] if _alive(claim[2])]
+                state['claims'].extend(part + (os.getpid(), ) for part in owned)
+            else:
+                state['requests'].extend(part for part in owned if part not in state['requests'])
+                owned = []
+        return False, owned
+
+    def _unclaim(self, source, owned: list) -> None:
+        with self._transaction(source) as (state, _, _):
+            state['claims'] = [claim for claim in state['claims']
+                               if not (claim[2] == os.getpid() and claim[:2] in owned)]
+
+    def _check_deadline(self, deadline: float, entities: dict, period: tuple) -> None:
+        if deadline is not None and time.monotonic() > deadline:
+            raise TimeoutError("Tiles of %s %s were not published in time!" % (entities, period))
+
+    def fetch(self, source, call_type: str, entities: dict, period: tuple) -> DataFrame:
+        """Returns the request from the published tiles, fetching or waiting for the missing ones first."""
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            done, owned = self._claim(source, entities, period, self.owner)
+            if done:
+                return self.load(source, entities, period)
+            self._fetch_owned(source, call_type, owned)
+            if not owned:
+                self._check_deadline(deadline, entities, period)
+                time.sleep(self.poll_interval)
+
+    async def afetch(self, source, call_type: str, entities: dict, period: tuple) -> DataFrame:
+        """Awaitable version of fetch, executing the missing tiles through the _aexecute of an AsyncPanelSource."""
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            done, owned = self._claim(source, entities, period, self.owner)
+            if done:
+                return self.load(source, entities, period)
+            for i, (tile_entities, tile_period) in enumerate(owned):
+                try:
+                    tile = await source._wrapped_aexecute(call_type, tile_entities, tile_period)
+                except BaseException:
+                    self._unclaim(source, owned[i:])
+                    raise
+                self.save(source, tile, tile_entities, tile_period)
+            if not owned:
+                self._check_deadline(deadline, entities, period)
+                await asyncio.sleep(self.poll_interval)
+
+    def _fetch_owned(self, source, call_type: str, owned: list) -> None:
+        for i, (tile_entities, tile_period) in enumerate(owned):
+            try:
+                tile = source._wrapped_execute(call_type, tile_entities, tile_period)
+            except BaseException:
+                # Give up the remaining claims, so that other processes fetch them instead of waiting.
+                self._unclaim(source, owned[i:])
+                raise
+            self.save(source, tile, tile_entities, tile_period)
+
+    def serve_pending(self, source) -> int:
+        """Fetches the tiles requested by non-owner processes, and returns the number of tiles fetched."""
+        state, _, _ = self._manifest(source)
+        count = 0
+        for request_entities, request_period in state['requests']:
+            done, owned = self._claim(source, request_entities, request_period, True)
+            if not done:
+                self._fetch_owned(source, "SHARED", owned)
+                count += len(owned)
+        return count
+
+    def serve(self, source, stop: threading.Event) -> None:
+        """Fetches the tiles requested by non-owner processes until stop is set."""
+        while not stop.is_set():
+            if self.serve_pending(source) == 0:
+                stop.wait(self.poll_interval)
+
+    def clear(self, source) -> None:
+        """Deletes every tile published for the source. Views attached before stay valid on POSIX systems."""
+        with self._transaction(source) as (state, _, _):
+            tiles = state['tiles']
+            state['tiles'], state['requests'] = [], []
+        with self._lock:
+            for name, handle, _, _ in tiles:
+                self._views.pop(name, None)
+                handle.unlink()
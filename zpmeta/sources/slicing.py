@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 Zeroth-Principles
+#
+# This file is part of Zeroth-Meta.
+#
+#  Zeroth-Meta is free software: you can redistribute it and/or modify it under the
+#  terms of the GNU General Public License as published by the Free Software
+#  Foundation, either version 3 of the License, or (at your option) any later
+#  version.
+#
+#  Zeroth-Meta is distributed in the hope that it will be useful, but WITHOUT ANY
+#  WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+#  A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License along with
+#  Zeroth-Meta. If not, see <http://www.gnu.org/licenses/>.
+#
+"""Slicing of panel DataFrames by entities (column levels) and period (index)."""
+
+import numpy as np
+import pandas
+from pandas import DataFrame, Index, MultiIndex
+
+# Copy-on-write is always enabled from pandas 3, and optional in pandas 2.
+_PANDAS_COW = int(pandas.__version__.split('.')[0]) >= 3
+
+
+def _copy_on_write() -> bool:
+    return _PANDAS_COW or pandas.options.mode.copy_on_write is True
+
+
+def _read_only(data: DataFrame) -> DataFrame:
+    """Marks the NumPy blocks of data read-only, so that writing to a view cannot change the panel it was taken from.
+
+    Only the arrays of data are affected: the panel keeps its own, writable arrays. Extension arrays are left as is.
+    """
+    for block in data._mgr.blocks:  # pylint: disable=protected-access
+        if isinstance(block.values, np.ndarray):
+            block.values.flags.writeable = False
+    return data
+
+
+def period_indexer(index: Index, period: tuple = None):
+    """Returns the rows of index within the closed period, as a slice when the index is sorted."""
+    if period is None:
+        return slice(None)
+    if index.is_monotonic_increasing:
+        start = index.searchsorted(period[0], side='left')
+        stop = index.searchsorted(period[1], side='right')
+        return slice(start, stop)
+    return np.flatnonzero((index >= period[0]) & (index <= period[1]))
+
+
+def entity_indexer(columns: Index, entities: dict = None):
+    """Returns the columns matching the entities, a dict of level name to values, as a slice when contiguous."""
+    if entities is None:
+        return slice(None)
+
+    mask = np.ones(len(columns), dtype=bool)
+    for level, values in entities.items():
+        if isinstance(columns, MultiIndex):
+            if level not in columns.names:
+                raise KeyError("Level %s not found in the columns!" % level)
+            level_values = columns.get_level_values(level)
+        elif level == columns.name or len(entities) == 1:
+            level_values = columns
+        else:
+            raise KeyError("Level %s not found in the columns!" % level)
+        mask &= level_values.isin(list(values))
+
+    positions = np.flatnonzero(mask)
+    if len(positions) == 0:
+        return positions
+    if positions[-1] - positions[0] + 1 == len(positions):
+        return slice(int(positions[0]), int(positions[-1]) + 1)
+    return positions
+
+
+def subset_panel(data: DataFrame, entities: dict = None, period: tuple = None, copy: bool = False) -> DataFrame:
+    """Returns the block of data for the entities and period.
+
+    Contiguous blocks are taken with positional slices, which pandas returns without copying the data. With
+    copy-on-write (always on from pandas 3) the result is a lazy copy that only materialises when written to, so
+    the cached panel is never modified through it. Without copy-on-write the result shares memory with data, and
+    its NumPy blocks are made read-only: writing to it raises ValueError instead of corrupting data. Pass copy=True
+    for an independent, writable copy.
+    """
+    if data is None:
+        return None
+    # Always derive a new object, even for the full panel, so that callers never hold the cache itself.
+    data = data.iloc[period_indexer(data.index, period), entity_indexer(data.columns, entities)]
+    if copy:
+        return data.copy()
+    return data if _copy_on_write() else _read_only(data)
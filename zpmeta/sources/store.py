@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 Zeroth-Principles
+#
+# This file is part of Zeroth-Meta.
+#
+#  Zeroth-Meta is free software: you can redistribute it and/or modify it under the
+#  terms of the GNU General Public License as published by the Free Software
+#  Foundation, either version 3 of the License, or (at your option) any later
+#  version.
+#
+#  Zeroth-Meta is distributed in the hope that it will be useful, but WITHOUT ANY
+#  WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR
+#  A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#  You should have received a copy of the GNU General Public License along with
+#  Zeroth-Meta. If not, see <http://www.gnu.org/licenses/>.
+#
+"""Persistent, columnar storage of the panel tiles loaded by PanelSource."""
+
+import asyncio
+import logging
+import os
+import pickle
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pandas import DataFrame
+from zpmeta.sources.coverage import CoverageIndex, overlaps
+from zpmeta.sources.slicing import subset_panel
+from zpmeta.utils.fingerprint import fingerprint
+
+FORMATS = ('arrow', 'parquet')
+# Without fcntl, e.g. on Windows, the manifest is only locked between the threads of a process.
+_LOCAL_LOCK = threading.Lock()
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as err:
+        raise ImportError("PanelStore requires pyarrow. Install it with 'pip install pyarrow'.") from err
+    return pyarrow
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class PanelStore:
+    """Store of panel tiles in local columnar files, shared by every process on a machine.
+
+    Each fetched tile, i.e. an (entities, period) rectangle, is written to its own file under a directory named
+    after the provenance of the data: the source class and a fingerprint of its params. A manifest next to the
+    files records the tiles, from which the coverage of the store is rebuilt, so that a new process only reads
+    the files intersecting its request. The manifest is updated under a file lock, so that processes writing tiles
+    concurrently do not lose each other's tiles. Missing tiles are claimed under the same lock before they are
+    fetched: a process missing a tile claimed by another one waits for it to be saved instead of fetching it again,
+    unless the claiming process died. Arrow IPC files (the default) are read through memory maps; parquet files are
+    smaller but must be decoded. Tiles are read according to their file extension, so a store may be reopened with
+    the other format.
+
+    Args:
+        root: Directory holding the store.
+        format: 'arrow' or 'parquet'.
+        timeout: Seconds to wait for tiles claimed by other processes before raising TimeoutError. None to wait
+            forever.
+        poll_interval: Seconds between checks of the manifest while waiting.
+    """
+    def __init__(self, root: str, format: str = 'arrow', timeout: float = None,  # pylint: disable=redefined-builtin
+                 poll_interval: float = 0.05) -> None:
+        if format not in FORMATS:
+            raise ValueError("format must be one of %s!" % (FORMATS, ))
+        self._pa = _import_pyarrow()
+        self.root = root
+        self.format = format
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._manifests = {}
+
+    def __repr__(self):
+        return "%s(root=%s, format=%s)" % (self.__class__.__name__, self.root, self.format)
+
+    @staticmethod
+    def provenance(source) -> str:
+        cls = source.__class__
+        return "%s.%s-%s" % (cls.__module__, cls.__qualname__, fingerprint(source.params))
+
+    def _directory(self, source) -> str:
+        return os.path.join(self.root, self.provenance(source))
+
+    def _manifest(self, source) -> tuple:
+        """Returns (tiles, coverage) for the source, reloading the manifest if another process changed it."""
+        directory = self._directory(source)
+        path = os.path.join(directory, 'manifest.pkl')
+        mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        cached = self._manifests.get(directory)
+        if cached is not None and cached[0] == mtime:
+            return cached[1], cached[2]
+
+        tiles = []
+        if mtime is not None:
+            with open(path, 'rb') as file:
+                tiles = pickle.load(file)
+        coverage = CoverageIndex()
+        for _, tile_entities, tile_period in tiles:
+            coverage.add(tile_entities, tile_period)
+        self._manifests[directory] = (mtime, tiles, coverage)
+        return tiles, coverage
+
+    @contextmanager
+    def _locked(self, source):
+        """Yields the directory of the source under its file lock."""
+        try:
+            import fcntl
+        except ImportError:
+            fcntl = None
+        directory = self._directory(source)
+        os.makedirs(directory, exist_ok=True)
+        if fcntl is None:
+            with _LOCAL_LOCK:
+                yield directory
+            return
+        with open(os.path.join(directory, 'lock'), 'a+b') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield directory
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _transaction(self, source):
+        """Yields the list of tiles of the source under its file lock, writing the list back on exit."""
+        with self._locked(source) as directory:
+            try:
+                # Read the manifest afresh, as another process may have changed it within the mtime resolution.
+                self._manifests.pop(directory, None)
+                tiles, _ = self._manifest(source)
+                tiles = list(tiles)
+                yield tiles
+                self._replace(os.path.join(directory, 'manifest.pkl'), tiles)
+            finally:
+                self._manifests.pop(directory, None)
+
+    @staticmethod
+    def _replace(path: str, obj) -> None:
+        tmp_path = "%s.%s.tmp" % (path, uuid.uuid4().hex)
+        with open(tmp_path, 'wb') as file:
+            pickle.dump(obj, file)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _claims(directory: str) -> list:
+        """Returns the claims of the tiles being fetched, as (entities, period, pid), of processes still alive."""
+        path = os.path.join(directory, 'claims.pkl')
+        if not os.path.exists(path):
+            return []
+        with open(path, 'rb') as file:
+            return [claim for claim in pickle.load(file) if _alive(claim[2])]
+
+    def _claim(self, source, entities: dict, period: tuple) -> tuple:
+        """Returns (owned, waiting): the missing tiles claimed by this process, and those claimed by others."""
+        with self._locked(source) as directory:
+            self._manifests.pop(directory, None)
+            _, coverage = self._manifest(source)
+            missing = coverage.missing(entities, period)
+            if not missing:
+                return [], []
+            claims = self._claims(directory)
+            pending = CoverageIndex()
+            for claim_entities, claim_period, _ in claims:
+                pending.add(claim_entities, claim_period)
+            owned, waiting = [], []
+            for tile_entities, tile_period in missing:
+                if pending.intersects(tile_entities, tile_period):
+                    waiting.append((tile_entities, tile_period))
+                owned.extend(pending.missing(tile_entities, tile_period))
+            if owned:
+                claims.extend(part + (os.getpid(), ) for part in owned)
+                self._replace(os.path.join(directory, 'claims.pkl'), claims)
+        return owned, waiting
+
+    def _unclaim(self, source, owned: list) -> None:
+        with self._locked(source) as directory:
+            self._drop_claims(directory, owned)
+
+    def _drop_claims(self, directory: str, owned: list) -> None:
+        """Drops the claims of this process on the given tiles; to be called under the file lock."""
+        claims = self._claims(directory)
+        kept = [claim for claim in claims if not (claim[2] == os.getpid() and claim[:2] in owned)]
+        if len(kept) != len(claims):
+            self._replace(os.path.join(directory, 'claims.pkl'), kept)
+
+    def _check_deadline(self, deadline: float, entities: dict, period: tuple) -> None:
+        if deadline is not None and time.monotonic() > deadline:
+            raise TimeoutError("Tiles of %s %s were not saved in time!" % (entities, period))
+
+    def missing(self, source, entities: dict, period: tuple) -> list:
+        """Returns the rectangles of the request not found in the store."""
+        _, coverage = self._manifest(source)
+        return coverage.missing(entities, period)
+
+    def load(self, source, entities: dict, period: tuple) -> DataFrame:
+        """Reads the stored data intersecting the request, or returns None if there is none."""
+        tiles, _ = self._manifest(source)
+        data = None
+        for name, tile_entities, tile_period in tiles:
+            if not overlaps(tile_entities, tile_period, entities, period):
+                continue
+            tile = subset_panel(self._read(os.path.join(self._directory(source), name)), entities, period)
+            data = tile if data is None else data.combine_first(tile)
+        return data
+
+    def save(self, source, data: DataFrame, entities: dict, period: tuple) -> None:
+        """Writes a fetched tile and records it in the manifest."""
+        directory = self._directory(source)
+        os.makedirs(directory, exist_ok=True)
+        name = "%s.%s" % (uuid.uuid4().hex, self.format)
+        self._write(data, os.path.join(directory, name))
+        with self._transaction(source) as tiles:
+            tiles.append((name, entities, period))
+            self._drop_claims(directory, [(entities, period)])
+        logging.debug("STORE SAVE %s: [%s] %s - %s", self.provenance(source), entities, *period)
+
+    def fetch(self, source, call_type: str, entities: dict, period: tuple) -> DataFrame:
+        """Returns the tile from the store, executing the source only for the parts not stored or claimed yet."""
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            owned, waiting = self._claim(source, entities, period)
+            for i, (tile_entities, tile_period) in enumerate(owned):
+                try:
+                    tile = source._wrapped_execute(call_type, tile_entities, tile_period)
+                except BaseException:
+                    # Give up the remaining claims, so that other processes fetch them instead of waiting.
+                    self._unclaim(source, owned[i:])
+                    raise
+                self.save(source, tile, tile_entities, tile_period)
+            if not waiting:
+                return self.load(source, entities, period)
+            self._check_deadline(deadline, entities, period)
+            time.sleep(self.poll_interval)
+
+    async def afetch(self, source, call_type: str, entities: dict, period: tuple) -> DataFrame:
+        """Awaitable version of fetch, executing the missing parts through the _aexecute of an AsyncPanelSource."""
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            owned, waiting = self._claim(source, entities, period)
+            for i, (tile_entities, tile_period) in enumerate(owned):
+                try:
+                    tile = await source._wrapped_aexecute(call_type, tile_entities, tile_period)
+                except BaseException:
+                    self._unclaim(source, owned[i:])
+                    raise
+                self.save(source, tile, tile_entities, tile_period)
+            if not waiting:
+                return self.load(source, entities, period)
+            self._check_deadline(deadline, entities, period)
+            await asyncio.sleep(self.poll_interval)
+
+    def clear(self, source) -> None:
+        """Deletes every tile stored for the source."""
+        directory = self._directory(source)
+        with self._transaction(source) as tiles:
+            names = [name for name, _, _ in tiles]
+            tiles.clear()
+        for name in names:
+            os.remove(os.path.join(directory, name))
+
+    def _write(self, data: DataFrame, path: str) -> None:
+        pa = self._pa
+        table = pa.Table.from_pandas(data, preserve_index=True)
+        tmp_path = path + '.tmp'
+        if self.format == 'arrow':
+            with pa.OSFile(tmp_path, 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+        else:
+            pa.parquet.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+
+    def _read(self, path: str) -> DataFrame:
+        pa = self._pa
+        if path.endswith('.arrow'):
+            with pa.memory_map(path, 'r') as source:
+                table = pa.ipc.open_file(source).read_all()
+        else:
+            table = pa.parquet.read_table(path, memory_map=True)
+        return table.to_pandas()
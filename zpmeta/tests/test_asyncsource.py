@@ -0,0 +1,56 @@
+"""Tests of AsyncPanelSource: coalesced concurrent calls and sub-period fetches."""
+
+import asyncio
+import numpy as np
+from pandas import DataFrame, Index, Timedelta, Timestamp, date_range
+from zpmeta.sources.asyncsource import AsyncPanelSource
+
+START = Timestamp('2020-01-01')
+
+
+def _period(first: int, last: int) -> tuple:
+    return START + Timedelta(days=first), START + Timedelta(days=last)
+
+
+def _panel(entities: dict, period: tuple) -> DataFrame:
+    index = date_range(period[0], period[1], freq='D', name='date')
+    values = np.add.outer(np.asarray(index.dayofyear, dtype=float), [ord(entity[0]) for entity in entities['id']])
+    return DataFrame(values, index=index, columns=Index(entities['id'], name='id'))
+
+
+class _Source(AsyncPanelSource):
+    def __init__(self, xs: bool = True, **kwargs) -> None:
+        super(_Source, self).__init__(**kwargs)
+        self.appendable = dict(xs=xs, ts=True)
+        self.calls = []
+        self.running, self.max_running = 0, 0
+
+    async def _aexecute(self, entities=None, period=None) -> DataFrame:
+        self.calls.append((entities, period))
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.05)
+        self.running -= 1
+        return _panel(entities, period)
+
+
+def test_concurrent_calls_are_coalesced():
+    source, entities, period = _Source(), dict(id=['a', 'b']), _period(0, 9)
+
+    async def main():
+        return await asyncio.gather(*(source(entities, period) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert source.calls == [(entities, period)]
+    assert all(result.equals(_panel(entities, period)) for result in results)
+
+
+def test_period_step_splits_fetches():
+    for xs in (True, False):
+        source = _Source(xs=xs, period_step=Timedelta(days=10), max_concurrency=2)
+        entities, period = dict(id=['a']), _period(0, 39)
+        result = asyncio.run(source(entities, period))
+        assert result.equals(_panel(entities, period))
+        parts = [_period(0, 10), _period(10, 20), _period(20, 30), _period(30, 39)]
+        assert sorted(call[1] for call in source.calls) == parts
+        assert source.max_running == 2
@@ -0,0 +1,61 @@
+"""Tests of the batched execution of MapOperands and MapParams."""
+
+import numpy as np
+import pytest
+from pandas import DataFrame, Series
+from zpmeta.funcs.batch import split_results
+from zpmeta.funcs.func import Func
+from zpmeta.funcs.maptools import MapOperands, MapParams
+
+
+class _Scale(Func):
+    @classmethod
+    def _std_params(cls, name: str = None) -> dict:
+        return dict(scale=1.0)
+
+    @classmethod
+    def _execute(cls, operand=None, params: dict = None) -> object:
+        return operand * params['scale']
+
+    @classmethod
+    def _execute_batch(cls, operand=None, params: dict = None, batched: str = 'operand') -> object:
+        if batched == 'operand':
+            return operand * params['scale']
+        # The batch axis of params comes last, whatever the length of the operand.
+        return DataFrame(np.multiply.outer(operand.to_numpy(), params['scale']), index=operand.index)
+
+
+class _ScaleUnbatched(_Scale):
+    _execute_batch = Func._execute_batch
+
+
+def _assert_same(batched: dict, single: dict) -> None:
+    assert batched.keys() == single.keys()
+    for key, result in single.items():
+        assert batched[key].name == result.name
+        assert batched[key].equals(result)
+
+
+def test_batched_operands_match_unbatched():
+    operands = {key: Series([1.0, 2.0, 3.0], name='orig') * i for i, key in enumerate(('a', 'b'), 1)}
+    assert _Scale(dict(scale=2.0)).run_batch_operands(operands) is not None
+    batched = MapOperands(_Scale(dict(scale=2.0)))(operands)
+    _assert_same(batched, MapOperands(_ScaleUnbatched(dict(scale=2.0)))(operands))
+
+
+def test_batched_params_match_unbatched_when_the_index_has_one_row_per_key():
+    operand = Series([1.0, 2.0, 3.0], name='orig')
+    params = {key: dict(scale=scale) for key, scale in zip('abc', (1.0, 2.0, 3.0))}
+    assert _Scale().run_batch_params(operand, params) is not None
+    _assert_same(MapParams(_Scale())(operand, params), MapParams(_ScaleUnbatched())(operand, params))
+
+
+def test_split_results_requires_the_batch_axis_last():
+    keys = ['a', 'b', 'c']
+    block = np.arange(6.0).reshape(2, 3)
+    assert [result.tolist() for result in split_results(block, keys).values()] == [[0.0, 3.0], [1.0, 4.0], [2.0, 5.0]]
+    frame = split_results(DataFrame(block, columns=['x', 'y', 'z']), keys, names=['n'] * 3)
+    assert frame['b'].name == 'n' and frame['b'].tolist() == [1.0, 4.0]
+    for results in (Series([1.0, 2.0, 3.0], index=keys), [1.0, 2.0, 3.0], np.arange(6.0).reshape(3, 2)):
+        with pytest.raises(ValueError):
+            split_results(results, keys)
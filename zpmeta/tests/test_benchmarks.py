@@ -0,0 +1,39 @@
+"""Tests of the regression tracking of the benchmark suite."""
+
+import json
+import pytest
+from zpmeta.benchmarks import suite
+from zpmeta.benchmarks.__main__ import main
+
+CASE = 'func_call[depth=1]'
+
+
+def test_compare_flags_cases_slower_than_the_threshold():
+    baseline = dict(fast=1.0, slow=1.0, gone=1.0)
+    results = dict(fast=1.2, slow=1.3, new=5.0)
+    assert suite.compare(results, baseline) == [('slow', 1.0, 1.3, 1.3)]
+    assert suite.compare(results, baseline, threshold=0.1) == [('fast', 1.0, 1.2, 1.2), ('slow', 1.0, 1.3, 1.3)]
+    with pytest.raises(ValueError):
+        suite.compare(results, baseline, threshold=-0.1)
+
+
+def test_saved_results_round_trip(tmp_path):
+    path = str(tmp_path / 'results.json')
+    suite.save({CASE: 1e-6}, path)
+    assert suite.load(path) == {CASE: 1e-6}
+    with open(path, encoding='utf-8') as file:
+        assert 'python' in json.load(file)['environment']
+
+
+def test_main_exits_with_regressions_against_the_baseline(tmp_path, capsys):
+    assert CASE in suite.cases(suite.QUICK_GRID)
+    args = ['--quick', '--filter', CASE, '--repeat', '1', '--min-time', '0.001']
+    saved = str(tmp_path / 'saved.json')
+    assert main(args + ['--save', saved]) == 0
+    assert list(suite.load(saved)) == [CASE]
+
+    for seconds, status in ((1e-12, 1), (1.0, 0)):
+        baseline = str(tmp_path / 'baseline.json')
+        suite.save({CASE: seconds}, baseline)
+        assert main(args + ['--baseline', baseline]) == status
+        assert ('REGRESSION %s' % CASE in capsys.readouterr().out) == bool(status)
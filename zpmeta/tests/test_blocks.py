@@ -0,0 +1,65 @@
+"""Tests of the append-optimized PanelBlocks against combine_first."""
+
+import numpy as np
+from pandas import DataFrame, Index, Timedelta, Timestamp, date_range
+from zpmeta.sources.blocks import PanelBlocks
+from zpmeta.sources.panelsource import PanelSource
+
+START = Timestamp('2020-01-01')
+
+
+def _period(first: int, last: int) -> tuple:
+    return START + Timedelta(days=first), START + Timedelta(days=last)
+
+
+def _panel(entities: dict, period: tuple) -> DataFrame:
+    index = date_range(period[0], period[1], freq='D', name='date')
+    values = np.add.outer(np.asarray(index.dayofyear, dtype=float), [ord(entity[0]) for entity in entities['id']])
+    return DataFrame(values, index=index, columns=Index(entities['id'], name='id'))
+
+
+class _Source(PanelSource):
+    def __init__(self, xs: bool = True, ts: bool = True, columnar: bool = True) -> None:
+        super(_Source, self).__init__()
+        self.appendable = dict(xs=xs, ts=ts)
+        self.columnar = columnar
+
+    def _execute(self, call_type=None, entities=None, period=None) -> DataFrame:
+        return _panel(entities, period)
+
+
+REQUESTS = [(dict(id=['a', 'b']), _period(0, 9)), (dict(id=['a', 'b']), _period(0, 19)),
+            (dict(id=['a', 'b', 'c']), _period(5, 19)), (dict(id=['c', 'd']), _period(15, 29)),
+            (dict(id=['a', 'd']), _period(0, 29))]
+
+
+def test_blocks_match_combine_first():
+    for xs, ts in ((True, True), (False, True), (True, False)):
+        columnar, legacy = _Source(xs, ts), _Source(xs, ts, columnar=False)
+        for entities, period in REQUESTS:
+            expected = legacy(entities, period)
+            result = columnar(entities, period)
+            assert result.equals(expected), (xs, ts, entities, period)
+        assert legacy._blocks is None
+
+
+def test_panel_blocks_append_like_combine_first():
+    first, second = _panel(dict(id=['a', 'b']), _period(0, 9)), _panel(dict(id=['b', 'c']), _period(5, 14))
+    second.iloc[:, :] += 100
+    blocks = PanelBlocks()
+    blocks.append(first)
+    frame = blocks.frame()
+    blocks.append(second)
+    assert blocks.frame().equals(first.combine_first(second))
+    assert frame.equals(first), "frames handed out must not change"
+
+
+def test_panel_blocks_overwrite_keeps_existing_where_new_is_missing():
+    first, second = _panel(dict(id=['a']), _period(0, 4)), _panel(dict(id=['a']), _period(0, 4)) + 100
+    second.iloc[0, 0] = np.nan
+    blocks = PanelBlocks()
+    blocks.append(first)
+    blocks.append(second, overwrite=True)
+    expected = second.copy()
+    expected.iloc[0, 0] = first.iloc[0, 0]
+    assert blocks.frame().equals(expected)
@@ -0,0 +1,53 @@
+"""Tests of the memory budget and LRU chunk eviction of PanelSource."""
+
+import numpy as np
+from pandas import DataFrame, Index, Timedelta, Timestamp, date_range
+from zpmeta.sources.budget import ChunkBudget
+from zpmeta.sources.panelsource import PanelSource
+
+START = Timestamp('2020-01-01')
+PERIOD = (START, START + Timedelta(days=99))
+
+
+class _Source(PanelSource):
+    def __init__(self, memory_budget: int = None) -> None:
+        super(_Source, self).__init__(memory_budget=memory_budget)
+        self.appendable = dict(xs=True, ts=True)
+        self.calls = []
+
+    def _execute(self, call_type=None, entities=None, period=None) -> DataFrame:
+        self.calls.append((entities, period))
+        index = date_range(period[0], period[1], freq='D', name='date')
+        values = np.add.outer(np.arange(len(index), dtype=float), [ord(entity) for entity in entities['id']])
+        return DataFrame(values, index=index, columns=Index(entities['id'], name='id'))
+
+
+def test_chunk_budget_evicts_least_recently_used():
+    budget = ChunkBudget(max_bytes=250)
+    for entity in 'abc':
+        budget.record(dict(id=[entity]), PERIOD, 100)
+    budget.touch(dict(id=['a']), PERIOD)
+    assert budget.evict(300) == [(dict(id=['b']), PERIOD)]
+    assert budget.evict(300, dict(id=['c']), PERIOD) == [(dict(id=['a']), PERIOD)]
+    assert budget.evictions == 2 and len(budget) == 1
+
+    budget.record(dict(id=['b']), PERIOD, 100)
+    assert budget.refetches == 1
+
+
+def test_source_evicts_and_refetches_within_budget():
+    unbounded = _Source()
+    one_entity = unbounded(dict(id=['a']), PERIOD)
+    source = _Source(memory_budget=3 * one_entity.values.nbytes)
+    for entity in 'abcdef':
+        source(dict(id=[entity]), PERIOD)
+
+    stats = source.memory_stats
+    assert stats['evictions'] > 0 and stats['chunks'] < 6
+    assert source.coverage.missing(dict(id=['a']), PERIOD) == [(dict(id=['a']), PERIOD)]
+    assert source.coverage.missing(dict(id=['f']), PERIOD) == []
+
+    calls = len(source.calls)
+    assert source(dict(id=['a']), PERIOD).equals(one_entity)
+    assert len(source.calls) == calls + 1
+    assert source.memory_stats['refetches'] == 1
@@ -0,0 +1,77 @@
+"""Tests of the tile algebra of CoverageIndex."""
+
+from zpmeta.sources.coverage import CoverageIndex, add_interval, rectangles, remove_interval, subtract_intervals
+
+
+def test_subtract_intervals_reports_every_gap():
+    assert subtract_intervals((0, 10), []) == [(0, 10)]
+    assert subtract_intervals((0, 10), [(2, 4), (6, 8)]) == [(0, 2), (4, 6), (8, 10)]
+    assert subtract_intervals((0, 10), [(0, 10)]) == []
+    assert subtract_intervals((3, 5), [(0, 4)]) == [(4, 5)]
+
+
+def test_add_and_remove_intervals():
+    assert add_interval([(0, 2), (6, 8)], (2, 6)) == [(0, 8)]
+    assert add_interval([(0, 2)], (4, 6)) == [(0, 2), (4, 6)]
+    assert remove_interval([(0, 10)], (4, 6)) == [(0, 4), (6, 10)]
+
+
+def test_rectangles_cover_exactly_the_combos():
+    combos = [('a', 1), ('a', 2), ('b', 1), ('b', 2), ('c', 1)]
+    rects = rectangles(combos)
+    covered = [(x, y) for xs, ys in rects for x in xs for y in ys]
+    assert sorted(covered) == sorted(combos)
+    assert len(rects) == 2
+
+
+def test_missing_and_covers():
+    index = CoverageIndex()
+    index.add(dict(id=['a', 'b'], var=['px']), (0, 10))
+    assert index.covers(dict(id=['a'], var=['px']), (2, 8))
+    assert index.missing(dict(id=['a', 'b'], var=['px']), (0, 10)) == []
+
+    missing = index.missing(dict(id=['a', 'c'], var=['px']), (5, 15))
+    assert sorted(missing, key=repr) == sorted([(dict(id=['a'], var=['px']), (10, 15)),
+                                                (dict(id=['c'], var=['px']), (5, 15))], key=repr)
+    for entities, period in missing:
+        index.add(entities, period)
+    assert index.covers(dict(id=['a', 'c'], var=['px']), (5, 15))
+    assert index.entities == dict(id=['a', 'b', 'c'], var=['px'])
+    assert index.period == (0, 15)
+
+
+def test_remove_and_intersects():
+    index = CoverageIndex()
+    index.add(dict(id=['a', 'b']), (0, 10))
+    index.remove(dict(id=['a']), (0, 5))
+    assert index.missing(dict(id=['a']), (0, 10)) == [(dict(id=['a']), (0, 5))]
+    assert index.intersects(dict(id=['a']), (0, 5))
+    index.remove(dict(id=['b']))
+    assert not index.intersects(dict(id=['b']), (0, 10))
+    assert len(index) == 1
+
+
+def test_tiled_source_fetches_only_missing_rectangles():
+    from pandas import DataFrame, Index, Timedelta, Timestamp, date_range
+    from zpmeta.sources.panelsource import PanelSource
+
+    class Source(PanelSource):
+        def __init__(self) -> None:
+            super(Source, self).__init__()
+            self.appendable = dict(xs=True, ts=True)
+            self.calls = []
+
+        def _execute(self, call_type=None, entities=None, period=None) -> DataFrame:
+            self.calls.append((entities, period))
+            index = date_range(period[0], period[1], freq='D', name='date')
+            return DataFrame(1.0, index=index, columns=Index(entities['id'], name='id'))
+
+    start = Timestamp('2020-01-01')
+    period = (start, start + Timedelta(days=9))
+    source = Source()
+    source(dict(id=['a', 'b']), period)
+    source(dict(id=['a', 'b', 'c']), period)
+    assert source.calls[-1] == (dict(id=['c']), period)
+    data = source(dict(id=['a']), (start + Timedelta(days=2), start + Timedelta(days=5)))
+    assert len(source.calls) == 2 and data.shape == (4, 1)
+    assert source.coverage.covers(dict(id=['a', 'b', 'c']), period)
@@ -0,0 +1,74 @@
+"""Tests of the executor backends of the map tools."""
+
+import time
+import pytest
+from zpmeta.funcs.executors import ProcessExecutor, SerialExecutor, ThreadExecutor, get_executor
+from zpmeta.funcs.maptools import MapOperands
+
+
+def _square(operand, params=None):
+    # Later tasks finish first on pools, so that completion order differs from task order.
+    time.sleep(0.01 * (5 - operand % 5))
+    return operand * operand
+
+
+def _fail_odd(operand, params=None):
+    if operand % 2:
+        raise ValueError("odd %d" % operand)
+    return operand
+
+
+def _tasks(func, count: int = 10) -> list:
+    return [("k%d" % i, func, i, None) for i in range(count)]
+
+
+@pytest.mark.parametrize('executor', [SerialExecutor(), SerialExecutor(chunksize=3), ThreadExecutor(max_workers=4),
+                                      ThreadExecutor(max_workers=4, chunksize=3), ProcessExecutor(max_workers=2)])
+def test_ordered_results_follow_the_tasks(executor):
+    with executor:
+        results = executor.map(_tasks(_square))
+    assert list(results) == ["k%d" % i for i in range(10)]
+    assert results == {"k%d" % i: i * i for i in range(10)}
+
+
+def test_unordered_results_hold_every_key():
+    with ThreadExecutor(max_workers=4, ordered=False) as executor:
+        results = executor.map(_tasks(_square))
+    assert results == {"k%d" % i: i * i for i in range(10)}
+
+
+@pytest.mark.parametrize('executor', ['serial', 'thread', 'process'])
+def test_errors_raise(executor):
+    with get_executor(executor) as executor:
+        with pytest.raises(ValueError, match='odd'):
+            executor.map(_tasks(_fail_odd))
+
+
+@pytest.mark.parametrize('executor', ['serial', 'thread', 'process'])
+def test_errors_return(executor):
+    with get_executor(executor, errors='return') as executor:
+        results = executor.map(_tasks(_fail_odd, 4))
+    assert results['k0'] == 0 and results['k2'] == 2
+    assert isinstance(results['k1'], ValueError) and str(results['k3']) == "odd 3"
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        SerialExecutor(errors='ignore')
+    with pytest.raises(ValueError):
+        SerialExecutor(chunksize=0)
+    with pytest.raises(ValueError):
+        get_executor('gpu')
+    with pytest.raises(TypeError):
+        get_executor(1)
+
+
+def test_maps_give_the_same_results_on_every_executor():
+    class Square:
+        def __call__(self, operand, params=None):
+            return operand * operand
+
+    operands = {"k%d" % i: i for i in range(6)}
+    expected = MapOperands(Square())(operands)
+    with ThreadExecutor(max_workers=3) as executor:
+        assert MapOperands(Square(), executor=executor)(operands) == expected
@@ -0,0 +1,79 @@
+"""Tests of the canonical fingerprints keying params, operands and callables."""
+
+from functools import partial
+from zpmeta.utils.fingerprint import fingerprint
+
+
+def _scale(x, k=1):
+    return x * k
+
+
+class _Scale:
+    def __init__(self, factor) -> None:
+        self.factor = factor
+
+    def __call__(self, operand, params=None):
+        return operand * self.factor
+
+
+def test_partials_differ_by_arguments():
+    assert fingerprint(partial(_scale, k=1)) == fingerprint(partial(_scale, k=1))
+    assert fingerprint(partial(_scale, k=1)) != fingerprint(partial(_scale, k=2))
+    assert fingerprint(partial(_scale, 2)) != fingerprint(partial(_scale, 3))
+
+
+def test_callable_instances_differ_by_state():
+    assert fingerprint(_Scale(2)) == fingerprint(_Scale(2))
+    assert fingerprint(_Scale(2)) != fingerprint(_Scale(3))
+
+
+def test_functions_by_name_and_lambdas_by_identity():
+    assert fingerprint(_scale) == fingerprint(_scale)
+    assert fingerprint(lambda x: x) != fingerprint(lambda x: x)
+
+
+def test_shared_cache_distinguishes_partial_xfuncs():
+    from zpmeta.funcs.cache import ResultCache
+    from zpmeta.funcs.func import Func
+
+    class Identity(Func):
+        @classmethod
+        def _execute(cls, operand=None, params: dict = None) -> object:
+            return operand
+
+    cache = ResultCache()
+    assert Identity(xfunc=partial(_scale, k=1), cache=cache)(10) == 10
+    assert Identity(xfunc=partial(_scale, k=2), cache=cache)(10) == 20
+
+
+
+def test_stable_across_key_order_and_copies():
+    import numpy as np
+    from pandas import DataFrame
+    from zpmeta.utils.params import Params
+
+    assert fingerprint({'a': 1, 'b': [1, 2]}) == fingerprint({'b': [1, 2], 'a': 1})
+    assert fingerprint(Params({'a': 1, 'b': {'c': 2}})) == fingerprint({'b': {'c': 2}, 'a': 1})
+    assert fingerprint(np.arange(10.0)) == fingerprint(np.arange(10.0).copy())
+    frame = DataFrame({'x': [1.0, 2.0]}, index=['a', 'b'])
+    assert fingerprint(frame) == fingerprint(frame.copy())
+
+
+def test_stable_across_processes():
+    import os
+    import subprocess
+    import sys
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    script = "from zpmeta.utils.fingerprint import fingerprint; print(fingerprint({'a': [1, 2.5, 'x'], 'b': None}))"
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True,
+                            cwd=root).stdout
+    assert output.strip() == fingerprint({'a': [1, 2.5, 'x'], 'b': None})
+
+
+def test_distinct_values_differ():
+    import numpy as np
+    from pandas import DataFrame
+
+    values = [1, 1.0, '1', True, None, [1], (1, ), {1}, {'a': 1}, {'a': [1]}, np.arange(3), np.arange(3.0),
+              np.arange(3).reshape(1, 3), DataFrame({'x': [1.0]}), DataFrame({'y': [1.0]})]
+    assert len(set(fingerprint(value) for value in values)) == len(values)
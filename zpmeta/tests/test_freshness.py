@@ -0,0 +1,50 @@
+"""Tests of the TailFreshness policy of PanelSource."""
+
+import pytest
+from pandas import DataFrame, Index, Timedelta, Timestamp, date_range
+from zpmeta.sources.freshness import TailFreshness
+from zpmeta.sources.panelsource import PanelSource
+
+START = Timestamp('2020-01-01')
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _Source(PanelSource):
+    def __init__(self, freshness=None, store=None) -> None:
+        super(_Source, self).__init__(freshness=freshness, store=store)
+        self.appendable = dict(xs=True, ts=True)
+        self.version, self.calls = 0.0, []
+
+    def _execute(self, call_type=None, entities=None, period=None) -> DataFrame:
+        self.calls.append(period)
+        index = date_range(period[0], period[1], freq='D', name='date')
+        return DataFrame({entity: [self.version] * len(index) for entity in entities['id']}, index=index,
+                         columns=Index(entities['id'], name='id'), dtype=float)
+
+
+def test_stale_tail_is_refetched_and_revised():
+    clock = _Clock()
+    freshness = TailFreshness(Timedelta(days=2), ttl=60, clock=clock)
+    source, entities, period = _Source(freshness), dict(id=['a']), (START, START + Timedelta(days=9))
+    source(entities, period)
+    source.version = 1.0
+    assert source(entities, period)['a'].iloc[-1] == 0.0
+
+    clock.now = 61
+    data = source(entities, period)
+    assert source.calls[-1] == (START + Timedelta(days=7), START + Timedelta(days=9))
+    assert data['a'].iloc[-1] == 1.0 and data['a'].iloc[0] == 0.0
+    assert (freshness.refreshes, freshness.revisions) == (1, 1)
+
+
+def test_resident_store_rejects_freshness(tmp_path):
+    from zpmeta.sources.shared import SharedPanelCache
+    with pytest.raises(ValueError):
+        _Source(TailFreshness(Timedelta(days=2), ttl=60), store=SharedPanelCache(str(tmp_path)))
@@ -0,0 +1,28 @@
+"""Tests of the deduplication of steps in Graph."""
+
+from zpmeta.funcs.graph import Graph
+
+
+class _Scale:
+    def __init__(self, factor) -> None:
+        self.factor = factor
+
+    def __call__(self, operand, params=None):
+        return operand * self.factor
+
+
+def _add_one(operand, params=None):
+    return operand + 1
+
+
+def test_different_callable_instances_are_not_merged():
+    graph = Graph()
+    assert graph.run([graph.add(_Scale(2), 10), graph.add(_Scale(3), 10)]) == [20, 30]
+    assert len(graph) == 2
+
+
+def test_identical_steps_are_merged():
+    graph, scale = Graph(), _Scale(2)
+    assert graph.add(scale, 10) is graph.add(scale, 10)
+    assert graph.add(_add_one, 10) is graph.add(_add_one, 10)
+    assert len(graph) == 2
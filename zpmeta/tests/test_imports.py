@@ -0,0 +1,13 @@
+"""Import time regression test of the pandas-free core: Func, maptools and singletons."""
+
+from zpmeta.benchmarks.imports import BUDGET, CORE_MODULES, import_time
+
+
+def test_core_imports_without_pandas_or_numpy():
+    _, heavy = import_time(CORE_MODULES, runs=1)
+    assert 'pandas' not in heavy and 'numpy' not in heavy, heavy
+
+
+def test_core_imports_within_budget():
+    seconds, _ = import_time(CORE_MODULES, runs=3)
+    assert seconds <= BUDGET, "core imports take %.3f s, over the budget of %.3f s" % (seconds, BUDGET)
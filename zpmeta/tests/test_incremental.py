@@ -0,0 +1,72 @@
+"""Tests of IncrementalFunc against recomputing the whole operand."""
+
+import numpy as np
+from pandas import DataFrame, Index, Timedelta, Timestamp, date_range
+from zpmeta.funcs.func import Func
+from zpmeta.funcs.incremental import IncrementalFunc
+from zpmeta.sources.panelsource import PanelSource
+
+START = Timestamp('2020-01-01')
+
+
+def _period(first: int, last: int) -> tuple:
+    return START + Timedelta(days=first), START + Timedelta(days=last)
+
+
+class _Source(PanelSource):
+    def __init__(self) -> None:
+        super(_Source, self).__init__()
+        self.appendable = dict(xs=True, ts=True)
+
+    def _execute(self, call_type=None, entities=None, period=None) -> DataFrame:
+        index = date_range(period[0], period[1], freq='D', name='date')
+        values = np.sin(np.add.outer(np.arange(len(index)) + index[0].dayofyear, [ord(e) for e in entities['id']]))
+        return DataFrame(values, index=index, columns=Index(entities['id'], name='id'))
+
+
+class _CumSum(Func):
+    @classmethod
+    def _std_params(cls, name: str = None) -> dict:
+        return {'scale': 1.0}
+
+    @classmethod
+    def _execute(cls, operand=None, params: dict = None) -> object:
+        return operand.cumsum() * params['scale']
+
+    @classmethod
+    def _execute_incremental(cls, delta=None, state=None, params: dict = None) -> tuple:
+        totals = delta.cumsum() if state is None else delta.cumsum() + state
+        return totals * params['scale'], totals.iloc[-1]
+
+
+class _Demean(Func):
+    @classmethod
+    def _execute(cls, operand=None, params: dict = None) -> object:
+        return operand - operand.mean()
+
+
+class _Counting(IncrementalFunc):
+    recomputes = 0
+
+    def recompute(self, operand=None):
+        self.recomputes += 1
+        return super().recompute(operand)
+
+
+def test_incremental_results_match_a_full_recompute():
+    source = _Source()
+    source(dict(id=['a', 'b']), _period(0, 9))
+    cumsum = _Counting(_CumSum(), {'scale': 2.0}).attach(source)
+    demean = IncrementalFunc(_Demean()).attach(source)
+
+    for last in (19, 24, 39):
+        source(dict(id=['a', 'b']), _period(0, last))
+        np.testing.assert_allclose(cumsum.value.to_numpy(), _CumSum()(source.value, {'scale': 2.0}).to_numpy())
+        assert cumsum.value.index.equals(source.value.index)
+        assert demean.value.equals(_Demean()(source.value))
+    assert cumsum.recomputes == 1
+
+    # A new entity changes earlier rows, so the results are recomputed.
+    source(dict(id=['a', 'b', 'c']), _period(0, 39))
+    assert cumsum.recomputes == 2
+    np.testing.assert_allclose(cumsum.value.to_numpy(), _CumSum()(source.value, {'scale': 2.0}).to_numpy())
@@ -0,0 +1,59 @@
+"""Tests of the instrumentation events received by the sinks."""
+
+import json
+import numpy as np
+from pandas import DataFrame, Index, Timedelta, Timestamp, date_range
+from zpmeta.funcs.func import Func
+from zpmeta.funcs.maptools import MapParams
+from zpmeta.sources.panelsource import PanelSource
+from zpmeta.utils import instrument
+
+START = Timestamp('2020-01-01')
+
+
+class _Double(Func):
+    @classmethod
+    def _execute(cls, operand=None, params: dict = None) -> object:
+        return operand * 2
+
+
+class _Source(PanelSource):
+    def _execute(self, call_type=None, entities=None, period=None) -> DataFrame:
+        index = date_range(period[0], period[1], freq='D', name='date')
+        return DataFrame(np.ones((len(index), len(entities['id']))), index=index,
+                         columns=Index(entities['id'], name='id'))
+
+
+def test_sinks_receive_the_events_of_funcs_maps_and_fetches(tmp_path):
+    memory, prometheus = instrument.MemorySink(), instrument.PrometheusSink()
+    lines = instrument.JsonLinesSink(str(tmp_path / 'events.jsonl'))
+    for sink in (memory, prometheus, lines):
+        instrument.add_sink(sink)
+    try:
+        assert instrument.active
+        _Double()(1.0)
+        MapParams(_Double(), dict(a={}, b={}))(2.0)
+        _Source()(dict(id=['a', 'b']), (START, START + Timedelta(days=9)))
+    finally:
+        instrument.clear_sinks()
+        lines.close()
+    assert not instrument.active
+
+    totals = memory.totals
+    assert totals[('func', '_Double', 'execute')]['count'] == 3
+    assert totals[('map', 'MapParams', None)]['items'] == 2
+    fetch = totals[('fetch', '_Source', 'INITIAL')]
+    assert fetch['count'] == 1 and fetch['rows'] == 10 and fetch['wall'] >= 0
+
+    events = [json.loads(line) for line in (tmp_path / 'events.jsonl').read_text().splitlines()]
+    assert [(event['kind'], event['name']) for event in events] == [(event['kind'], event['name'])
+                                                                     for event in memory.events]
+    assert 'zpmeta_func_total{name="_Double",type="execute"} 3' in prometheus.render()
+
+
+def test_nothing_is_recorded_without_sinks():
+    memory = instrument.MemorySink()
+    instrument.add_sink(memory)
+    instrument.remove_sink(memory)
+    _Double()(1.0)
+    assert not instrument.active and len(memory.events) == 0
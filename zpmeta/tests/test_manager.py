@@ -0,0 +1,115 @@
+"""Tests of the SourceManager: batched fetches across sources, preloads and prefetching."""
+
+import threading
+import numpy as np
+from pandas import DataFrame, Index, Timedelta, Timestamp, date_range
+from zpmeta.sources.manager import SourceManager, predict_next
+from zpmeta.sources.panelsource import PanelSource, preload_scope
+
+START = Timestamp('2020-01-01')
+ENTITIES = dict(id=['a', 'b', 'c'])
+
+
+def _period(first: int, last: int) -> tuple:
+    return START + Timedelta(days=first), START + Timedelta(days=last)
+
+
+def _window(k: int) -> tuple:
+    return _period(10 * k, 10 * k + 9)
+
+
+def _panel(var: int, entities: dict, period: tuple) -> DataFrame:
+    index = date_range(period[0], period[1], freq='D', name='date')
+    values = np.add.outer(np.asarray(index.dayofyear, dtype=float), np.arange(len(entities['id']), dtype=float))
+    return DataFrame(values * var, index=index, columns=Index(entities['id'], name='id'))
+
+
+class _Source(PanelSource):
+    calls = dict(execute=0, batch=0)
+    lock = threading.Lock()
+
+    def __init__(self, var: int, tiled: bool = True) -> None:
+        super(_Source, self).__init__(dict(var=var))
+        self.appendable = dict(xs=tiled, ts=True)
+
+    def _execute(self, call_type=None, entities=None, period=None) -> DataFrame:
+        with self.lock:
+            self.calls['execute'] += 1
+        return _panel(self.params['var'], entities, period)
+
+    @classmethod
+    def _execute_batch(cls, sources: list, entities=None, period=None) -> list:
+        with cls.lock:
+            cls.calls['batch'] += 1
+        return [_panel(source.params['var'], entities, period) for source in sources]
+
+
+def _reset_calls() -> None:
+    _Source.calls.update(execute=0, batch=0)
+
+
+def test_requests_missed_by_several_sources_are_batched():
+    for tiled in (False, True):
+        _reset_calls()
+        with SourceManager(prefetch=False) as manager:
+            sources = {"v%d" % i: _Source(i, tiled) for i in range(1, 5)}
+            for name, source in sources.items():
+                manager.register(name, source)
+            for last in (9, 14, 9):
+                results = manager.fetch({name: (ENTITIES, _period(0, last)) for name in sources})
+                for name, source in sources.items():
+                    assert np.array_equal(results[name].to_numpy(),
+                                          _panel(source.params['var'], ENTITIES, _period(0, last)).to_numpy())
+            assert _Source.calls == dict(execute=0, batch=2)
+            assert manager.stats['batches'] == 2 and manager.stats['batched'] == 8
+            assert all(not source._preloaded for source in sources.values())
+
+
+def test_preloads_are_only_used_by_their_own_scope():
+    source, period = _Source(1), _period(0, 9)
+    first, second = _panel(10, ENTITIES, period), _panel(20, ENTITIES, period)
+    first_token, second_token = object(), object()
+    source.preload(ENTITIES, period, first, first_token)
+    source.preload(ENTITIES, period, second, second_token)
+    source.discard_preloaded(ENTITIES, period, second_token)
+
+    assert source.planned(ENTITIES, period) == [(ENTITIES, period)]
+    with preload_scope(first_token):
+        assert source(ENTITIES, period).equals(first)
+    assert not source._preloaded
+
+    _reset_calls()
+    direct = _Source(2)
+    direct.preload(ENTITIES, period, first, first_token)
+    assert direct(ENTITIES, period).equals(_panel(2, ENTITIES, period))
+    assert _Source.calls['execute'] == 1
+
+
+def test_predicted_requests_are_prefetched_within_budget():
+    _reset_calls()
+    with SourceManager() as manager:
+        manager.register('a', _Source(1))
+        manager.register('b', _Source(2))
+        for k in (0, 1):
+            manager.fetch({'a': (ENTITIES, _window(k)), 'b': (ENTITIES, _window(k))})
+        manager.wait()
+        assert manager.stats['prefetches'] == 2
+        calls = dict(_Source.calls)
+        assert manager('a', ENTITIES, _window(2)).equals(_panel(1, ENTITIES, _window(2)))
+        assert _Source.calls == calls
+
+    with SourceManager(memory_budget=1) as manager:
+        manager.register('a', _Source(1))
+        for k in (0, 1):
+            manager('a', ENTITIES, _window(k))
+        manager.wait()
+        assert manager.stats['prefetches'] == 0
+
+
+def test_predict_next_follows_periods_and_entity_slices():
+    history = [(ENTITIES, _period(0, 9)), (ENTITIES, _period(10, 19))]
+    assert predict_next(history) == (ENTITIES, _period(20, 29))
+    history = [(dict(id=['a', 'b']), _period(0, 9)), (dict(id=['c', 'd']), _period(0, 9))]
+    assert predict_next(history, dict(id=list('abcdefg'))) == (dict(id=['e', 'f']), _period(0, 9))
+    assert predict_next(history) is None
+    assert predict_next([(ENTITIES, _period(0, 9))] * 2) is None
@@ -0,0 +1,40 @@
+"""Tests of the streaming maps of maptools."""
+
+import threading
+import time
+import pytest
+from zpmeta.funcs.executors import SerialExecutor, ThreadExecutor
+from zpmeta.funcs.maptools import MapOperands, MapParams
+
+
+def _shift(operand, params=None):
+    time.sleep(0.01)
+    return operand + params['shift'] * params.get('scale', 1)
+
+
+@pytest.mark.parametrize('executor', [SerialExecutor(chunksize=2), ThreadExecutor(max_workers=2)])
+def test_streams_keep_at_most_window_tasks_in_flight(executor):
+    read, lock = [0], threading.Lock()
+
+    def operands():
+        for i in range(40):
+            with lock:
+                read[0] += 1
+            yield i, float(i)
+
+    consumed = 0
+    stream = MapOperands(_shift, dict(shift=1), executor=executor).stream(operands(), window=3)
+    for key, result in stream:
+        assert read[0] - consumed <= 3
+        assert result == key + 1
+        consumed += 1
+    assert consumed == 40
+
+
+def test_param_streams_override_the_params_of_the_map():
+    mapped = MapParams(_shift, dict(a=dict(shift=1, scale=2), b=dict(shift=3)))
+    expected = mapped(0.0, dict(a=dict(shift=5), c=dict(shift=7)))
+    assert expected == dict(a=10.0, b=3.0, c=7.0)
+    assert dict(mapped.stream(0.0, dict(a=dict(shift=5), c=dict(shift=7)))) == expected
+    assert dict(mapped.stream(0.0, iter([('a', dict(shift=5)), ('c', dict(shift=7))]))) == expected
+    assert dict(mapped.stream(0.0)) == mapped(0.0)
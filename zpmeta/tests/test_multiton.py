@@ -0,0 +1,70 @@
+"""Tests of the MultitonRegistry behind MultitonMeta."""
+
+import gc
+import threading
+import pytest
+from zpmeta.singletons.singletons import MultitonMeta, MultitonRegistry
+
+
+class _Multiton(metaclass=MultitonMeta):
+    def __init__(self, params: dict) -> None:
+        self.params = params
+
+
+class _Bounded(_Multiton):
+    _registry = MultitonRegistry(max_size=2)
+
+
+class _Weak(_Multiton):
+    _registry = MultitonRegistry(weak=True)
+
+
+def test_instances_are_keyed_by_fingerprint():
+    first = _Multiton(dict(a=1, b=[1, 2]))
+    assert _Multiton(dict(b=[1, 2], a=1)) is first
+    assert _Multiton(params=dict(a=1, b=[1, 2])) is first
+    assert _Multiton(dict(a=2, b=[1, 2])) is not first
+
+
+def test_max_size_evicts_least_recently_used():
+    registry = _Bounded._registry
+    registry.clear()
+    first, second = _Bounded(dict(i=1)), _Bounded(dict(i=2))
+    assert _Bounded(dict(i=1)) is first
+    _Bounded(dict(i=3))
+    assert len(registry) == 2 and registry.evictions == 1
+    assert _Bounded(dict(i=1)) is first
+    assert _Bounded(dict(i=2)) is not second
+
+
+def test_weak_registry_drops_unused_instances():
+    registry = _Weak._registry
+    instance = _Weak(dict(i=1))
+    assert _Weak(dict(i=1)) is instance and len(registry) == 1
+    del instance
+    gc.collect()
+    assert len(registry) == 0
+
+
+def test_stats_count_every_lookup_under_threads():
+    registry = MultitonRegistry()
+    registry.get_or_create((object, 'key'), object)
+    threads, calls = 8, 2000
+
+    def lookup():
+        for _ in range(calls):
+            registry.get_or_create((object, 'key'), object)
+
+    workers = [threading.Thread(target=lookup) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert registry.stats == dict(hits=threads * calls, misses=1, evictions=0, entries=1)
+
+
+def test_registry_arguments_are_checked():
+    with pytest.raises(ValueError):
+        MultitonRegistry(max_size=2, weak=True)
+    with pytest.raises(ValueError):
+        MultitonRegistry(max_size=0)
@@ -0,0 +1,108 @@
+"""Tests of the thread safety of PanelSource: tiles, single-flight fetches and unblocked reads."""
+
+import threading
+import time
+import numpy as np
+import pytest
+from pandas import DataFrame, Index, Timedelta, Timestamp, date_range
+from zpmeta.sources.panelsource import PanelSource
+
+START = Timestamp('2020-01-01')
+
+
+def _period(first: int, last: int) -> tuple:
+    return START + Timedelta(days=first), START + Timedelta(days=last)
+
+
+def _panel(entities: dict, period: tuple) -> DataFrame:
+    index = date_range(period[0], period[1], freq='D', name='date')
+    values = np.add.outer(np.asarray(index.dayofyear, dtype=float), [ord(entity[0]) for entity in entities['id']])
+    return DataFrame(values, index=index, columns=Index(entities['id'], name='id'))
+
+
+class _Source(PanelSource):
+    def __init__(self, xs: bool = True, ts: bool = True, delay: float = 0) -> None:
+        super(_Source, self).__init__()
+        self.appendable = dict(xs=xs, ts=ts)
+        self.delay = delay
+        self.calls = []
+        self.failures = 0
+        self._calls_lock = threading.Lock()
+
+    def _execute(self, call_type=None, entities=None, period=None) -> DataFrame:
+        with self._calls_lock:
+            self.calls.append((entities, period))
+            failing = self.failures > 0
+            self.failures -= failing
+        time.sleep(self.delay)
+        if failing:
+            raise RuntimeError("unavailable")
+        return _panel(entities, period)
+
+
+def _call_concurrently(source: _Source, requests: list) -> list:
+    barrier, results = threading.Barrier(len(requests)), [None] * len(requests)
+
+    def call(i, entities, period):
+        barrier.wait()
+        try:
+            results[i] = source(entities, period)
+        except RuntimeError as err:
+            results[i] = err
+
+    threads = [threading.Thread(target=call, args=(i, ) + request) for i, request in enumerate(requests)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_tiles_fetch_only_missing_rectangles():
+    source = _Source()
+    source(dict(id=['a', 'b']), _period(0, 9))
+    source(dict(id=['a', 'b', 'c']), _period(0, 9))
+    assert source.calls[-1] == (dict(id=['c']), _period(0, 9))
+    source(dict(id=['a']), _period(2, 5))
+    assert len(source.calls) == 2
+
+
+@pytest.mark.parametrize('xs', [True, False])
+def test_single_flight_under_threads(xs):
+    source, entities, period = _Source(xs=xs, delay=0.2), dict(id=['a', 'b']), _period(0, 9)
+    results = _call_concurrently(source, [(entities, period)] * 8)
+    assert len(source.calls) == 1
+    assert all(result.equals(results[0]) for result in results)
+
+
+def test_overlapping_requests_under_threads_fetch_each_tile_once():
+    source = _Source(delay=0.1)
+    requests = [(dict(id=['a', 'b']), _period(0, 9)), (dict(id=['b', 'c']), _period(0, 9)),
+                (dict(id=['a', 'b', 'c']), _period(0, 9))] * 3
+    _call_concurrently(source, requests)
+    fetched = [(entity, period) for entities, period in source.calls for entity in entities['id']]
+    assert sorted(fetched) == [(entity, _period(0, 9)) for entity in 'abc']
+
+
+def test_untiled_fetch_does_not_block_cached_reads():
+    source, entities = _Source(xs=False), dict(id=['a', 'b'])
+    source(entities, _period(0, 9))
+    source.delay = 0.5
+    extending = threading.Thread(target=source, args=(entities, _period(0, 19)))
+    extending.start()
+    time.sleep(0.1)
+    start = time.perf_counter()
+    cached = source(entities, _period(2, 5))
+    assert time.perf_counter() - start < 0.25
+    assert cached.equals(_panel(entities, _period(2, 5)))
+    extending.join()
+    assert source(entities, _period(0, 19)).equals(_panel(entities, _period(0, 19)))
+    assert len(source.calls) == 2
+
+
+def test_untiled_fetch_errors_reach_every_waiter():
+    source, entities, period = _Source(xs=False, delay=0.2), dict(id=['a']), _period(0, 9)
+    source.failures = 1
+    results = _call_concurrently(source, [(entities, period)] * 4)
+    assert len(source.calls) == 1 and all(isinstance(result, RuntimeError) for result in results)
+    assert source(entities, period).equals(_panel(entities, period))
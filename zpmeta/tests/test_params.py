@@ -0,0 +1,95 @@
+"""Tests of the layered, immutable Params."""
+
+from zpmeta.utils.fingerprint import fingerprint
+from zpmeta.utils.params import Params
+
+
+def test_equality_follows_dicts():
+    params = Params({'a': 1, 'b': {'c': 2}})
+    assert params == {'a': 1.0, 'b': {'c': 2}}
+    assert params != {'a': 1}
+    assert params != {'a': 1, 'b': {'c': 3}}
+    assert Params({'a': 1}) == Params({'a': 1.0})
+    assert hash(Params({'a': 1})) == hash(Params({'a': 1.0}))
+
+
+def test_fingerprint_distinguishes_what_equality_does_not():
+    assert fingerprint(Params({'a': 1})) != fingerprint(Params({'a': 1.0}))
+
+
+def test_dict_call_patterns_keep_working():
+    import json
+    from zpmeta.funcs.func import Func
+    from zpmeta.utils.common_utils import deep_update
+
+    class _Func(Func):
+        @classmethod
+        def _std_params(cls, name: str = None) -> dict:
+            return {'x': 0, 'sub': {'a': 1, 'b': [1, 2]}}
+
+        @classmethod
+        def _execute(cls, operand=None, params: dict = None) -> object:
+            return operand
+
+    func = _Func({'sub': {'a': 2}})
+    copied = func.params.copy()
+    copied['x'] = 1
+    copied['sub']['a'] = 3
+    assert func.params['x'] == 0 and func.params['sub']['a'] == 2
+
+    updated = deep_update(func.params, {'sub': {'b': [3]}})
+    assert updated == {'x': 0, 'sub': {'a': 2, 'b': [3]}} and type(updated) is dict
+    assert func.params['sub']['b'] == [1, 2]
+
+    assert json.loads(json.dumps(func.params)) == {'x': 0, 'sub': {'a': 2, 'b': [1, 2]}}
+    assert isinstance(func.params, dict) and isinstance(func.params['sub'], dict)
+    assert dict(func.params)['x'] == 0 and {**func.params}['sub'] == {'a': 2, 'b': [1, 2]}
+
+
+def test_params_are_immutable():
+    import pytest
+    params = Params({'a': 1})
+    with pytest.raises(TypeError):
+        params['a'] = 2
+    with pytest.raises(TypeError):
+        params.update(a=2)
+    assert params['a'] == 1
+
+
+def test_hash_follows_items():
+    assert hash(Params({'a': 1, 'b': {'c': 2}})) == hash(Params({'a': 1.0, 'b': {'c': 2}}))
+    keys = {Params({'a': i, 'b': {'c': i}}) for i in range(100)}
+    assert len(set(hash(params) for params in keys)) == 100
+    assert hash(Params({'a': [1]})) == hash(Params({'a': [1]}))
+
+
+
+def test_override_deep_updates_without_changing_the_base():
+    base = Params({'a': 1, 'b': {'c': 2, 'd': 3}})
+    params = base.override({'b': {'c': 20}, 'e': 5})
+    assert params.to_dict() == {'a': 1, 'b': {'c': 20, 'd': 3}, 'e': 5}
+    assert base.to_dict() == {'a': 1, 'b': {'c': 2, 'd': 3}}
+    assert base.override(None) is base and base.override({}) is base
+
+
+def test_non_mapping_override_hides_nested_values():
+    params = Params({'b': {'c': 2}}).override({'b': 7})
+    assert params['b'] == 7
+    assert Params({'b': 7}).override({'b': {'c': 2}})['b'].to_dict() == {'c': 2}
+
+
+def test_caller_changes_do_not_leak():
+    source = {'a': {'b': 1}}
+    params = Params(source)
+    source['a']['b'] = 2
+    source['c'] = 3
+    assert params.to_dict() == {'a': {'b': 1}}
+
+
+def test_layers_are_flattened_past_the_limit():
+    from zpmeta.utils.params import MAX_LAYERS
+    params = Params({'x': 0})
+    for i in range(MAX_LAYERS * 2):
+        params = params.override({'x': i, 'k%d' % i: i})
+    assert len(params._layers) <= MAX_LAYERS
+    assert params['x'] == MAX_LAYERS * 2 - 1 and len(params) == MAX_LAYERS * 2 + 1
@@ -0,0 +1,64 @@
+"""Tests of the SharedPanelCache shared by the processes of a machine."""
+
+import multiprocessing
+import os
+import time
+import numpy as np
+from pandas import DataFrame, Index, Timedelta, Timestamp, date_range
+from zpmeta.sources.panelsource import PanelSource
+from zpmeta.sources.shared import SharedPanelCache
+
+START = Timestamp('2020-01-01')
+ENTITIES, PERIOD = dict(id=['a', 'b']), (START, START + Timedelta(days=30))
+
+
+class _Source(PanelSource):
+    def __init__(self, log: str, store=None) -> None:
+        super(_Source, self).__init__(dict(name='shared'), store=store)
+        self.appendable = dict(xs=True, ts=True)
+        self.log = log
+
+    def _execute(self, call_type=None, entities=None, period=None) -> DataFrame:
+        with open(self.log, 'a', encoding='utf-8') as file:
+            file.write("%d %s\n" % (os.getpid(), entities['id']))
+        time.sleep(0.2)
+        index = date_range(period[0], period[1], freq='D', name='date')
+        values = np.add.outer(np.arange(len(index), dtype=float), np.arange(len(entities['id']), dtype=float))
+        return DataFrame(values, index=index, columns=Index(entities['id'], name='id'))
+
+
+def _call(root: str, log: str, queue) -> None:
+    source = _Source(log, store=SharedPanelCache(root, timeout=30))
+    data = source(ENTITIES, PERIOD)
+    queue.put((data.shape, float(data.to_numpy().sum()), data.to_numpy().flags.writeable, source.value is None))
+
+
+def test_processes_fetch_each_tile_once(tmp_path):
+    root, log = str(tmp_path / 'cache'), str(tmp_path / 'calls.log')
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    processes = [context.Process(target=_call, args=(root, log, queue)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    results = [queue.get(timeout=60) for _ in processes]
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    assert len(set(results)) == 1
+    shape, _, writeable, no_value = results[0]
+    assert shape == (31, 2) and not writeable and no_value
+    with open(log, encoding='utf-8') as file:
+        assert len(file.readlines()) == 1
+
+
+def test_missing_tiles_and_clear(tmp_path):
+    store = SharedPanelCache(str(tmp_path / 'cache'))
+    source = _Source(str(tmp_path / 'calls.log'), store=store)
+    source(ENTITIES, PERIOD)
+    assert store.missing(source, ENTITIES, PERIOD) == []
+    assert store.missing(source, dict(id=['c']), PERIOD) == [(dict(id=['c']), PERIOD)]
+    data = source(dict(id=['a', 'c']), PERIOD)
+    assert list(data.columns) == ['a', 'c']
+    store.clear(source)
+    assert store.missing(source, ENTITIES, PERIOD) == [(ENTITIES, PERIOD)]
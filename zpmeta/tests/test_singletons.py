@@ -0,0 +1,62 @@
+"""Tests of the isolation modes of IsolatedMeta."""
+
+import gc
+import pytest
+from zpmeta.singletons.singletons import IsolatedMeta, isolate
+
+
+class _Pooled(metaclass=IsolatedMeta):
+    _isolation = 'pooled'
+
+    def __init__(self, tag: str = None) -> None:
+        if tag is not None:
+            type(self).tag = tag
+
+
+class _Lazy(metaclass=IsolatedMeta):
+    _isolation = 'lazy'
+
+
+class _Eager(metaclass=IsolatedMeta):
+    pass
+
+
+def test_eager_instances_get_their_own_subclass():
+    first, second = _Eager(), _Eager()
+    assert type(first) is not type(second) and isinstance(first, _Eager)
+    type(first).tag = 'first'
+    assert not hasattr(second, 'tag')
+
+
+def test_lazy_instances_share_the_class_until_isolated():
+    first, second = _Lazy(), _Lazy()
+    assert type(first) is _Lazy and type(second) is _Lazy
+
+    subcls = isolate(first)
+    assert type(first) is subcls and subcls is not _Lazy and isinstance(first, _Lazy)
+    assert isolate(first) is subcls
+    subcls.tag = 'first'
+    assert not hasattr(second, 'tag') and not hasattr(_Lazy, 'tag')
+
+
+def test_isolate_requires_an_isolated_class():
+    with pytest.raises(TypeError):
+        isolate(object())
+
+
+def test_pooled_subclass_is_reset_after_init_changes():
+    first = _Pooled('first')
+    subcls = type(first)
+    assert subcls.tag == 'first'
+    del first
+    gc.collect()
+
+    second = _Pooled()
+    assert type(second) is subcls
+    assert not hasattr(type(second), 'tag')
+
+
+def test_pooled_instances_alive_do_not_share_subclasses():
+    first, second = _Pooled('a'), _Pooled('b')
+    assert type(first) is not type(second)
+    assert (type(first).tag, type(second).tag) == ('a', 'b')
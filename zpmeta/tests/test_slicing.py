@@ -0,0 +1,41 @@
+"""Tests of the slicing of cached panels by entities and period."""
+
+import numpy as np
+import pytest
+from pandas import DataFrame, Index, date_range
+from zpmeta.sources import slicing
+from zpmeta.sources.slicing import subset_panel
+
+
+def _panel() -> DataFrame:
+    index = date_range('2020-01-01', periods=10, freq='D', name='date')
+    return DataFrame(np.arange(30.0).reshape(10, 3), index=index, columns=Index(['a', 'b', 'c'], name='id'))
+
+
+PERIOD = (np.datetime64('2020-01-03'), np.datetime64('2020-01-05'))
+
+
+@pytest.mark.parametrize('copy', [False, True])
+def test_writing_to_the_subset_leaves_the_panel_unchanged(copy):
+    panel = _panel()
+    expected = panel.copy()
+    subset = subset_panel(panel, dict(id=['a', 'b']), PERIOD, copy=copy)
+    assert subset.shape == (3, 2) and subset.index[0] == PERIOD[0]
+    subset.iloc[0, 0] = -1.0
+    subset['a'] = 0.0
+    assert panel.equals(expected)
+
+
+def test_subset_of_everything_is_a_new_object():
+    panel = _panel()
+    assert subset_panel(panel) is not panel and subset_panel(panel).equals(panel)
+
+
+def test_views_are_read_only_without_copy_on_write(monkeypatch):
+    monkeypatch.setattr(slicing, '_copy_on_write', lambda: False)
+    panel = _panel()
+    view = subset_panel(panel, dict(id=['b', 'c']), PERIOD)
+    assert all(not block.values.flags.writeable for block in view._mgr.blocks)
+    assert subset_panel(panel, dict(id=['b', 'c']), PERIOD, copy=True)._mgr.blocks[0].values.flags.writeable
+    panel.iloc[0, 0] = 5.0
+    assert panel.iloc[0, 0] == 5.0
@@ -0,0 +1,111 @@
+"""Tests of the persistent PanelStore."""
+
+import multiprocessing
+import os
+import time
+import pytest
+from pandas import DataFrame, Index, Timestamp, Timedelta, date_range
+from zpmeta.sources.panelsource import PanelSource
+
+pytest.importorskip('pyarrow')
+from zpmeta.sources.store import PanelStore  # pylint: disable=wrong-import-position
+
+START = Timestamp('2020-01-01')
+
+
+class _Source(PanelSource):
+    def _execute(self, call_type=None, entities=None, period=None) -> DataFrame:
+        index = date_range(period[0], period[1], freq='D', name='date')
+        return DataFrame({entity: range(len(index)) for entity in entities['id']}, index=index,
+                         columns=Index(entities['id'], name='id'), dtype=float)
+
+
+def _save_tiles(root: str, worker: int, count: int) -> None:
+    store, source = PanelStore(root), _Source()
+    for i in range(count):
+        period = (START + Timedelta(days=i), START + Timedelta(days=i))
+        entities = dict(id=["W%dT%d" % (worker, i)])
+        store.save(source, source._execute(entities=entities, period=period), entities, period)
+
+
+class _SlowSource(_Source):
+    log_dir = None
+
+    def _execute(self, call_type=None, entities=None, period=None) -> DataFrame:
+        with open(os.path.join(self.log_dir, str(os.getpid())), 'a', encoding='utf-8') as file:
+            file.write("%s\n" % (entities, ))
+        time.sleep(0.3)
+        return super()._execute(call_type, entities, period)
+
+
+class _FailingSource(_Source):
+    def _execute(self, call_type=None, entities=None, period=None) -> DataFrame:
+        raise RuntimeError("unavailable")
+
+
+def _fetch_tile(root: str, log_dir: str) -> None:
+    _SlowSource.log_dir = log_dir
+    PanelStore(root).fetch(_SlowSource(), "INITIAL", dict(id=['a', 'b']), (START, START + Timedelta(days=9)))
+
+
+def test_concurrent_processes_keep_every_tile(tmp_path):
+    workers, count = 4, 12
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=_save_tiles, args=(str(tmp_path), worker, count)) for worker in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    tiles, _ = PanelStore(str(tmp_path))._manifest(_Source())
+    assert len(tiles) == workers * count
+
+
+def test_reopen_with_other_format(tmp_path):
+    source, entities, period = _Source(), dict(id=['a', 'b']), (START, START + Timedelta(days=3))
+    expected = PanelStore(str(tmp_path), format='parquet').fetch(source, "INITIAL", entities, period)
+
+    store = PanelStore(str(tmp_path), format='arrow')
+    assert store.missing(source, entities, period) == []
+    assert store.load(source, entities, period).equals(expected)
+
+
+def test_clear(tmp_path):
+    store, source = PanelStore(str(tmp_path)), _Source()
+    entities, period = dict(id=['a']), (START, START + Timedelta(days=1))
+    store.fetch(source, "INITIAL", entities, period)
+    store.clear(source)
+    assert store.missing(source, entities, period) == [(entities, period)]
+
+
+def test_concurrent_fetches_execute_once(tmp_path):
+    root, log_dir = tmp_path / 'store', tmp_path / 'log'
+    log_dir.mkdir()
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=_fetch_tile, args=(str(root), str(log_dir))) for _ in range(3)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    assert sum(len(path.read_text().splitlines()) for path in log_dir.iterdir()) == 1
+    tiles, _ = PanelStore(str(root))._manifest(_SlowSource())
+    assert len(tiles) == 1
+
+
+def test_claims_of_dead_processes_and_failures_are_dropped(tmp_path):
+    store, source = PanelStore(str(tmp_path), timeout=5), _Source()
+    entities, period = dict(id=['a']), (START, START + Timedelta(days=1))
+    process = multiprocessing.get_context('spawn').Process(target=time.sleep, args=(0, ))
+    process.start()
+    process.join()
+    with store._locked(source) as directory:
+        store._replace(os.path.join(directory, 'claims.pkl'), [(entities, period, process.pid)])
+    assert store._claim(source, entities, period) == ([(entities, period)], [])
+
+    failing = _FailingSource()
+    with pytest.raises(RuntimeError):
+        store.fetch(failing, "INITIAL", entities, period)
+    assert store._claims(store._directory(failing)) == []
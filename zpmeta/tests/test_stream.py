@@ -0,0 +1,49 @@
+"""Tests of the chunked streaming of PanelSource."""
+
+import numpy as np
+import pytest
+from pandas import DataFrame, Index, Timedelta, Timestamp, concat, date_range
+from zpmeta.sources.panelsource import PanelSource
+
+START = Timestamp('2020-01-01')
+ENTITIES = dict(id=['a', 'b', 'c', 'd', 'e'])
+PERIOD = (START, START + Timedelta(days=29))
+
+
+def _panel(entities: dict, period: tuple) -> DataFrame:
+    index = date_range(period[0], period[1], freq='D', name='date')
+    values = np.add.outer(np.asarray(index.dayofyear, dtype=float), [ord(entity[0]) for entity in entities['id']])
+    return DataFrame(values, index=index, columns=Index(entities['id'], name='id'))
+
+
+class _Source(PanelSource):
+    def __init__(self) -> None:
+        super(_Source, self).__init__()
+        self.appendable = dict(xs=True, ts=True)
+
+    def _execute(self, call_type=None, entities=None, period=None) -> DataFrame:
+        return _panel(entities, period)
+
+
+@pytest.mark.parametrize('prefetch', [0, 2])
+@pytest.mark.parametrize('cache', [True, False])
+def test_stream_chunks_reassemble_the_request(prefetch, cache):
+    source = _Source()
+    chunks = list(source.stream(ENTITIES, PERIOD, period_step=Timedelta(days=10), entity_step=2, prefetch=prefetch,
+                                cache=cache))
+    assert len(chunks) == 3 * 3
+    assert all(len(chunk.columns) <= 2 and len(chunk) <= 11 for chunk in chunks)
+
+    # Rows shared by consecutive sub-periods are trimmed from the later one.
+    by_group = [concat(chunks[i::3]) for i in range(3)]
+    assert all(group.index.is_unique for group in by_group)
+    assert concat(by_group, axis=1).equals(_panel(ENTITIES, PERIOD))
+    assert (source.value is None) != cache
+
+
+def test_stream_checks_its_arguments():
+    source = _Source()
+    with pytest.raises(ValueError):
+        source.stream(ENTITIES, PERIOD, prefetch=-1)
+    with pytest.raises(KeyError):
+        list(source.stream(ENTITIES, PERIOD, entity_step=2, level='sector'))
@@ -0,0 +1,77 @@
+"""Tests of parameter sweeps over grids, with and without shared stages."""
+
+import pytest
+from pandas import Series
+from zpmeta.funcs.executors import SerialExecutor, ThreadExecutor
+from zpmeta.funcs.func import Func
+from zpmeta.funcs.sweep import Grid, RandomSearch, Sweep
+
+STAGE_CALLS = []
+
+
+class _Pipeline(Func):
+    stages = (('smooth', ('window', )), ('scale', ('factor', )))
+
+    @classmethod
+    def _std_params(cls, name: str = None) -> dict:
+        return dict(window=2, factor=1.0)
+
+    @classmethod
+    def _execute(cls, operand=None, params: dict = None) -> object:
+        return cls._execute_stages(operand, params)
+
+    @classmethod
+    def _execute_stage(cls, name: str, operand=None, params: dict = None) -> object:
+        STAGE_CALLS.append(name)
+        if name == 'smooth':
+            return operand.rolling(params['window']).mean()
+        if params['factor'] < 0:
+            raise ValueError("factor must be non-negative!")
+        return operand * params['factor']
+
+
+class _Unstaged(_Pipeline):
+    stages = ()
+
+    @classmethod
+    def _execute(cls, operand=None, params: dict = None) -> object:
+        return cls._execute_stage('scale', cls._execute_stage('smooth', operand, params), params)
+
+
+OPERAND = Series([float(i * i % 7) for i in range(50)])
+GRID = Grid(dict(factor=[0.5, 1.0, 2.0], window=[2, 3, 5, 8]))
+
+
+def _naive(func, grid) -> dict:
+    return {tuple(sorted(point.items())): func(OPERAND, point) for point in grid}
+
+
+@pytest.mark.parametrize('window', [1, 5, 64])
+def test_staged_sweep_matches_naive_calls(window):
+    expected = _naive(_Unstaged(), GRID)
+    STAGE_CALLS.clear()
+    results = {tuple(sorted(point.items())): value for point, value in Sweep(_Pipeline(), GRID, window=window)(OPERAND)}
+    assert results.keys() == expected.keys()
+    assert all(results[key].equals(value) for key, value in expected.items())
+    # Each window is smoothed once, whenever the combinations sharing it are in flight together.
+    if window == 64:
+        assert STAGE_CALLS.count('smooth') == 4 and STAGE_CALLS.count('scale') == 12
+
+
+def test_unstaged_sweep_with_chunks_matches_naive_calls():
+    space = RandomSearch(dict(window=[2, 3, 4], factor=lambda rng: rng.uniform(0, 2)), n=10, seed=1)
+    assert list(space) == list(space)
+    expected = _naive(_Unstaged(), space)
+    sweep = Sweep(_Unstaged(), space, executor=ThreadExecutor(max_workers=2, chunksize=3), window=4)
+    results = dict((tuple(sorted(point.items())), value) for point, value in sweep(OPERAND))
+    assert results.keys() == expected.keys()
+    assert all(results[key].equals(value) for key, value in expected.items())
+
+
+def test_sweep_errors_follow_the_executor():
+    grid = Grid(dict(factor=[1.0, -1.0], window=[2]))
+    with pytest.raises(ValueError):
+        list(Sweep(_Pipeline(), grid)(OPERAND))
+    sweep = Sweep(_Pipeline(), grid, executor=SerialExecutor(errors='return'))
+    results = {point['factor']: value for point, value in sweep(OPERAND)}
+    assert isinstance(results[-1.0], ValueError) and results[1.0].equals(_Unstaged()(OPERAND, dict(window=2)))
@@ -0,0 +1,66 @@
+"""Tests of the memory-mapped transport of operands and results between processes."""
+
+import os
+import pickle
+import time
+import numpy as np
+import pytest
+from pandas import DataFrame, Series, date_range
+from zpmeta.funcs.transport import SharedArray, SharedPandas, attach, release, share
+
+
+def test_round_trip_of_arrays_and_pandas(tmp_path):
+    frame = DataFrame(np.arange(20.0).reshape(10, 2), index=date_range('2020-01-01', periods=10, name='date'),
+                      columns=['x', 'y'])
+    obj = dict(array=np.arange(100.0), frame=frame, series=frame['x'], small=np.arange(2.0), label='a')
+    shared = share(obj, str(tmp_path), threshold=64)
+    assert isinstance(shared['array'], SharedArray) and isinstance(shared['frame'], SharedPandas)
+    assert shared['small'] is obj['small'] and shared['label'] == 'a'
+
+    attached = attach(pickle.loads(pickle.dumps(shared)))
+    assert np.array_equal(attached['array'], obj['array'])
+    assert attached['frame'].equals(frame) and isinstance(attached['series'], Series)
+    assert attached['series'].equals(frame['x'])
+    assert not attached['array'].flags.writeable
+
+    release(shared)
+    assert os.listdir(str(tmp_path)) == []
+    assert np.array_equal(attached['array'], obj['array']), "views stay valid after release"
+
+
+def _total(operand, params=None) -> float:
+    assert not operand.flags.writeable, "operands must arrive as read-only views of segments"
+    return float(operand.sum())
+
+
+def test_process_executor_moves_large_operands_through_segments():
+    from zpmeta.funcs.executors import ProcessExecutor
+
+    operands = {key: np.full(1 << 18, float(key)) for key in range(3)}
+    tasks = [(key, _total, operand, None) for key, operand in operands.items()]
+    executor = ProcessExecutor(max_workers=2, shared_memory=True)
+    try:
+        results = executor.map(tasks)
+    finally:
+        executor.shutdown()
+    assert results == {key: float(key) * (1 << 18) for key in operands}
+
+
+def _large_or_fail(operand, params=None):
+    if params['fail']:
+        raise RuntimeError("failed")
+    time.sleep(0.5)
+    return np.full(1 << 16, operand)
+
+
+def test_process_executor_removes_result_segments_on_errors(tmp_path):
+    from zpmeta.funcs.executors import ProcessExecutor
+
+    tasks = [(key, _large_or_fail, float(key), dict(fail=key == 0)) for key in range(4)]
+    executor = ProcessExecutor(max_workers=2, shared_memory=True, threshold=64, directory=str(tmp_path))
+    try:
+        with pytest.raises(RuntimeError):
+            executor.map(tasks)
+    finally:
+        executor.shutdown()
+    assert os.listdir(str(tmp_path)) == []
@@ -8,14 +8,14 @@ __email__ = 'engineering@zeroth-principles.com'
 __authors__ = ['Deepak Singh <deepaksingh@zeroth-principles.com>']
 
 
-import pandas as pd
-import numpy as np
 import json
+from collections.abc import Mapping
 from copy import deepcopy
+from zpmeta.utils.params import Params
 
 def deep_update(d, u):
-    """Deep update of dict d with dict u."""
-    d_copy = deepcopy(d)
+    """Deep update of dict d with dict u. Params are updated as a copy of their nested dicts."""
+    d_copy = deepcopy(d.to_dict() if isinstance(d, Params) else d)
     for k, v in u.items():
         if isinstance(v, dict):
             d_copy[k] = deep_update(d_copy.get(k, {}), v)
@@ -25,6 +25,8 @@ def deep_update(d, u):
 
 def custom_serializer(obj):
     """Custom JSON serializer that converts built-in functions to strings."""
+    if isinstance(obj, Mapping):
+        return dict(obj)
     if callable(obj):
         return str(obj)
     raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
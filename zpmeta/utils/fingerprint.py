@@ -0,0 +1,220 @@
+"""fingerprint file contains functions to build canonical, content based keys for params and operands"""
+
+__copyright__ = '2023 Zeroth Principles Research'
+__license__ = 'GPLv3'
+__docformat__ = 'google'
+__author__ = 'Zeroth Principles Engineering'
+__email__ = 'engineering@zeroth-principles.com'
+
+
+import functools
+import hashlib
+import pickle
+import sys
+import types
+from collections.abc import Mapping
+
+DIGEST_SIZE = 16
+_SCALARS = {cls: ('%s:' % cls.__name__).encode() for cls in (type(None), bool, int, float, complex, str, bytes)}
+_SCALAR_TYPES = frozenset(_SCALARS)
+
+
+def fingerprint(obj) -> str:
+    """Returns a canonical hex digest of obj.
+
+    Equal params give equal fingerprints irrespective of the order of dict keys. NumPy arrays and pandas objects
+    are hashed from their buffers rather than from their string representation. Functions are identified by
+    their qualified name, partials by their function and arguments, and other callable instances by their class
+    and state. Objects that cannot be encoded canonically fall back to their pickle or repr.
+    """
+    if isinstance(obj, Mapping):
+        return _mapping_fingerprint(obj)
+    h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    try:
+        h.update(b'plain:%s' % repr(_plain(obj)).encode())
+    except (_NotPlain, TypeError):
+        h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+        _feed(h, obj)
+    return h.hexdigest()
+
+
+def mapping_fingerprint(obj: Mapping) -> str:
+    """Returns the fingerprint of the items of a mapping, ignoring any fingerprint cached by the mapping itself."""
+    h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    try:
+        h.update(b'plain:%s' % repr(_plain(obj)).encode())
+    except (_NotPlain, TypeError):
+        h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+        _feed_mapping(h, obj)
+    return h.hexdigest()
+
+
+def _mapping_fingerprint(obj: Mapping) -> str:
+    # Mappings caching their fingerprint, such as Params, encode identically to plain dicts with the same items.
+    cached = getattr(obj, '__fingerprint__', None)
+    return cached() if cached is not None else mapping_fingerprint(obj)
+
+
+class _NotPlain(Exception):
+    pass
+
+
+def _plain(obj):
+    """Returns obj as nested builtins whose repr is canonical, i.e. with sorted dicts, or raises _NotPlain.
+
+    Params made of scalars, sequences and mappings with sortable keys, i.e. most of them, are then encoded by one
+    call to repr, several times faster than walking them with _feed.
+    """
+    cls = type(obj)
+    if cls in _SCALARS:
+        return obj
+    if isinstance(obj, Mapping):
+        return {key: _plain(obj[key]) for key in sorted(obj)}
+    if cls is list or cls is tuple:
+        if _SCALAR_TYPES.issuperset(map(type, obj)):
+            return obj
+        return cls(_plain(item) for item in obj)
+    raise _NotPlain()
+
+
+def _feed_mapping(h, obj: Mapping) -> None:
+    h.update(b'map{')
+    for key, value in _sorted_items(obj):
+        _feed(h, key)
+        _feed(h, value)
+    h.update(b'}')
+
+
+def _feed(h, obj) -> None:
+    cls = type(obj)
+    tag = _SCALARS.get(cls)
+    if tag is not None:
+        h.update(tag + repr(obj).encode() + b';')
+    elif isinstance(obj, Mapping):
+        _feed_mapping(h, obj)
+    elif hasattr(obj, '__fingerprint__') and not isinstance(obj, type):
+        h.update(b'fp:%s;' % obj.__fingerprint__().encode())
+    elif cls in (list, tuple):
+        h.update(b'%s[' % cls.__name__.encode())
+        for item in obj:
+            _feed(h, item)
+        h.update(b']')
+    elif cls in (set, frozenset):
+        h.update(b'set{%s}' % ','.join(sorted(fingerprint(item) for item in obj)).encode())
+    elif cls.__module__.startswith('numpy'):
+        _feed_numpy(h, obj)
+    elif cls.__module__.startswith('pandas'):
+        _feed_pandas(h, obj)
+    elif callable(obj):
+        _feed_callable(h, obj)
+    else:
+        _feed_fallback(h, obj)
+
+
+def _sorted_items(obj: Mapping) -> list:
+    try:
+        return sorted(obj.items(), key=lambda item: item[0])
+    except TypeError:
+        return sorted(obj.items(), key=lambda item: (type(item[0]).__name__, repr(item[0])))
+
+
+def _feed_numpy(h, obj) -> None:
+    import numpy as np
+    if isinstance(obj, np.ndarray) and obj.dtype != object:
+        h.update(b'ndarray:%s:%s;' % (obj.dtype.str.encode(), repr(obj.shape).encode()))
+        h.update(memoryview(np.ascontiguousarray(obj)).cast('B'))
+    elif isinstance(obj, np.ndarray):
+        h.update(b'ndarray:O:%s;' % repr(obj.shape).encode())
+        _feed(h, obj.ravel().tolist())
+    elif isinstance(obj, np.generic):
+        h.update(b'%s:%s;' % (obj.dtype.str.encode(), repr(obj.item()).encode()))
+    else:
+        _feed_fallback(h, obj)
+
+
+def _feed_pandas(h, obj) -> None:
+    import pandas as pd
+    if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+        h.update(b'%s:%s;' % (type(obj).__name__.encode(), repr(obj.shape).encode()))
+        try:
+            hashes = pd.util.hash_pandas_object(obj, index=not isinstance(obj, pd.Index))
+        except TypeError:
+            _feed_fallback(h, obj)
+            return
+        _feed_numpy(h, hashes.to_numpy())
+        if isinstance(obj, pd.DataFrame):
+            _feed(h, [str(dtype) for dtype in obj.dtypes])
+            _feed(h, list(obj.columns))
+            _feed(h, list(obj.columns.names))
+            _feed(h, list(obj.index.names))
+        elif isinstance(obj, pd.Series):
+            _feed(h, (str(obj.dtype), obj.name, list(obj.index.names)))
+        else:
+            _feed(h, (str(obj.dtype), list(obj.names)))
+    elif isinstance(obj, pd.Timestamp):
+        h.update(b'Timestamp:%s;' % obj.isoformat().encode())
+    else:
+        _feed_fallback(h, obj)
+
+
+def _feed_callable(h, obj) -> None:
+    if isinstance(obj, types.MethodType):
+        h.update(b'method:%s;' % obj.__func__.__qualname__.encode())
+        _feed(h, obj.__self__)
+        return
+    if isinstance(obj, functools.partial):
+        h.update(b'partial:')
+        _feed(h, obj.func)
+        _feed(h, obj.args)
+        _feed(h, obj.keywords)
+        return
+
+    params = getattr(obj, 'params', None)
+    module = getattr(obj, '__module__', None) or type(obj).__module__
+    name = getattr(obj, '__qualname__', None) or type(obj).__qualname__
+    h.update(b'callable:%s.%s;' % (str(module).encode(), str(name).encode()))
+    if isinstance(obj, (type, types.FunctionType, types.BuiltinFunctionType)):
+        if '<' in str(name):
+            # Lambdas and nested functions share qualified names, so only identity distinguishes them.
+            h.update(b'id:%d;' % id(obj))
+    elif params is not None:
+        # Func-like instances: identical class and params describe identical behaviour.
+        _feed(h, params)
+        _feed(h, getattr(obj, 'xfunc', None))
+    else:
+        _feed_state(h, obj)
+
+
+def _feed_state(h, obj) -> None:
+    """Feeds the state of a callable instance, as pickled, or its identity if the state cannot be read."""
+    try:
+        state = obj.__getstate__()
+        digest = fingerprint(state)
+    except Exception:  # pylint: disable=broad-except
+        h.update(b'id:%d;' % id(obj))
+        return
+    h.update(b'state:%s;' % digest.encode())
+
+
+def _feed_fallback(h, obj) -> None:
+    try:
+        h.update(b'pickle:%s;' % pickle.dumps(obj, protocol=4))
+    except Exception:  # pylint: disable=broad-except
+        h.update(b'repr:%s:%s;' % (type(obj).__qualname__.encode(), repr(obj).encode()))
+
+
+def approx_sizeof(obj) -> int:
+    """Returns an approximation of the number of bytes held by obj, looking inside containers and frames."""
+    cls = type(obj)
+    module = cls.__module__
+    if module.startswith('pandas') and hasattr(obj, 'memory_usage'):
+        usage = obj.memory_usage(index=True)
+        return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+    if module.startswith('numpy') and hasattr(obj, 'nbytes'):
+        return int(obj.nbytes)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, Mapping):
+        size += sum(approx_sizeof(key) + approx_sizeof(value) for key, value in obj.items())
+    elif cls in (list, tuple, set, frozenset):
+        size += sum(approx_sizeof(item) for item in obj)
+    return size
@@ -0,0 +1,205 @@
+"""instrument file contains the low overhead instrumentation of Funcs, maps, PanelSources and Multitons
+
+Instrumented code checks the module flag active before measuring anything, so that instrumentation costs one
+attribute lookup per call while no sink is installed. Events are dicts with the fields:
+
+    kind: 'func', 'map', 'fetch' or 'multiton'.
+    name: Name of the class recording the event.
+    type: Optional label, e.g. 'execute' or 'cached' for funcs, the call type of fetches such as 'INITIAL' or
+        'INCREMENTAL TS1', and 'hit' or 'miss' for Multitons.
+    wall, cpu: Optional wall and CPU time of the calling thread in seconds.
+    rows, bytes, items: Optional sizes, e.g. of the data fetched by a PanelSource.
+
+Sinks are installed per process: events of tasks running in a process pool go to the sinks of the workers.
+"""
+
+__copyright__ = '2023 Zeroth Principles Research'
+__license__ = 'GPLv3'
+__docformat__ = 'google'
+__author__ = 'Zeroth Principles Engineering'
+__email__ = 'engineering@zeroth-principles.com'
+
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+MEASURES = ('wall', 'cpu', 'rows', 'bytes', 'items')
+
+active = False
+_sinks = ()
+_lock = threading.Lock()
+
+
+def add_sink(sink) -> None:
+    """Installs a sink, any object with a record(event) method, and enables instrumentation."""
+    global _sinks, active
+    with _lock:
+        _sinks = _sinks + (sink, )
+        active = True
+
+
+def remove_sink(sink) -> None:
+    global _sinks, active
+    with _lock:
+        _sinks = tuple(installed for installed in _sinks if installed is not sink)
+        active = len(_sinks) > 0
+
+
+def clear_sinks() -> None:
+    global _sinks, active
+    with _lock:
+        _sinks, active = (), False
+
+
+def sinks() -> tuple:
+    return _sinks
+
+
+def record(kind: str, name: str, type: str = None, **measures) -> None:  # pylint: disable=redefined-builtin
+    """Sends an event to every sink. Callers check active first, so that nothing is built while disabled."""
+    event = dict(kind=kind, name=name, type=type, **measures)
+    for sink in _sinks:
+        sink.record(event)
+
+
+class Timer:
+    """Wall and CPU time of the calling thread since creation."""
+    __slots__ = ('wall', 'cpu')
+
+    def __init__(self) -> None:
+        self.wall, self.cpu = time.perf_counter(), time.thread_time()
+
+    def elapsed(self) -> dict:
+        return dict(wall=time.perf_counter() - self.wall, cpu=time.thread_time() - self.cpu)
+
+
+def instrumented(kind: str):
+    """Decorator of methods recording an event of kind named after the class of self for every call.
+
+    The event measures the wall and CPU time of the call, and the number of items of results that have a length.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if not active:
+                return method(self, *args, **kwargs)
+            timer = Timer()
+            results = method(self, *args, **kwargs)
+            measures = timer.elapsed()
+            if hasattr(results, '__len__'):
+                measures['items'] = len(results)
+            record(kind, self.__class__.__name__, **measures)
+            return results
+        return wrapper
+    return decorator
+
+
+class MemorySink:
+    """Sink aggregating events in memory, by kind, name and type, and keeping the latest ones.
+
+    Args:
+        maxlen: Number of latest events kept. 0 to only aggregate.
+    """
+    def __init__(self, maxlen: int = 10000) -> None:
+        self.events = deque(maxlen=maxlen)
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "%s(series=%d)" % (self.__class__.__name__, len(self._totals))
+
+    def record(self, event: dict) -> None:
+        key = event['kind'], event['name'], event['type']
+        with self._lock:
+            self.events.append(event)
+            totals = self._totals.get(key)
+            if totals is None:
+                totals = self._totals[key] = dict(count=0)
+            totals['count'] += 1
+            for measure in MEASURES:
+                if measure in event:
+                    totals[measure] = totals.get(measure, 0) + event[measure]
+
+    @property
+    def totals(self) -> dict:
+        """Returns the count and the sum of the measures of the events, keyed by (kind, name, type)."""
+        with self._lock:
+            return {key: dict(totals) for key, totals in self._totals.items()}
+
+    def clear(self) -> None:
+        with self._lock:
+            self.events.clear()
+            self._totals.clear()
+
+
+class JsonLinesSink:
+    """Sink appending every event, with its time stamp and process id, as a JSON line to a file.
+
+    Args:
+        path: File the events are appended to.
+    """
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file = open(path, 'a', encoding='utf-8')  # pylint: disable=consider-using-with
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "%s(path=%s)" % (self.__class__.__name__, self.path)
+
+    def record(self, event: dict) -> None:
+        line = json.dumps(dict(event, time=time.time(), pid=os.getpid()), default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+
+    def flush(self) -> None:
+        with self._lock:
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class PrometheusSink(MemorySink):
+    """Sink aggregating events in memory and rendering them in the Prometheus text exposition format.
+
+    Every kind gives the counter zpmeta_<kind>_total and one counter per measure, e.g. zpmeta_fetch_rows_total or
+    zpmeta_func_wall_seconds_total, labelled with name and type.
+    """
+    def __init__(self) -> None:
+        super(PrometheusSink, self).__init__(maxlen=0)
+
+    def render(self) -> str:
+        series = {}
+        for (kind, name, type_), totals in sorted(self.totals.items(), key=lambda item: str(item[0])):
+            labels = 'name="%s"' % _escape(name)
+            if type_ is not None:
+                labels += ',type="%s"' % _escape(type_)
+            for measure, value in totals.items():
+                if measure == 'count':
+                    metric = "zpmeta_%s_total" % kind
+                else:
+                    unit = '_seconds' if measure in ('wall', 'cpu') else ''
+                    metric = "zpmeta_%s_%s%s_total" % (kind, measure, unit)
+                series.setdefault(metric, []).append("%s{%s} %r" % (metric, labels, value))
+        lines = []
+        for metric, samples in series.items():
+            lines.append("# TYPE %s counter" % metric)
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path: str) -> None:
+        """Writes the rendered metrics to path atomically, e.g. for the textfile collector of node_exporter."""
+        import uuid
+        tmp_path = "%s.%s.tmp" % (path, uuid.uuid4().hex)
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.write(self.render())
+        os.replace(tmp_path, path)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,221 @@
+"""params file contains the immutable, layered params used by Func and the map tools"""
+
+__copyright__ = '2023 Zeroth Principles Research'
+__license__ = 'GPLv3'
+__docformat__ = 'google'
+__author__ = 'Zeroth Principles Engineering'
+__email__ = 'engineering@zeroth-principles.com'
+
+
+from collections.abc import ItemsView, KeysView, Mapping, ValuesView
+from zpmeta.utils.fingerprint import mapping_fingerprint
+
+MAX_LAYERS = 8
+_MISSING = object()
+
+
+def _freeze(mapping: Mapping) -> dict:
+    """Copies the dict structure of mapping without copying its leaves, so later changes by the caller do not leak."""
+    return {key: _freeze(value) if isinstance(value, dict) and not isinstance(value, Params) else value
+            for key, value in mapping.items()}
+
+
+class Params(dict):
+    """Immutable nested mapping made of layers of overrides, similar to a nested ChainMap.
+
+    Overriding returns a new Params that shares every existing layer and only adds the overrides on top, so its
+    cost is proportional to the size of the overrides rather than the size of the base. Nested mappings found in
+    several layers are merged on access, which gives the same values as deep_update without copying the base.
+    Leaves are never copied; params are meant to be read, not mutated. Params compare equal to mappings with equal
+    items, like dicts; the hash and the fingerprint used as cache key are computed once and cached.
+
+    Params subclass dict, so that code written for the nested dicts of deep_update keeps working: isinstance checks,
+    json.dumps and ** unpacking see the merged items, and copy returns a mutable nested dict. The storage of the
+    dict itself only mirrors the keys; every read goes through the layers.
+
+    Args:
+        base: Mapping of params, or None for empty params.
+    """
+    __slots__ = ('_layers', '_keys', '_children', '_fingerprint', '_hash')
+
+    def __init__(self, base: Mapping = None) -> None:  # pylint: disable=super-init-not-called
+        if base is None:
+            layers = ()
+        elif isinstance(base, Params):
+            layers = base._layers
+        elif isinstance(base, Mapping):
+            layers = (_freeze(base), )
+        else:
+            raise TypeError("params must be a Mapping!")
+        self._set_layers(layers)
+
+    @classmethod
+    def _from_layers(cls, layers: tuple) -> 'Params':
+        obj = cls.__new__(cls)
+        obj._set_layers(layers)
+        return obj
+
+    def _set_layers(self, layers: tuple) -> None:
+        # Layers are plain dicts ordered from the highest to the lowest priority.
+        self._layers = layers
+        self._keys = None
+        self._children = {}
+        self._fingerprint = None
+        self._hash = None
+        # The dict storage mirrors the keys, as json and other C code skip dicts whose storage is empty, but holds
+        # no values: every read goes through the methods below.
+        dict.update(self, dict.fromkeys(self._keyset()))
+
+    def override(self, overrides: Mapping = None) -> 'Params':
+        """Returns new params with overrides deep-updated on top of these params."""
+        if overrides is None or len(overrides) == 0:
+            return self
+        if isinstance(overrides, Params):
+            layers = overrides._layers + self._layers
+        elif isinstance(overrides, Mapping):
+            layers = (_freeze(overrides), ) + self._layers
+        else:
+            raise TypeError("params must be a Mapping!")
+
+        params = self._from_layers(layers)
+        if len(layers) > MAX_LAYERS:
+            params = self._from_layers((params.to_dict(), ))
+        return params
+
+    def __getitem__(self, key):
+        child = self._children.get(key, _MISSING)
+        if child is not _MISSING:
+            return child
+
+        found = []
+        for layer in self._layers:
+            value = layer.get(key, _MISSING)
+            if value is _MISSING:
+                continue
+            if not isinstance(value, Mapping):
+                if not found:
+                    return value
+                break
+            found.append(value)
+
+        if not found:
+            raise KeyError(key)
+
+        # A dict override merges into a dict below it and hides anything below a non-dict value.
+        sublayers = []
+        for value in found:
+            sublayers.extend(value._layers if isinstance(value, Params) else (value, ))
+        child = self._from_layers(tuple(sublayers))
+        self._children[key] = child
+        return child
+
+    def __contains__(self, key) -> bool:
+        return any(key in layer for layer in self._layers)
+
+    def _keyset(self) -> dict:
+        if self._keys is None:
+            keys = {}
+            for layer in reversed(self._layers):
+                keys.update(dict.fromkeys(layer))
+            self._keys = keys
+        return self._keys
+
+    def __iter__(self):
+        return iter(self._keyset())
+
+    def __reversed__(self):
+        return reversed(list(self._keyset()))
+
+    def __len__(self) -> int:
+        return len(self._keyset())
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self) -> KeysView:
+        return KeysView(self)
+
+    def items(self) -> ItemsView:
+        return ItemsView(self)
+
+    def values(self) -> ValuesView:
+        return ValuesView(self)
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("Params are immutable, use override or copy!")
+
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    update = pop = popitem = setdefault = clear = _immutable
+
+    def __or__(self, other: Mapping) -> dict:
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        merged = self.to_dict()
+        merged.update(other)
+        return merged
+
+    def __ror__(self, other: Mapping) -> dict:
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        merged = dict(other)
+        merged.update(self.to_dict())
+        return merged
+
+    def __repr__(self):
+        return "%s(%s)" % (self.__class__.__name__, self.to_dict())
+
+    def to_dict(self) -> dict:
+        """Returns the params as plain nested dicts. Leaves are shared, not copied."""
+        return {key: value.to_dict() if isinstance(value, Params) else value for key, value in self.items()}
+
+    def copy(self) -> dict:
+        """Returns the params as mutable nested dicts, like the copy of the dicts of deep_update."""
+        return self.to_dict()
+
+    def __copy__(self) -> 'Params':
+        return self
+
+    def __deepcopy__(self, memo) -> 'Params':
+        return self
+
+    def __reduce__(self):
+        return self.__class__, (self.to_dict(), )
+
+    def __fingerprint__(self) -> str:
+        if self._fingerprint is None:
+            self._fingerprint = mapping_fingerprint(self)
+        return self._fingerprint
+
+    def __hash__(self) -> int:
+        # Hashes the items, consistently with __eq__ since equal leaves such as 1 and 1.0 hash equally. Unhashable
+        # leaves only contribute their key.
+        if self._hash is None:
+            items = []
+            for key, value in self.items():
+                try:
+                    items.append((key, hash(value)))
+                except TypeError:
+                    items.append((key, ))
+            self._hash = hash(frozenset(items))
+        return self._hash
+
+    def __eq__(self, other) -> bool:
+        # Equality follows dict equality, e.g. 1 == 1.0; caches key params by fingerprint instead.
+        if self is other:
+            return True
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        if len(self) != len(other):
+            return False
+        for key, value in self.items():
+            other_value = other.get(key, _MISSING)
+            if other_value is _MISSING or not value == other_value:
+                return False
+        return True
+
+    def __ne__(self, other) -> bool:
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal